@@ -0,0 +1,130 @@
+"""In-memory index of variant PICTURES directories (one os.scandir per directory)"""
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+
+import profiler
+
+# Station file of a series of extraction lines: <series>_<x coordinate> (Ux_GRAD_0.655), a glob / fnmatch pattern
+STATION_PATTERN = "{}_[0-9][.][0-9][0-9][0-9]"
+
+# Entry of the index: size in bytes and mtime in ns (as os.stat)
+Asset = namedtuple("Asset", ("size", "mtime_ns"))
+
+# Problem found by the pre-flight check of slides configuration
+Problem = namedtuple("Problem", ("level", "section", "message"))
+
+
+def file_hash(path: str, block: int = 1 << 20) -> str:
+    """SHA1 of file content."""
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class AssetIndex:
+    """Files of every scanned directory, so existence checks do not stat the (network) file system again.
+
+    With catalog (catalog.Catalog), directories unchanged since they were
+    crawled are taken from it instead of listed. The catalog only tells
+    which files exist there: a file rewritten in place keeps its catalogued
+    size and mtime, so get stats files of catalogued directories.
+    """
+
+    def __init__(self, directories=(), catalog=None):
+        self.dirs = {}
+        self.catalog = catalog
+        self.catalogued = set()  # directories listed from the catalog
+        for directory in directories:
+            self.scan(directory)
+
+    def scan(self, directory: str) -> dict:
+        directory = os.path.abspath(directory)
+        files = self.catalog.listing(directory) if self.catalog is not None else None
+        if files is not None:
+            self.dirs[directory] = files
+            self.catalogued.add(directory)
+            return files
+
+        files = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = Asset(stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        self.dirs[directory] = files
+        self.catalogued.discard(directory)
+        return files
+
+    def get(self, path: str):
+        """Return Asset of the file or None if it does not exist.
+
+        Files outside scanned directories and files of catalogued directories are stat'ed.
+        """
+        directory, name = os.path.split(os.path.abspath(path))
+        if directory in self.dirs:
+            asset = self.dirs[directory].get(name)
+            if asset is None or directory not in self.catalogued:
+                return asset
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return Asset(stat.st_size, stat.st_mtime_ns)
+
+    def exists(self, path: str) -> bool:
+        directory, name = os.path.split(os.path.abspath(path))
+        if directory in self.dirs:
+            return name in self.dirs[directory]
+        return self.get(path) is not None
+
+
+class BlobCache:
+    """Thread-safe cache of file contents, so files shared by several decks are read only once.
+
+    Files are kept until max_bytes is reached, later ones are just read. A kept
+    file whose size or mtime changed is read again, so the cache stays valid
+    across rebuilds of watch mode.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024**3):
+        self._blobs = {}  # {path: (Asset when read, content)}
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+    def read(self, path: str, keep: bool = True) -> bytes:
+        """Return file content, with keep=False a file not cached yet is only read (not kept)."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        asset = Asset(stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._blobs.get(path)
+        if cached is not None and cached[0] == asset:
+            return cached[1]
+
+        with profiler.phase("blob_read", path) as record, open(path, "rb") as f:
+            blob = f.read()
+            record["read"] = len(blob)
+        with self._lock:
+            cached = self._blobs.get(path)
+            if cached is not None and cached[0] == asset:
+                return cached[1]
+            if cached is not None:
+                # Changed since it was kept
+                del self._blobs[path]
+                self.nbytes -= len(cached[1])
+            if keep and self.nbytes + len(blob) <= self.max_bytes:
+                self._blobs[path] = (asset, blob)
+                self.nbytes += len(blob)
+        return blob
+
+    def open(self, path: str, keep: bool = True):
+        return io.BytesIO(self.read(path, keep))
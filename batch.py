@@ -0,0 +1,133 @@
+"""Build many presentations in one process with shared template and image caches"""
+import copy
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import colorlog
+
+import assets
+import cli
+import evePresentation
+from log import formatter
+
+# Initialize LOGGER
+handler = colorlog.StreamHandler()
+handler.setFormatter(formatter)
+logger = colorlog.getLogger(__name__)
+logger.addHandler(handler)
+logger.setLevel("INFO")
+
+# Outcome of one deck build
+DeckResult = namedtuple("DeckResult", ("settings", "output", "ok", "seconds", "error"))
+
+
+def expand_settings(patterns) -> list:
+    """Expand list of settings cfg files / glob patterns, keep order and drop duplicates."""
+    files = []
+    for pattern in patterns:
+        files.extend(sorted(glob.glob(pattern)) or [pattern])
+    return list(dict.fromkeys(files))
+
+
+def build(args, blobs: assets.BlobCache = None, workers: int = None, pr=None):
+    """Build and save the presentation described by args (variants, config, templates and build options).
+
+    pr is a Presentation with template, config and variants already loaded (main), it is loaded from args without it.
+    """
+    if pr is None:
+        pr = evePresentation.Presentation(src_prs_path=args.input_pptx, blobs=blobs)
+        pr.load_config(args.cfg_file)
+        pr.add_variants(args.variants)
+    try:
+        pr.process_slides(
+            image_dpi=args.image_dpi,
+            image_cache=args.image_cache,
+            workers=workers,
+            incremental_output=args.output_pptx if args.incremental else None,
+            stream_output=args.output_pptx if args.stream else None,
+            prefetch=args.prefetch,
+            stage_dir=args.stage_dir,
+            parallel=args.parallel,
+            lite=args.lite,
+        )
+        pr.save_presentation(args.output_pptx, lite_budget=args.lite_budget)
+    except BaseException:
+        # Failed or aborted (sys.exit) build: streamed output is removed, watch mode builds again later
+        if pr.writer is not None:
+            pr.writer.abort()
+        raise
+
+
+def deck_args(settings_file: str, defaults):
+    """Arguments of the deck described by settings_file (defaults updated by the settings file)."""
+    args = copy.copy(defaults)
+    if not os.path.isfile(settings_file):
+        raise FileNotFoundError("Settings file {} does not exist".format(settings_file))
+    return cli.read_settings(settings_file, args)
+
+
+def build_deck(settings_file: str, args, blobs: assets.BlobCache) -> DeckResult:
+    """Build one presentation described by settings_file (read into args), never raises."""
+    start = time.monotonic()
+    try:
+        build(args, blobs, workers=1)
+    except (Exception, SystemExit) as err:
+        # SystemExit: the build aborted on a problem that was already logged
+        error = "aborted" if isinstance(err, SystemExit) else "{}: {}".format(type(err).__name__, err)
+        return DeckResult(settings_file, args.output_pptx, False, time.monotonic() - start, error)
+    return DeckResult(settings_file, args.output_pptx, True, time.monotonic() - start, "")
+
+
+def build_decks(patterns, defaults, workers: int = None) -> list:
+    """Build a deck for every settings file, decks run concurrently and share one BlobCache.
+
+    Settings files are read first, a deck whose output is the output of an
+    earlier deck fails without being built (concurrent builds would overwrite it).
+    """
+    files = expand_settings(patterns)
+    blobs = assets.BlobCache()
+    logger.info("Building {} presentations".format(len(files)))
+
+    results = {}
+    decks = {}
+    outputs = {}
+    for settings_file in files:
+        try:
+            args = deck_args(settings_file, defaults)
+        except Exception as err:
+            error = "{}: {}".format(type(err).__name__, err)
+            results[settings_file] = DeckResult(settings_file, defaults.output_pptx, False, 0.0, error)
+            continue
+        output = os.path.realpath(evePresentation.resolve_output_path(args.output_pptx))
+        if output in outputs:
+            error = "Output {} is also the output of {}".format(args.output_pptx, outputs[output])
+            results[settings_file] = DeckResult(settings_file, args.output_pptx, False, 0.0, error)
+            continue
+        outputs[output] = settings_file
+        decks[settings_file] = args
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        built = pool.map(lambda deck: build_deck(deck[0], deck[1], blobs), decks.items())
+        results.update((result.settings, result) for result in built)
+
+    logger.info("Shared cache: {:.1f} MB of templates and images".format(blobs.nbytes / 1024**2))
+    return [results[settings_file] for settings_file in files]
+
+
+def print_summary(results):
+    print("\n{:<6} {:>8}  {}".format("STATUS", "TIME", "SETTINGS -> OUTPUT"))
+    for res in results:
+        print(
+            "{:<6} {:>7.1f}s  {} -> {}{}".format(
+                "OK" if res.ok else "FAILED",
+                res.seconds,
+                res.settings,
+                res.output,
+                "" if res.ok else "\n{:>17}{}".format("", res.error),
+            )
+        )
+    failed = sum(not res.ok for res in results)
+    print("\n{} presentations built, {} failed".format(len(results) - failed, failed))
@@ -0,0 +1,216 @@
+"""Benchmark runner: times the main phases of cfd_agp on synthetic projects of growing size
+
+python benchmarks/run.py --sizes small medium --output results.json
+python benchmarks/run.py --sizes small --compare results.json
+"""
+import argparse
+import contextlib
+import datetime
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import matplotlib  # noqa: E402
+
+matplotlib.use("Agg")  # plt.show() of the gradient analysis must not block
+
+import synthetic  # noqa: E402
+
+DEFAULT_TEMPLATE = os.path.join(REPO_DIR, "TEMPLATES", "SABLONA-RAPID-AEROAKUSTIKA.pptx")
+
+# Size sweep, parameters of synthetic.generate_project
+SIZES = {
+    "small": dict(
+        variants=2, slides=5, image_size=(1280, 720), stations=5, points=1000, plots=2, plot_points=500, plane=(50, 200)
+    ),
+    "medium": dict(
+        variants=3,
+        slides=20,
+        image_size=(1920, 1080),
+        stations=20,
+        points=20000,
+        plots=5,
+        plot_points=5000,
+        plane=(200, 1000),
+    ),
+    "large": dict(
+        variants=3,
+        slides=40,
+        image_size=(3840, 2160),
+        stations=40,
+        points=200000,
+        plots=10,
+        plot_points=50000,
+        plane=(500, 4000),
+    ),
+}
+BENCHMARKS = (
+    "startup",
+    "process_slides",
+    "save_presentation",
+    "gradients_from_file",
+    "gradients_plane",
+    "plot_gradients",
+)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def bench_startup(project, template):
+    """Time of cfd_agp --version in a fresh interpreter (import cost of the CLI)."""
+    cmd = [sys.executable, os.path.join(REPO_DIR, "main.py"), "--version"]
+    return _timed(subprocess.run, cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _presentation(project, template):
+    import evePresentation
+
+    pr = evePresentation.Presentation(src_prs_path=template)
+    pr.load_config(project["slides_cfg"])
+    pr.add_variants(project["variants"])
+    return pr
+
+
+def bench_process_slides(project, template):
+    pr = _presentation(project, template)
+    return _timed(pr.process_slides)
+
+
+def bench_save_presentation(project, template):
+    pr = _presentation(project, template)
+    pr.process_slides()
+    return _timed(pr.save_presentation, os.path.join(project["root"], "OUTPUT.pptx"))
+
+
+def bench_gradients_from_file(project, template):
+    """Cold analysis: every sample starts with an empty results store of the project (never the user's one)."""
+    pr = _presentation(project, template)
+    pictures_dir = os.path.join(project["variants"][0], "PICTURES")
+    results_db = os.path.join(project["root"], "gradients.sqlite")
+    for path in glob.glob(glob.escape(results_db) + "*"):
+        os.unlink(path)
+    return _timed(pr.gradients_from_file, project["grad_file"], pictures_dir=pictures_dir, results_db=results_db)
+
+
+def bench_gradients_plane(project, template):
+    pr = _presentation(project, template)
+    return _timed(pr.gradients_plane, project["plane_file"])
+
+
+def bench_plot_gradients(project, template):
+    """Cold rendering: every sample starts with an empty plot cache of the project (never the user's one)."""
+    import plots
+    import xydata
+
+    plots.PLOT_CACHE_DIR = os.path.join(project["root"], "plot-cache")
+    shutil.rmtree(plots.PLOT_CACHE_DIR, ignore_errors=True)
+    # Sidecars of the XY data would make later samples read binary data instead of parsing the exports
+    for variant in project["variants"]:
+        for path in glob.glob(os.path.join(glob.escape(variant), "PICTURES", "*")):
+            if xydata.is_sidecar(os.path.basename(path)):
+                os.unlink(path)
+
+    pr = _presentation(project, template)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _timed(pr.plot_gradients)
+
+
+def run_size(name: str, params: dict, template: str, benchmarks, repeat: int) -> dict:
+    """Generate project of one size and return median time of every benchmark."""
+    with tempfile.TemporaryDirectory(prefix="cfd_agp_bench_") as root:
+        start = time.perf_counter()
+        project = synthetic.generate_project(root, template=template, **params)
+        print("[{}] project generated in {:.1f} s".format(name, time.perf_counter() - start))
+
+        cwd = os.getcwd()
+        os.chdir(root)  # plot_gradients saves plots into working directory
+        try:
+            timings = {}
+            for bench in benchmarks:
+                fn = globals()["bench_" + bench]
+                samples = [fn(project, template) for _ in range(repeat)]
+                timings[bench] = {"median": statistics.median(samples), "min": min(samples), "samples": samples}
+                print("[{}] {:<20} {:8.3f} s".format(name, bench, timings[bench]["median"]))
+        finally:
+            os.chdir(cwd)
+
+    return {"size": name, "params": dict(params, image_size=list(params["image_size"])), "timings": timings}
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+    except OSError:
+        return ""
+    return out.stdout.strip()
+
+
+def compare(results: dict, baseline: dict):
+    """Print median times against baseline results of the same sizes."""
+    previous = {res["size"]: res["timings"] for res in baseline["results"]}
+    print("\n{:<8} {:<20} {:>10} {:>10} {:>8}".format("size", "benchmark", "baseline", "current", "ratio"))
+    for res in results["results"]:
+        for bench, timing in res["timings"].items():
+            old = previous.get(res["size"], {}).get(bench)
+            if old is None:
+                continue
+            print(
+                "{:<8} {:<20} {:>9.3f}s {:>9.3f}s {:>7.2f}x".format(
+                    res["size"], bench, old["median"], timing["median"], timing["median"] / old["median"]
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cfd_agp on synthetic projects")
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small"], help="Size sweep")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of every benchmark, median is reported")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Template pptx")
+    parser.add_argument("--output", help="Save results to JSON file")
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="Compare with previously saved results")
+    args = parser.parse_args()
+
+    # Keep per-slide logging of the tool out of the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    import evePresentation
+
+    evePresentation.logger.setLevel(logging.WARNING)
+
+    results = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": [run_size(size, SIZES[size], args.template, args.benchmarks, args.repeat) for size in args.sizes],
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Results saved to: {}".format(os.path.abspath(args.output)))
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Generator of synthetic cfd_agp projects (variant folders, PICTURES, slides and settings cfg)"""
+import argparse
+import configparser
+import os
+
+import numpy as np
+from PIL import Image
+
+# Layouts used for generated slides: (layout, images per slide, has fringebar)
+SLIDE_LAYOUTS = ((4, 2, True), (2, 1, True), (5, 2, False), (3, 1, False), (6, 2, False))
+
+
+def write_image(path: str, size: tuple, seed: int, quality: int = 90):
+    """Smooth colour field with some noise, compresses about like a CFD post-processing picture."""
+    rng = np.random.default_rng(seed)
+    small = rng.random((9, 16, 3)) * 255
+    img = Image.fromarray(small.astype("uint8")).resize(size, Image.BICUBIC)
+    noise = rng.normal(0, 6, (size[1], size[0], 3))
+    pixels = np.clip(np.asarray(img, dtype=np.float64) + noise, 0, 255).astype("uint8")
+    Image.fromarray(pixels).save(path, quality=quality)
+
+
+def write_grad_station(path: str, points: int, seed: int):
+    """Ux_GRAD_x.xxx extraction line: $ comments, (distance, grad) and (z, grad) rows per point, footer."""
+    rng = np.random.default_rng(seed)
+    dist = np.linspace(0.0, 0.3, points)
+    zcoord = np.linspace(0.6, 0.8, points)
+    grad = np.sin(dist * 60 + rng.random() * 6) * 20000 + rng.normal(0, 50, points)
+    rows = np.empty((2 * points, 2))
+    rows[0::2, 0], rows[1::2, 0] = dist, zcoord
+    rows[0::2, 1] = rows[1::2, 1] = grad
+    with open(path, "w") as f:
+        f.write("$ Synthetic extraction line\n$ dist|z, Ux gradient\n")
+        np.savetxt(f, rows, fmt="%.9g", delimiter=", ")
+        f.write("END\n")
+
+
+def write_plane(path: str, shape: tuple, seed: int):
+    """Slice plane export: $ comments, (x, z, Ux gradient) rows of a (nx, nz) grid, footer."""
+    rng = np.random.default_rng(seed)
+    x, z = np.meshgrid(np.linspace(0.655, 0.8, shape[0]), np.linspace(0.6, 0.8, shape[1]), indexing="ij")
+    grad = np.sin(z * 300 + x * 20 + rng.random() * 6) * 20000 + rng.normal(0, 50, x.shape)
+    with open(path, "w") as f:
+        f.write("$ Synthetic slice plane\n$ x, z, Ux gradient\n")
+        np.savetxt(f, np.column_stack([x.ravel(), z.ravel(), grad.ravel()]), fmt="%.9g", delimiter=", ")
+        f.write("END\n")
+
+
+def write_xy_plot(path: str, points: int, seed: int):
+    """XY export in the "(X axis) ..." / "(Y axis) ..." format read by plot_gradients."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.6, 0.9, points)
+    y = np.sin(x * 40 + rng.random()) * 30 + rng.normal(0, 0.2, points)
+    with open(path, "w") as f:
+        f.write("Synthetic XY plot\n(X axis) Z [m]\n(Y axis) Ux [m/s]\n")
+        for x_val, y_val in zip(x, y):
+            f.write(" {:.6f}, {:.6f}\n".format(x_val, y_val))
+
+
+def generate_project(
+    root: str,
+    variants: int = 3,
+    slides: int = 10,
+    image_size: tuple = (1920, 1080),
+    stations: int = 10,
+    points: int = 1000,
+    plots: int = 3,
+    plot_points: int = 1000,
+    template: str = None,
+    plane: tuple = (100, 500),
+) -> dict:
+    """Create a project in root and return paths of its parts: variants, slides_cfg, settings_cfg, grad_file...
+
+    plane is the (x, z) grid of the slice plane export (plane_file) of the first variant.
+    """
+    os.makedirs(root, exist_ok=True)
+    slides_cfg = configparser.ConfigParser()
+    slides_cfg["User Settings"] = {"author": "Benchmark"}
+    slides_cfg["Plots"] = {"plot_{:02d}".format(num): "Ux_z_distance_{:03d}".format(num) for num in range(plots)}
+
+    pictures = []
+    for num in range(slides):
+        layout, count, has_fringebar = SLIDE_LAYOUTS[num % len(SLIDE_LAYOUTS)]
+        images = ["IMG{:03d}-{}.jpeg".format(num, idx) for idx in range(count)]
+        section = {"title": "SLIDE {}".format(num), "layout": str(layout), "images": ", ".join(images)}
+        pictures.extend(images)
+        if has_fringebar:
+            section["fringebar"] = "fringebar-{:03d}.jpeg".format(num)
+            pictures.append(section["fringebar"])
+        slides_cfg["Slide {}".format(num + 3)] = section
+
+    variant_paths = []
+    for var in range(variants):
+        var_path = os.path.join(root, "V{:02d}-SYNTHETIC".format(var))
+        pictures_dir = os.path.join(var_path, "PICTURES")
+        os.makedirs(pictures_dir, exist_ok=True)
+        variant_paths.append(var_path)
+
+        for idx, name in enumerate(pictures):
+            size = (72, 324) if name.startswith("fringebar") else image_size
+            write_image(os.path.join(pictures_dir, name), size, seed=var * 100003 + idx)
+        for station in range(stations):
+            name = "Ux_GRAD_{:.3f}".format(0.655 + station * 0.145 / max(stations - 1, 1))
+            write_grad_station(os.path.join(pictures_dir, name), points, seed=var * 1009 + station)
+        for num in range(plots):
+            name = "Ux_z_distance_{:03d}".format(num)
+            write_xy_plot(os.path.join(pictures_dir, name), plot_points, seed=var * 10007 + num)
+
+    plane_path = os.path.join(variant_paths[0], "PICTURES", "Ux_GRAD_plane.csv")
+    write_plane(plane_path, plane, seed=7)
+
+    slides_path = os.path.join(root, "slides.cfg")
+    with open(slides_path, "w") as f:
+        slides_cfg.write(f)
+
+    settings = configparser.ConfigParser(interpolation=None)
+    settings["DEFAULT"] = {"cfg_file": slides_path, "output_pptx": os.path.join(root, "OUTPUT.pptx")}
+    if template:
+        settings["DEFAULT"]["input_pptx"] = template
+    for var, var_path in enumerate(variant_paths):
+        settings["var{}".format(var + 1)] = {"label": "V{:02d}".format(var), "path": var_path}
+    settings_path = os.path.join(root, "settings.cfg")
+    with open(settings_path, "w") as f:
+        settings.write(f)
+
+    return {
+        "root": root,
+        "variants": variant_paths,
+        "slides_cfg": slides_path,
+        "settings_cfg": settings_path,
+        "grad_file": "Ux_GRAD_0.655",
+        "plane_file": plane_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic cfd_agp project")
+    parser.add_argument("root", help="Output folder")
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--slides", type=int, default=10)
+    parser.add_argument("--image_size", type=int, nargs=2, default=(1920, 1080), metavar=("W", "H"))
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--plots", type=int, default=3)
+    parser.add_argument("--plot_points", type=int, default=1000)
+    parser.add_argument("--plane", type=int, nargs=2, default=(100, 500), metavar=("NX", "NZ"))
+    args = parser.parse_args()
+
+    project = generate_project(
+        args.root,
+        variants=args.variants,
+        slides=args.slides,
+        image_size=tuple(args.image_size),
+        stations=args.stations,
+        points=args.points,
+        plots=args.plots,
+        plot_points=args.plot_points,
+        plane=tuple(args.plane),
+    )
+    print("Project generated, build it with: cfd_agp {}".format(project["settings_cfg"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Local SQLite catalog of project trees: variant folders, their PICTURES and exports (crawled in parallel)"""
+import fnmatch
+import os
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import xydata
+from assets import STATION_PATTERN, Asset
+
+DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "catalog.sqlite")
+CRAWL_PARALLEL = 16  # directories listed at once, network file systems serve parallel requests well
+MAX_DEPTH = 6  # levels below the crawled root, variants are not descended into
+IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".gif", ".svg")
+# Bump when stored rows change (file kinds), older catalogs are then crawled again from scratch
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL,
+    variant INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (dir, name)
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+"""
+
+# Result of one directory visit: None subdirs when it did not change since the last crawl
+DirScan = namedtuple("DirScan", ("path", "mtime_ns", "subdirs", "files"))
+
+# Summary of a crawl
+CrawlStats = namedtuple("CrawlStats", ("dirs", "scanned", "variants", "files"))
+
+# Catalogued variant: folder and number of files of every kind in its PICTURES
+VariantInfo = namedtuple("VariantInfo", ("path", "images", "gradients", "xy"))
+
+
+def file_kind(name: str) -> str:
+    """Kind of a PICTURES file: image, gradient (Ux_GRAD_x.xxx station export), xy (plot export) or other.
+
+    Other are XY sidecars, results of the gradient analysis (Ux_GRAD_results_<ZONE>)
+    and other Ux_GRAD files such as slice plane exports (Ux_GRAD_plane.csv).
+    """
+    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+        return "image"
+    if xydata.is_sidecar(name):
+        return "other"
+    if fnmatch.fnmatchcase(name, STATION_PATTERN.format("Ux_GRAD*")):
+        return "gradient"
+    if name.startswith("Ux_GRAD"):
+        return "other"
+    return "xy"
+
+
+def visit(path: str, known_mtime_ns: int = None):
+    """Stat directory and list it only if its mtime differs from known_mtime_ns, None if it is gone.
+
+    Files (with size and mtime) are listed in PICTURES directories only.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        if mtime_ns == known_mtime_ns:
+            return DirScan(path, mtime_ns, None, None)
+        subdirs = []
+        files = {} if os.path.basename(path) == "PICTURES" else None
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif files is not None and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = Asset(stat.st_size, stat.st_mtime_ns)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return DirScan(path, mtime_ns, sorted(subdirs), files)
+
+
+def _subtree(path: str) -> tuple:
+    """Bounds of paths below path for range queries ("0" follows "/")."""
+    return path + "/", path + "0"
+
+
+class Catalog:
+    """Directories and PICTURES files of crawled project trees.
+
+    A directory is listed again only when its mtime changed, that is when
+    entries were added, removed or renamed in it. Files rewritten in place
+    keep the catalogued size and mtime until their directory changes, so
+    the catalog answers which files exist, not whether they changed.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS dirs;")
+            self.db.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _drop(self, path: str):
+        """Remove directory and everything below it."""
+        low, high = _subtree(path)
+        self.db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+        self.db.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (path, low, high))
+
+    def _children(self, path: str) -> list:
+        return [row[0] for row in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (path,))]
+
+    def _store(self, scan: DirScan, parent: str, children: list, variant: bool):
+        self.db.execute(
+            "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns, variant) VALUES (?, ?, ?, ?)",
+            (scan.path, parent, scan.mtime_ns, int(variant)),
+        )
+        for child in set(self._children(scan.path)) - set(children):
+            self._drop(child)
+        if scan.files is not None:
+            self.db.execute("DELETE FROM files WHERE dir = ?", (scan.path,))
+            self.db.executemany(
+                "INSERT INTO files (dir, name, size, mtime_ns, kind) VALUES (?, ?, ?, ?, ?)",
+                [(scan.path, name, asset.size, asset.mtime_ns, file_kind(name)) for name, asset in scan.files.items()],
+            )
+
+    def crawl(self, root: str, parallel: int = CRAWL_PARALLEL, max_depth: int = MAX_DEPTH) -> CrawlStats:
+        """Crawl root with parallel directory visits, unchanged directories are only stat'ed.
+
+        Folders with PICTURES are variants, only their PICTURES is catalogued.
+        Hidden directories are skipped.
+        """
+        root = os.path.abspath(root).rstrip("/") or "/"
+        low, high = _subtree(root)
+        known = dict(
+            self.db.execute(
+                "SELECT path, mtime_ns FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (root, low, high)
+            )
+        )
+        parents = {root: os.path.dirname(root)}
+        visited = set()
+        scanned = 0
+
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            futures = {pool.submit(visit, root, known.get(root)): 0}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = futures.pop(future)
+                    scan = future.result()
+                    if scan is None:
+                        continue
+                    visited.add(scan.path)
+
+                    if scan.subdirs is None:
+                        children = self._children(scan.path)
+                    else:
+                        scanned += 1
+                        is_variant = "PICTURES" in scan.subdirs
+                        if os.path.basename(scan.path) == "PICTURES":
+                            names = []
+                        elif is_variant:
+                            names = ["PICTURES"]
+                        elif depth < max_depth:
+                            names = [name for name in scan.subdirs if not name.startswith(".")]
+                        else:
+                            names = []
+                        children = [os.path.join(scan.path, name) for name in names]
+                        self._store(scan, parents[scan.path], children, is_variant)
+
+                    for child in children:
+                        parents[child] = scan.path
+                        futures[pool.submit(visit, child, known.get(child))] = depth + 1
+
+        # Directories which disappeared or are no longer crawled
+        for path in set(known) - visited:
+            self._drop(path)
+        self.db.commit()
+
+        variants, files = self.db.execute(
+            "SELECT COUNT(*), (SELECT COUNT(*) FROM files WHERE dir >= ? AND dir < ?) "
+            "FROM dirs WHERE variant = 1 AND (path = ? OR (path >= ? AND path < ?))",
+            (low, high, root, low, high),
+        ).fetchone()
+        return CrawlStats(len(visited), scanned, variants, files)
+
+    def variants(self, pattern: str = "*") -> list:
+        """Catalogued variants whose folder matches the glob pattern (whole path, or folder name if no "/")."""
+        found = []
+        rows = self.db.execute(
+            "SELECT d.path, "
+            "SUM(f.kind = 'image'), SUM(f.kind = 'gradient'), SUM(f.kind = 'xy') "
+            "FROM dirs d LEFT JOIN files f ON f.dir = d.path || '/PICTURES' "
+            "WHERE d.variant = 1 GROUP BY d.path ORDER BY d.path"
+        )
+        for path, *counts in rows:
+            name = path if "/" in pattern else os.path.basename(path)
+            if fnmatch.fnmatchcase(name, pattern):
+                found.append(VariantInfo(path, *(count or 0 for count in counts)))
+        return found
+
+    def listing(self, directory: str):
+        """Catalogued {name: Asset} of directory, None if it is not catalogued or changed since the crawl.
+
+        Size and mtime are those of the crawl (see Catalog), stat files whose content matters.
+        """
+        directory = os.path.abspath(directory)
+        row = self.db.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (directory,)).fetchone()
+        try:
+            if row is None or os.stat(directory).st_mtime_ns != row[0]:
+                return None
+        except OSError:
+            return None
+        rows = self.db.execute("SELECT name, size, mtime_ns FROM files WHERE dir = ?", (directory,))
+        return {name: Asset(size, mtime_ns) for name, size, mtime_ns in rows}
+
+
+def expand_variants(variants: list, catalog: Catalog) -> list:
+    """Replace glob patterns among variant paths by matching catalogued variants, other entries are kept.
+
+    Variants below the current directory are given relative, as if typed.
+    """
+    cwd = os.getcwd()
+    expanded = []
+    for var in variants:
+        if isinstance(var, str) and not os.path.isdir(var) and any(char in var for char in "*?["):
+            # Relative patterns are relative to the current directory, as a shell glob
+            found = [info.path for info in catalog.variants(os.path.abspath(var))]
+            inside = cwd.rstrip("/") + "/"
+            # Pattern without match is kept, add_variants reports it as missing
+            expanded.extend([os.path.relpath(path) if path.startswith(inside) else path for path in found] or [var])
+        else:
+            expanded.append(var)
+    return expanded
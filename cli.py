@@ -1,6 +1,9 @@
 import argparse
+import configparser
 import os
 
+import staging
+
 __version__ = 20170404
 
 
@@ -9,7 +12,9 @@ def get_parser():
     parser = argparse.ArgumentParser()
     parser.formatter_class = CustomHelpFormatter
     parser.description = """
-    Make CFD presentation for comparison up to three variants.
+    Make CFD presentation for comparison of variants.
+    Up to three variants fit on one slide, with more variants every slide
+    is paged and the first variant (baseline) is shown on every page.
 
     Script has to be launched in the FOLDER with VARIANTS.
     Example:
@@ -88,6 +93,23 @@ def get_parser():
         help="Plot n-graphs depending on user setting in section [Graphs]\n",
     )
 
+    parser.add_argument(
+        "--plot_format",
+        dest="plot_format",
+        choices=("png", "svg"),
+        default="png",
+        help="Output format of --plots\n",
+    )
+
+    parser.add_argument(
+        "--plot_dpi",
+        dest="plot_dpi",
+        metavar="DPI",
+        type=int,
+        default=None,
+        help="DPI of --plots (default: as sharp as the widest picture placeholder of the template shows)\n",
+    )
+
     parser.add_argument(
         "-g",
         dest="gradients",
@@ -96,6 +118,192 @@ def get_parser():
         help="Plot gradients from all files named by the first selected file. (UX_GRAD_0.655)\n",
     )
 
+    parser.add_argument(
+        "--sweep",
+        dest="sweep",
+        action="store_true",
+        help="With -g: analyse gradients of all stations in all selected variants in parallel\n",
+    )
+
+    parser.add_argument(
+        "--results_db",
+        dest="results_db",
+        metavar="DB",
+        type=str,
+        default=None,
+        help="SQLite store of gradient results, unchanged stations are not analysed again\n"
+        "(default: ~/.cache/cfd_agp/gradients.sqlite)\n",
+    )
+
+    parser.add_argument(
+        "--plane",
+        dest="plane",
+        metavar="SLICE_FILE",
+        type=str,
+        default=None,
+        help="Analyse gradients of a whole slice plane export (x, z, value rows) with a heat map\n",
+    )
+
+    parser.add_argument(
+        "--crawl",
+        dest="crawl",
+        metavar="ROOT",
+        nargs="+",
+        default=None,
+        help="Crawl project trees into the variant catalog (incremental, only changed folders are listed)\n",
+    )
+
+    parser.add_argument(
+        "--find",
+        dest="find",
+        metavar="PATTERN",
+        type=str,
+        default=None,
+        help="List catalogued variants matching glob PATTERN (folder name, or path if it contains /)\n",
+    )
+
+    parser.add_argument(
+        "--catalog",
+        dest="catalog",
+        action="store_true",
+        help="Expand variant glob patterns and check PICTURES from the variant catalog (see --crawl)\n",
+    )
+
+    parser.add_argument(
+        "--catalog_db",
+        dest="catalog_db",
+        metavar="DB",
+        type=str,
+        default=None,
+        help="SQLite variant catalog (default: ~/.cache/cfd_agp/catalog.sqlite)\n",
+    )
+
+    parser.add_argument(
+        "--export_xlsx",
+        dest="export_xlsx",
+        metavar="XLSX",
+        type=str,
+        default=None,
+        help="Export stored gradient results (of selected variants, or all) to xlsx file\n",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="workers",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Number of worker processes for parallel tasks (default: number of CPUs)\n",
+    )
+
+    parser.add_argument(
+        "--image_dpi",
+        dest="image_dpi",
+        metavar="DPI",
+        type=int,
+        default=None,
+        help="Downscale images to the size of their placeholder at DPI before inserting (default: original images)\n",
+    )
+
+    parser.add_argument(
+        "--image_cache",
+        dest="image_cache",
+        metavar="DIR",
+        type=str,
+        default=None,
+        help="Directory for prepared images (default: ~/.cache/cfd_agp/images)\n",
+    )
+
+    parser.add_argument(
+        "--prefetch",
+        dest="prefetch",
+        metavar="N",
+        type=int,
+        nargs="?",
+        const=staging.PREFETCH_PARALLEL,
+        default=None,
+        help="Copy all images to local staging directory with N parallel fetches before building\n",
+    )
+
+    parser.add_argument(
+        "--stage_dir",
+        dest="stage_dir",
+        metavar="DIR",
+        type=str,
+        default=None,
+        help="Local staging directory for --prefetch (default: ~/.cache/cfd_agp/staging)\n",
+    )
+
+    parser.add_argument(
+        "--parallel",
+        dest="parallel",
+        action="store_true",
+        help="Build slides and compress the output with -j workers (same output as serial build)\n",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help="Rebuild only slides that changed since the last build of the output presentation\n",
+    )
+
+    parser.add_argument(
+        "--stream",
+        dest="stream",
+        action="store_true",
+        help="Write images to output while slides are built (low memory), JPEG/PNG stored uncompressed\n",
+    )
+
+    parser.add_argument(
+        "--lite",
+        dest="lite",
+        action="store_true",
+        help="Also save a lite review deck OUTPUT-lite.pptx (smaller images) from the same build\n",
+    )
+
+    parser.add_argument(
+        "--lite_budget",
+        dest="lite_budget",
+        metavar="MB",
+        type=float,
+        default=None,
+        help="Maximum size of the --lite deck, image resolution and quality are lowered to fit (default: 10 MB)\n",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        metavar="REPORT.json",
+        type=str,
+        default=None,
+        help="Write timing report (phases, counts, bytes read, wall time, peak RSS) to JSON file\n",
+    )
+
+    parser.add_argument(
+        "--profile_stats",
+        dest="profile_stats",
+        metavar="STATS.pstats",
+        type=str,
+        default=None,
+        help="With --profile: also dump cProfile statistics (python -m pstats STATS.pstats)\n",
+    )
+
+    parser.add_argument(
+        "--batch",
+        dest="batch",
+        action="store_true",
+        help="Build one presentation per settings cfg file (VARIANT = list or glob of settings files)\n",
+    )
+
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        help="Keep running and rebuild (incremental, streamed) when config, settings or PICTURES change\n",
+    )
+
     parser.add_argument(
         "--show_placeholders",
         dest="show_placeholders",
@@ -113,6 +321,17 @@ def get_parser():
     return parser
 
 
+def read_settings(settings_file, args):
+    """Fill args from global settings cfg file: [DEFAULT] paths and one section per variant."""
+    config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
+    config.read(settings_file)
+    args.variants = [config[section] for section in config.sections()]
+    args.cfg_file = config.get("DEFAULT", "cfg_file", fallback=args.cfg_file)
+    args.input_pptx = config.get("DEFAULT", "input_pptx", fallback=args.input_pptx)
+    args.output_pptx = config.get("DEFAULT", "output_pptx", fallback=args.output_pptx)
+    return args
+
+
 class CustomHelpFormatter(argparse.ArgumentDefaultsHelpFormatter, argparse.RawTextHelpFormatter):
     """ArgParse custom formatter that has LONGER LINES and RAW DescriptionHelp formatting."""
 
@@ -1,42 +1,24 @@
 """Evektor library for all things"""
-import collections
 import csv
-import glob
+import io
+import itertools
 import os
 import sys
+import tempfile
 from collections import namedtuple
 
 import colorlog
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
 import pptx
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
-from pptx.util import Pt
-
-formatter = colorlog.ColoredFormatter(
-    "%(log_color)s%(levelname)-8s%(reset)s %(message_log_color)s%(message)s",
-    datefmt=None,
-    reset=True,
-    log_colors={
-        "CRITICAL": "bold_red",
-        "ERROR": "red",
-        "WARNING": "yellow",
-        "INFO": "green",
-        "DEBUG": "cyan",
-    },
-    secondary_log_colors={
-        "message": {
-            "CRITICAL": "bold_red",
-            "ERROR": "red",
-            "WARNING": "yellow",
-            "INFO": "white",
-            "DEBUG": "cyan",
-        }
-    },
-    # style='%',
-)
+from pptx.opc.packuri import PackURI
+from pptx.util import Emu, Pt
+
+import assets
+import layouts
+import manifest
+import profiler
+from log import formatter
 
 # Initialize LOGGER
 handler = colorlog.StreamHandler()
@@ -45,41 +27,78 @@ logger = colorlog.getLogger(__name__)
 logger.addHandler(handler)
 logger.setLevel("INFO")
 
+# Result of gradients_from_file: {zone: sorted (x, max |slope|) pairs} and crossings of every station
+GradientResult = namedtuple("GradientResult", ("maxima", "crossings"))
 
-class Line:
-    def __init__(self, x1, y1, x2, y2):
-        self.x1 = x1
-        self.y1 = y1
-        self.x2 = x2
-        self.y2 = y2
-        self.m, self.b = np.polyfit([x1, x2], [y1, y2], 1)
-
-    def get_z(self, coord_x):
-        x = float(coord_x)
-        return self.m * x + self.b
+# Line styles of zones in gradient sweep plots
+LINE_STYLES = ("-", "--", "-.", ":")
 
 
 class Presentation:
-    def __init__(self, src_prs_path: str):
+    def __init__(self, src_prs_path: str, blobs=None):
         logger.info("Loading template: {}".format(src_prs_path))
-        self.prs = pptx.Presentation(src_prs_path)
+        self.src_prs_path = src_prs_path
+        self.blobs = blobs  # optional assets.BlobCache shared with other presentations
+        self.pinned_dir = None  # only images from this directory are kept in blobs (PICTURES of a paged baseline)
+        # A shared template is read (and counted) by the BlobCache
+        with profiler.phase("template_load", src_prs_path, 0 if blobs else profiler.file_size(src_prs_path)):
+            self.prs = pptx.Presentation(blobs.open(src_prs_path) if blobs else src_prs_path)
+        with profiler.phase("layouts", src_prs_path):
+            self.layouts = layouts.load_layouts(src_prs_path, self.prs)
+        # Layouts of the first slide master, numbered as prs.slide_layouts (layout = N in slides config)
+        self.layout_map = {layout.num: layout for layout in self.layouts if layout.master == 0}
         self.slides = []
         self.variants = []
         self.conf = None
+        self.config_file = None
+        self.prepared_images = {}
+        self.staged_images = {}
+        self.image_parts = None  # parallel.LoadedImageParts of parallel build
+        self.parallel = False
+        self.workers = None
+        self.assets = assets.AssetIndex()
+        self.catalog = None  # catalog.Catalog used for existence checks (--catalog)
+        self.manifest = None
+        self.writer = None
+        self.lite = None  # lite.LiteImages of the lite review deck (--lite)
+        self.plot_blobs = {}  # {(section, page): [(placeholder idx, rendered plot)]} of plot slides
         self.one_image_slides = [2, 3]
         self.two_images_slides = [4, 5, 6, 7, 8, 9, 10, 11]
+        self.fringebar_slides = [2, 4, 10, 11]
+        self.variants_per_slide = 3
 
     def load_config(self, config_file):
         logger.info("Loading slides configuration: {}".format(config_file))
         import configparser
 
         conf = configparser.ConfigParser()
-        conf.read(config_file)
+        with profiler.phase("config", config_file, profiler.file_size(config_file)):
+            conf.read(config_file)
         self.conf = conf
+        self.config_file = config_file
+
+    def zones(self) -> list:
+        """Zones of [Zones] (name = x z, x z, x z[, ...] polygon in x-z), gradients.DEFAULT_ZONES without it."""
+        import configparser
+
+        import gradients
+
+        if self.conf is None or not self.conf.has_section("Zones"):
+            return list(gradients.DEFAULT_ZONES)
+
+        # Zone names keep their case, options of self.conf are lower case
+        conf = configparser.ConfigParser()
+        conf.optionxform = str
+        conf.read(self.config_file)
+        try:
+            return [gradients.parse_zone(name, value) for name, value in conf.items("Zones")]
+        except ValueError as err:
+            logger.critical("{} in [Zones] of {}. Fix the config file.".format(err, self.config_file))
+            sys.exit()
 
     def add_variants(self, variants: list):
-        if len(variants) not in range(1, 4):
-            raise Exception("Only 1-3 variants possible for now...\n")
+        if len(variants) < 1:
+            raise Exception("At least 1 variant has to be specified...\n")
 
         for var in variants:
             # Create a NamedTuple
@@ -116,9 +135,8 @@ class Presentation:
     def get_num_of_slides(self) -> int:
         return len(self.prs.slides)
 
-    def process_slides(self):
-        author = self.conf.get("User Settings", "author")
-
+    def slide_sections(self):
+        """Yield (section, title, layout_num, fringebar, images) of every [Slide N] section."""
         for section in self.conf.sections():  # nebo: self.conf.sections()[1:]
             if not self.conf.has_option(section, "layout"):
                 continue
@@ -130,177 +148,609 @@ class Presentation:
             title = conf.get("title", "{} TITLE MISSING".format(section))
             layout_num = int(conf.get("layout", 2))
             fringebar = conf.get("fringebar", None)
-            images = conf.get("images", []).replace(" ", "").split(",")
+            images = conf.get("images", "").replace(" ", "").split(",")
+            # Plot slides show rendered [Plots] instead of images
+            if "plots" in conf:
+                images = []
+
+            yield section, title, layout_num, fringebar, images
+
+    def slide_plots(self, section: str) -> list:
+        """Return data file names of plots = [Plots] option or data file name, ... of the section."""
+        if not self.conf.has_option(section, "plots"):
+            return []
+        names = [name for name in self.conf.get(section, "plots").replace(" ", "").split(",") if name]
+        return [self.conf.get("Plots", name) if self.conf.has_option("Plots", name) else name for name in names]
+
+    def plot_jobs(self, layout_num: int, plot_names: list, variants: list) -> list:
+        """Return [(placeholder idx, plots.PlotJob)] of one plot slide, each figure has the size of its placeholder.
+
+        Plots fill picture placeholders from the first image one, variants
+        without the plot data are left out (preflight reports them).
+        """
+        import plots
+
+        jobs = []
+        for num, name in enumerate(plot_names):
+            ph_idx = layouts.IMAGE_IDX + num
+            ph = self.layout_map[layout_num].placeholders.get(ph_idx)
+            series = [(variant.num, plot_datafile(variant, name)) for variant in variants]
+            series = [(label, datafile) for label, datafile in series if self.assets.exists(datafile)]
+            if ph is None or not ph.picture or not series:
+                continue
+            size = (Emu(ph.width).inches, Emu(ph.height).inches)
+            jobs.append((ph_idx, plots.PlotJob(name=name, series=series, output=name + ".png", size=size)))
+        return jobs
+
+    def variant_pages(self) -> list:
+        """Split variants into groups shown on one slide each.
+
+        Up to variants_per_slide variants fit on one slide. With more variants,
+        the first one (baseline) is pinned to every page and the rest is paged.
+        """
+        if len(self.variants) <= self.variants_per_slide:
+            return [self.variants]
+        baseline, others = self.variants[0], self.variants[1:]
+        step = self.variants_per_slide - 1
+        return [[baseline] + others[idx : idx + step] for idx in range(0, len(others), step)]
+
+    def slide_targets(self, layout_num: int, images: list, fringebar: str, variants=None) -> list:
+        """Return [(placeholder idx, image path, crop)] of all pictures of one slide including its fringebar.
+
+        Without variants, targets of all pages of the section are returned.
+        """
+        pages = [variants] if variants is not None else self.variant_pages()
+        targets = []
+        for page in pages:
+            targets.extend(image_targets(self, layout_num, images, page))
+        if fringebar is not None and layout_num in self.fringebar_slides and self.variants:
+            targets.append((layouts.FRINGEBAR_IDX, fringebar_path(self, fringebar), True))
+        return list(dict.fromkeys(targets))
+
+    def index_assets(self):
+        """Scan PICTURES of every variant once, all later existence checks use this index."""
+        self.assets = assets.AssetIndex(
+            (os.path.join(variant.fullpath, "PICTURES") for variant in self.variants), catalog=self.catalog
+        )
+
+    def preflight(self) -> list:
+        """Check every [Slide N] section against the template and asset index, return all problems found."""
+        problems = []
+        for section, title, layout_num, fringebar, images in self.slide_sections():
+            if layout_num not in self.layout_map:
+                problems.append(
+                    assets.Problem("critical", section, "Layout[{}] does not exist in template.".format(layout_num))
+                )
+                continue
 
-            # Add slide as object
-            slide_layout = self.prs.slide_layouts[layout_num]
-            pptx_slide = self.prs.slides.add_slide(slide_layout)
+            # Number of images has to fit the layout (plot slides have none)
+            plot_names = self.slide_plots(section)
+            if plot_names:
+                expected = None
+            elif layout_num in self.one_image_slides and len(images) > 1:
+                expected = "Should be [1 image]"
+            elif layout_num in self.two_images_slides and len(images) < 2:
+                expected = "Should be [2 images]"
+            elif layout_num == 13 and len(images) < 6:
+                expected = "Should be [6 images]"
+            else:
+                expected = None
+            if expected:
+                problems.append(
+                    assets.Problem(
+                        "critical",
+                        section,
+                        "You've specified [{} image(s)] for layout[{}]. {}. Fix the config file.".format(
+                            len(images), layout_num, expected
+                        ),
+                    )
+                )
+                continue
 
-            self.slides.append(pptx_slide)
-            logger.info("Adding slide {}".format(self.get_num_of_slides()))
-            logger.debug(
-                "Variables: \nTitle: {} \nLayout: {} \nFringebar: {} \nImages: {}".format(
-                    title, layout_num, fringebar, images
+            # Fringebar rules
+            if layout_num in self.fringebar_slides and fringebar is None:
+                problems.append(
+                    assets.Problem(
+                        "critical",
+                        section,
+                        "Layout[{}] has to have fringebar but none was specified in config file.".format(layout_num),
+                    )
                 )
+            elif layout_num not in self.fringebar_slides and fringebar is not None:
+                problems.append(
+                    assets.Problem(
+                        "error", section, "Layout[{}] should not have FRINGEBAR assigned.".format(layout_num)
+                    )
+                )
+
+            # Placeholders and files
+            placeholders = self.layout_map[layout_num].placeholders
+            for ph_idx, img_path, crop in self.slide_targets(layout_num, images, fringebar):
+                if ph_idx not in placeholders or not placeholders[ph_idx].picture:
+                    problems.append(
+                        assets.Problem(
+                            "error",
+                            section,
+                            "Layout[{}] has no picture placeholder Id[{}] for {}.".format(
+                                layout_num, ph_idx, os.path.basename(img_path)
+                            ),
+                        )
+                    )
+                elif not self.assets.exists(img_path):
+                    problems.append(
+                        assets.Problem(
+                            "warning" if ph_idx == layouts.FRINGEBAR_IDX else "error",
+                            section,
+                            "{}: {} does not exist in \n         {}".format(
+                                "Fringebar" if ph_idx == layouts.FRINGEBAR_IDX else "Image",
+                                os.path.basename(img_path),
+                                os.path.dirname(img_path),
+                            ),
+                        )
+                    )
+
+            # Plots and their data in every variant
+            if plot_names and self.conf.has_option(section, "images"):
+                problems.append(assets.Problem("warning", section, "Images are not shown on slides with plots."))
+            for num, name in enumerate(plot_names):
+                ph = placeholders.get(layouts.IMAGE_IDX + num)
+                if ph is None or not ph.picture:
+                    problems.append(
+                        assets.Problem(
+                            "error",
+                            section,
+                            "Layout[{}] has no picture placeholder Id[{}] for plot {}.".format(
+                                layout_num, layouts.IMAGE_IDX + num, name
+                            ),
+                        )
+                    )
+                for variant in self.variants:
+                    datafile = plot_datafile(variant, name)
+                    if not self.assets.exists(datafile):
+                        problems.append(
+                            assets.Problem(
+                                "error",
+                                section,
+                                "Plot data: {} does not exist in \n         {}".format(name, os.path.dirname(datafile)),
+                            )
+                        )
+
+        return problems
+
+    def placeholder_size(self, layout_num: int, ph_idx: int):
+        """Return (width, height) in EMU of placeholder ph_idx in layout layout_num (None if not found)."""
+        ph = self.layout_map[layout_num].placeholders.get(ph_idx)
+        return (ph.width, ph.height) if ph is not None else None
+
+    def stage_images(self, parallel=None, stage_dir=None, sections=None):
+        """Copy every image used by the slides (or only given sections) to local staging directory concurrently."""
+        import staging
+
+        files = {}
+        for section, title, layout_num, fringebar, images in self.slide_sections():
+            if sections is not None and section not in sections:
+                continue
+            for ph_idx, img_path, crop in self.slide_targets(layout_num, images, fringebar):
+                asset = self.assets.get(img_path)
+                if asset is not None:
+                    files[img_path] = asset
+
+        nbytes = sum(asset.size for asset in files.values())
+        logger.info("Prefetching {} images ({:.1f} MB)".format(len(files), nbytes / 1024**2))
+        stage = staging.StagingArea(stage_dir)
+        self.staged_images = staging.prefetch(files, stage=stage, parallel=parallel or staging.PREFETCH_PARALLEL)
+
+    def local_image(self, img_path: str) -> str:
+        """Return staged local copy of img_path, or img_path itself if it was not prefetched."""
+        return self.staged_images.get(img_path, img_path)
+
+    def prepare_images(self, dpi, cache_dir=None, workers=None, sections=None):
+        """Resample every image used by the slides (or only given sections) to the size of its placeholder at DPI."""
+        import images as image_prep
+
+        jobs = []
+        for section, title, layout_num, fringebar, images in self.slide_sections():
+            if sections is not None and section not in sections:
+                continue
+            for ph_idx, img_path, crop in self.slide_targets(layout_num, images, fringebar):
+                size = self.placeholder_size(layout_num, ph_idx)
+                if size is not None and self.assets.exists(img_path):
+                    jobs.append((self.local_image(img_path), size))
+
+        logger.info("Preparing {} images at {} DPI".format(len(set(jobs)), dpi))
+        cache = image_prep.ImageCache(cache_dir)
+        self.prepared_images = image_prep.prepare_images(jobs, dpi=dpi, cache=cache, workers=workers)
+
+    def image_file(self, img_path: str, layout_num: int, ph_idx: int) -> str:
+        """Return prepared (resampled) image for the placeholder if there is one, else the (staged) source image."""
+        local = self.local_image(img_path)
+        return self.prepared_images.get((local, self.placeholder_size(layout_num, ph_idx)), local)
+
+    def resolve_image(self, img_path: str, layout_num: int, ph_idx: int):
+        """Return image_file as inserted into the placeholder: shared blob or path."""
+        picture = self.image_file(img_path, layout_num, ph_idx)
+        if self.blobs:
+            keep = self.pinned_dir is None or os.path.dirname(img_path) == self.pinned_dir
+            return self.blobs.open(picture, keep)
+        return picture
+
+    def render_slide_plots(self, pages: list, image_dpi=None, workers=None, sections=None):
+        """Render plots of plot slides (or only given sections) in memory for every page of variants.
+
+        Figures are rendered at image_dpi (default images.IMAGE_DPI) in the size
+        of their placeholders, so they are inserted without scaling.
+        """
+        targets = []
+        for section, title, layout_num, fringebar, images in self.slide_sections():
+            if sections is not None and section not in sections:
+                continue
+            plot_names = self.slide_plots(section)
+            for page_num, variants in enumerate(pages if plot_names else []):
+                for ph_idx, job in self.plot_jobs(layout_num, plot_names, variants):
+                    targets.append(((section, page_num), ph_idx, job))
+
+        self.plot_blobs = {}
+        if not targets:
+            return
+
+        import images as image_prep
+        import plots
+
+        dpi = image_dpi or image_prep.IMAGE_DPI
+        logger.info("Rendering {} plots at {} DPI".format(len(targets), dpi))
+        cache = image_prep.ImageCache(plots.PLOT_CACHE_DIR)
+        rendered = plots.render_plot_blobs([job for key, ph_idx, job in targets], workers=workers, dpi=dpi, cache=cache)
+        for (key, ph_idx, job), (blob, crossings) in zip(targets, rendered):
+            self.plot_blobs.setdefault(key, []).append((ph_idx, blob))
+
+    def slide_fingerprints(self, image_dpi=None) -> dict:
+        """Fingerprint of every [Slide N] section: its settings, variants and (path, size, mtime) of used images."""
+        author = self.conf.get("User Settings", "author")
+        variants = [[variant.name, variant.num, variant.fullpath] for variant in self.variants]
+
+        fingerprints = {}
+        for section, title, layout_num, fringebar, images in self.slide_sections():
+            files = []
+            for ph_idx, img_path, crop in self.slide_targets(layout_num, images, fringebar):
+                asset = self.assets.get(img_path)
+                files.append([img_path, ph_idx] + (list(asset) if asset else [None, None]))
+            plot_names = self.slide_plots(section)
+            for name in plot_names:
+                for variant in self.variants:
+                    asset = self.assets.get(plot_datafile(variant, name))
+                    files.append([plot_datafile(variant, name), "plot"] + (list(asset) if asset else [None, None]))
+            fingerprints[section] = manifest.fingerprint(
+                {
+                    "title": title,
+                    "layout": layout_num,
+                    "fringebar": fringebar,
+                    "images": images,
+                    "plots": plot_names,
+                    "author": author,
+                    "variants": variants,
+                    "files": files,
+                    "image_dpi": image_dpi,
+                }
             )
+        return fingerprints
+
+    def replace_slide(self, position: int, slide_layout):
+        """Drop slide at position and add a new one of slide_layout at the same position."""
+        sld_id_lst = self.prs.slides._sldIdLst
+        old = sld_id_lst[position]
+        self.prs.part.drop_rel(old.rId)
+        sld_id_lst.remove(old)
+        if self.image_parts is not None:
+            self.image_parts.reset()
+
+        pptx_slide = self.prs.slides.add_slide(slide_layout)
+        new = sld_id_lst[-1]
+        sld_id_lst.remove(new)
+        sld_id_lst.insert(position, new)
+        return pptx_slide
+
+    def renumber_slide_parts(self):
+        """Give slide parts names matching their order (spliced slides may collide with existing names)."""
+        for num, pptx_slide in enumerate(self.prs.slides, start=1):
+            pptx_slide.part.partname = PackURI("/ppt/slides/slide{}.xml".format(num))
+
+    def add_slide(
+        self, title, layout_num, fringebar, images, author, variants=None, position=None, plots=None, built=None
+    ):
+        # Add slide as object (or replace the one at position)
+        slide_layout = self.prs.slide_layouts[layout_num]
+        if position is None:
+            pptx_slide = self.prs.slides.add_slide(slide_layout)
+            logger.info("Adding slide {}".format(self.get_num_of_slides()))
+        else:
+            pptx_slide = self.replace_slide(position, slide_layout)
+            logger.info("Replacing slide {}".format(position + 1))
 
-            # Slide object: add title, fringebar and images
-            slide = Slide(self, pptx_slide, layout_num)
-            slide.set_title(title)
-            slide.set_author(author)
-            slide.add_fringebar(fringebar)
-            slide.add_images(images)
+        # Slide built by a worker process (parallel.BuiltSlide), take it over
+        if built is not None:
+            import parallel
 
-    def save_presentation(self, output_pres_path):
-        if "/" in output_pres_path:
-            output_path = output_pres_path
-            self.prs.save(output_path)
+            pptx_slide = parallel.merge_slide(pptx_slide, built, self.image_parts)
+            self.slides.append(pptx_slide)
+            return Slide(self, pptx_slide, layout_num, variants)
 
+        self.slides.append(pptx_slide)
+        logger.debug(
+            "Variables: \nTitle: {} \nLayout: {} \nFringebar: {} \nImages: {}".format(
+                title, layout_num, fringebar, images
+            )
+        )
+
+        # Slide object: add title, fringebar and images (or rendered plots)
+        slide = Slide(self, pptx_slide, layout_num, variants)
+        slide.set_title(title)
+        slide.set_author(author)
+        slide.add_fringebar(fringebar)
+        if plots is None:
+            slide.add_images(images)
         else:
-            cur_dir = os.path.realpath(os.path.curdir)
-            output_path = os.path.join(cur_dir, output_pres_path)
-            self.prs.save(output_path)
+            slide.add_plots(plots)
+        return slide
+
+    def process_slides(
+        self,
+        image_dpi=None,
+        image_cache=None,
+        workers=None,
+        incremental_output=None,
+        stream_output=None,
+        prefetch=None,
+        stage_dir=None,
+        parallel=False,
+        lite=False,
+    ):
+        """Build all [Slide N] sections.
+
+        With incremental_output, the deck saved there by a previous run is reused
+        and only slides whose fingerprint changed are rebuilt and spliced in.
+        With stream_output, images are written to that file as soon as their
+        slide is built (save_presentation to the same path finishes the file).
+        With prefetch (number of parallel fetches), all images are first copied
+        to a local staging directory and slides are built from the local copies.
+        With parallel, slides are built by worker processes and merged in order,
+        the output is compressed by worker threads and the result is the same
+        as of a serial build.
+        Plots of slides with plots = ... are rendered in memory and inserted
+        directly, only XY sidecar caches of their data (xydata) are written to
+        PICTURES of the variants.
+        With lite, save_presentation also saves a lite review deck of the same slides.
+        """
+        author = self.conf.get("User Settings", "author")
 
-        logger.info("Presentation saved to: {}".format(output_path))
+        # Pre-flight: report all problems of the whole deck before any slide is built
+        with profiler.phase("preflight"):
+            self.index_assets()
+            problems = self.preflight()
+        for problem in problems:
+            getattr(logger, problem.level)("[{}] {}".format(problem.section, problem.message))
+        critical = [problem for problem in problems if problem.level == "critical"]
+        if critical:
+            logger.critical("Found {} critical problem(s) in config file. Aborting script...".format(len(critical)))
+            sys.exit()
 
-    def output_placeholders_pptx(self, output_pres_path: str):
-        for master_slide in self.prs.slide_masters:
-            for lay_id, layout in enumerate(master_slide.slide_layouts):
-                # if lay_id == 0:
-                #     continue
-                slide = self.prs.slides.add_slide(layout)
-
-                for ph in slide.placeholders:
-                    # TEXT modification
-                    p = ph.text_frame.paragraphs[0]
-                    p.alignment = PP_ALIGN.CENTER
-                    run = p.add_run()
-                    run.font.size = Pt(11)
-                    run.font.bold = True
-
-                    # COLOR modification
-                    ph.fill.solid()
-                    ph.fill.fore_color.rgb = RGBColor(241, 241, 241)
-
-                    if ph.placeholder_format.type == 1:  # TITLE
-                        run.text = "Id[{}]: {} - Layout[{}]: [{}]".format(
-                            ph.placeholder_format.idx, ph.name, lay_id, layout.name
-                        )
-                    else:
-                        run.text = "Id[{}]: {}".format(ph.placeholder_format.idx, ph.name)
+        template = manifest.file_stamp(self.src_prs_path)
+        with profiler.phase("fingerprints"):
+            fingerprints = self.slide_fingerprints(image_dpi)
+        base_slides = self.get_num_of_slides()
+        pages = self.variant_pages()
+        if len(pages) > 1:
+            logger.info("{} variants: every slide is split into {} pages".format(len(self.variants), len(pages)))
+            # Baseline images are inserted on every page, read them only once (other images are read as usual)
+            if self.blobs is None:
+                self.blobs = assets.BlobCache()
+                self.pinned_dir = os.path.join(self.variants[0].fullpath, "PICTURES")
+
+        changed = None
+        if incremental_output:
+            changed = manifest.changed_sections(manifest.load(incremental_output), template, fingerprints, len(pages))
+            if changed is None:
+                logger.info("No reusable previous build of {}, building all slides".format(incremental_output))
+            else:
+                logger.info(
+                    "Reusing {}: {} of {} slides changed".format(incremental_output, len(changed), len(fingerprints))
+                )
+                with profiler.phase("template_load", incremental_output, profiler.file_size(incremental_output)):
+                    self.prs = pptx.Presentation(incremental_output)
 
-        self.prs.save(output_pres_path)
+        if prefetch:
+            with profiler.phase("prefetch"):
+                self.stage_images(prefetch, stage_dir=stage_dir, sections=changed)
 
-    def gradients_from_file(self, grad_file):
-        os.chdir("PICTURES")
-        grad_file_base = "_".join(grad_file.split("_")[0:-1])
-        files = glob.glob("{}_[0-9][.][0-9][0-9][0-9]".format(grad_file_base))
-        line_win = Line(0.655, 0.688, 0.8, 0.696)
-        line_door = Line(0.655, 0.67, 0.8, 0.678)
+        if image_dpi:
+            with profiler.phase("prepare_images"):
+                self.prepare_images(image_dpi, cache_dir=image_cache, workers=workers, sections=changed)
 
-        # NamedTuple for better manipulation with data
-        linetuple = collections.namedtuple("line", ["idx", "dist", "val", "zcoord"])
+        self.parallel = parallel
+        self.workers = workers
 
-        win_dict = {}
-        door_dict = {}
+        with profiler.phase("render_plots"):
+            self.render_slide_plots(pages, image_dpi=image_dpi, workers=workers, sections=changed)
 
-        for file in files:
-            # file = '/ST/SkodaAuto/AEROAKUSTIKA/PRJ/SK370-3/STACIONARNI-VYPOCET/S200-BASIC-MIRROR-DDKM1/PICTURES/Ux_GRAD_0.800'
-            x_coord = file.split("_")[-1]
-            logger.info("Reading file: {}".format(file))
+        if lite:
+            import lite as lite_deck
 
-            # Load data into Pandas DataFrame
-            df = pd.read_table(file, comment="$", delimiter=",", engine="python", skipfooter=1, names=["val", "z"])
-            df_group = df.groupby("z", sort=False).apply(lambda x: tuple(x["val"])).reset_index()
-            res = zip(df_group.get("z").tolist(), df_group.get(0).tolist())
+            self.lite = lite_deck.LiteImages()
 
-            # Create a NamedTuple from loaded data
-            data = [linetuple(idx=idx, val=val, dist=vals[0], zcoord=vals[1]) for idx, (val, vals) in enumerate(res)]
+        if stream_output:
+            import writer
+
+            self.writer = writer.StreamingWriter(resolve_output_path(stream_output))
+
+        # (section, title, layout, fringebar, images, page, plots, position to replace) of every slide to build
+        jobs = []
+        for num, (section, title, layout_num, fringebar, images) in enumerate(self.slide_sections()):
+            if changed is not None and section not in changed:
+                continue
+            plot_slide = bool(self.slide_plots(section))
+            for page_num in range(len(pages)):
+                page_title = title if len(pages) == 1 else "{} ({}/{})".format(title, page_num + 1, len(pages))
+                plots = self.plot_blobs.get((section, page_num), []) if plot_slide else None
+                position = None if changed is None else base_slides + num * len(pages) + page_num
+                jobs.append((section, page_title, layout_num, fringebar, images, page_num, plots, position))
+
+        built_slides = itertools.repeat(None)
+        if parallel and jobs:
+            import parallel as parallel_build
+
+            self.image_parts = parallel_build.install(self.prs.part.package)
+            work = [
+                (title, layout_num, fringebar, images, author, page_num, plots)
+                for section, title, layout_num, fringebar, images, page_num, plots, position in jobs
+            ]
+            built_slides = parallel_build.build_slides(self, work, workers=workers)
+
+        for (section, title, layout_num, fringebar, images, page_num, plots, position), built in zip(
+            jobs, built_slides
+        ):
+            with profiler.phase("slide", "{} {}/{}".format(section, page_num + 1, len(pages))):
+                slide = self.add_slide(
+                    title, layout_num, fringebar, images, author, pages[page_num], position, plots, built
+                )
+            # Images of replaced slides could still be dropped in incremental mode, new decks only
+            if position is None:
+                # Lite images are encoded before streamed images are released, no decoded image is kept
+                if self.writer is not None and self.lite is not None:
+                    with profiler.phase("lite_encode"):
+                        self.lite.collect([slide.slide], workers=workers)
+                if self.writer is not None:
+                    with profiler.phase("stream_media"):
+                        self.writer.flush_media(self.prs.part.package)
+
+        if changed:
+            self.renumber_slide_parts()
+
+        self.manifest = {"template": template, "order": list(fingerprints), "pages": len(pages), "slides": fingerprints}
+
+    def save_presentation(self, output_pres_path, lite_budget=None):
+        """Save the deck (and the lite deck OUTPUT-lite.pptx of at most lite_budget MB if built with lite)."""
+        output_path = resolve_output_path(output_pres_path)
+
+        if self.writer is not None and self.writer.output_path == output_path:
+            with profiler.phase("save") as record:
+                size = record["written"] = self.writer.close(self.prs.part.package)
+            logger.info(
+                "Presentation saved to: {} ({:.1f} MB written, {:.1f} MB of images streamed)".format(
+                    output_path, size / 1024**2, self.writer.media_bytes / 1024**2
+                )
+            )
+            self.writer = None
+        else:
+            # Saved next to the output first, so an interrupted save never leaves a broken deck. The temporary file
+            # is a file of its own, concurrent builds of the same output never write into one
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=os.path.basename(output_path) + ".", suffix=".part", dir=os.path.dirname(output_path)
+            )
+            with profiler.phase("save") as record:
+                try:
+                    os.fchmod(fd, 0o644)
+                    os.close(fd)
+                    if self.parallel:
+                        import parallel
+
+                        parallel.save_package(self.prs.part.package, tmp_path, workers=self.workers)
+                    else:
+                        self.prs.save(tmp_path)
+                    os.replace(tmp_path, output_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+                record["written"] = profiler.file_size(output_path)
+            logger.info("Presentation saved to: {}".format(output_path))
+
+        if self.manifest is not None:
+            manifest.save(output_path, self.manifest)
+
+        if self.lite is not None:
+            self.save_lite(output_path, lite_budget)
+
+    def save_lite(self, output_path: str, budget=None):
+        """Save lite review deck next to output_path, images released by streaming are read from output_path."""
+        import lite
+
+        lite_path = lite.lite_path(output_path)
+        budget = budget or lite.LITE_BUDGET_MB
+        with profiler.phase("lite_encode"):
+            self.lite.collect(self.prs.slides, workers=self.workers, source=output_path)
+        with profiler.phase("lite_save") as record:
+            try:
+                size, (scale, quality) = self.lite.save(
+                    self.prs.part.package, lite_path, budget, workers=self.workers, source=output_path
+                )
+            except ValueError as err:
+                logger.critical("{} in lite presentation {}, it is not saved.".format(err, lite_path))
+                sys.exit()
+            record["written"] = size
+        level = "info" if size <= budget * 1024**2 else "warning"
+        getattr(logger, level)(
+            "Lite presentation saved to: {} ({:.1f} MB of {} MB budget, {:.0f} DPI, quality {})".format(
+                lite_path, size / 1024**2, budget, self.lite.dpi * scale, quality
+            )
+        )
 
-            for idx, line in enumerate(data):
-                # Ignore first and last
-                if idx == 0 or idx == len(data) - 1:
+    def output_placeholders_pptx(self, output_pres_path: str):
+        for layout in self.layouts:
+            # if layout.num == 0:
+            #     continue
+            slide = self.prs.slides.add_slide(self.prs.slide_masters[layout.master].slide_layouts[layout.num])
+            slide_placeholders = {ph.placeholder_format.idx: ph for ph in slide.placeholders}
+
+            for info in layout.placeholders.values():
+                ph = slide_placeholders.get(info.idx)
+                if ph is None:
                     continue
 
-                prev_num = data[idx - 1].val
-                y_num = line.val
-                next_num = data[idx + 1].val
-
-                # Find where it intersect with 0 y axis
-                if prev_num > 0 and y_num < 0 or prev_num < 0 and y_num > 0:
-                    ls = [prev_num, y_num, next_num]
-
-                    # Find the minimum absolute number of found elements
-                    y_num = min([abs(x) for x in ls])
-                    res = [line.idx for line in data if abs(line.val) == abs(y_num) if line.idx != 0]
-
-                    # Edge conditional (it's likely on the edge of line)
-                    if res == []:
-                        continue
-
-                    new_idx = res[0]
-
-                    # Create list of 3 points of lines by updated new_idx, one of each side of the middle y_num
-                    x_coords = [line.dist for line in data[new_idx - 1 : new_idx + 2]]
-                    y_coords = [line.val for line in data[new_idx - 1 : new_idx + 2]]
-
-                    if line.zcoord < line_win.get_z(x_coord) and line.zcoord > line_door.get_z(x_coord):
-                        location = "Lista"
-                        m, b = 0, 0
-
-                    elif line.zcoord >= line_win.get_z(x_coord):
-                        location = "Okno"
-                        m, b = np.polyfit(x=x_coords, y=y_coords, deg=1)
-                        m = abs(m)  # Absolute value
-                        if not win_dict.get(x_coord, False):
-                            win_dict[x_coord] = m
-                        else:
-                            if abs(win_dict[x_coord]) < abs(m):
-                                win_dict[x_coord] = m
-
-                    elif line.zcoord <= line_door.get_z(x_coord):
-                        location = "Dvere"
-                        m, b = np.polyfit(x=x_coords, y=y_coords, deg=1)
-                        m = abs(m)  # Absolute value
-                        if not door_dict.get(x_coord, False):
-                            door_dict[x_coord] = m
-                        else:
-                            if abs(door_dict[x_coord]) < abs(m):
-                                door_dict[x_coord] = m
+                # TEXT modification
+                p = ph.text_frame.paragraphs[0]
+                p.alignment = PP_ALIGN.CENTER
+                run = p.add_run()
+                run.font.size = Pt(11)
+                run.font.bold = True
 
-                    else:
-                        location = "NEZNAMA CHYBA"
-
-                    logger.info(
-                        "{loc:<5} Intersection: [{prev:>12} > {cur:>12} < {next:>12}] {polyfit}".format(
-                            loc=location,
-                            prev=data[new_idx - 1].val,
-                            cur=data[new_idx].val,
-                            next=data[new_idx + 1].val,
-                            polyfit="... Polyfit: m: {m:.0f}, b: {b:.0f}".format(m=m, b=b) if m != 0 else " ",
-                        )
-                    )
+                # COLOR modification
+                ph.fill.solid()
+                ph.fill.fore_color.rgb = RGBColor(241, 241, 241)
+
+                if info.type == 1:  # TITLE
+                    run.text = "Id[{}]: {} - Layout[{}]: [{}]".format(info.idx, info.name, layout.num, layout.name)
+                else:
+                    run.text = "Id[{}]: {}{}".format(info.idx, info.name, " (picture)" if info.picture else "")
+
+        self.prs.save(output_pres_path)
 
-        win_sorted = sorted(win_dict.items())
-        door_sorted = sorted(door_dict.items())
+    def gradients_from_file(self, grad_file, pictures_dir="PICTURES", results_db=None):
+        # Analysis stack is imported only when needed (slow startup otherwise)
+        import matplotlib.pyplot as plt
 
-        if win_sorted != []:
-            wx, yy = zip(*win_sorted)
-            plt.plot(wx, yy, label="Window")
+        import gradients
+        import gradstore
 
-        with open("Ux_GRAD_results_WINDOW", "w") as f:
-            wr = csv.writer(f, quoting=csv.QUOTE_NONE)
-            # wr.writerows(win_sorted)
-            logger.info("WINDOW data saved to: \n{}".format(os.path.abspath(f.name)))
+        files = gradients.station_files(pictures_dir, grad_file)
+        logger.info("Reading {} files: {}".format(len(files), ", ".join(files)))
 
-        if door_sorted != []:
-            dx, dy = zip(*door_sorted)
-            plt.plot(dx, dy, label="Door")
+        # Unchanged files are not analysed again, their results are in the store
+        zones = self.zones()
+        store = gradstore.GradientStore(results_db)
+        results = gradstore.analyse_stations([("", file) for file in files], store, zones=zones, workers=1)
+        store.close()
+        for res in results:
+            log_station(res)
 
-        with open("Ux_GRAD_results_DOOR", "w") as f:
-            wr = csv.writer(f, quoting=csv.QUOTE_NONE)
-            # wr.writerows(door_sorted)
-            logger.info("DOOR data saved to: \n{}".format(os.path.abspath(f.name)))
+        maxima = gradients.merge_maxima(results).get("", {})
+        for zone in zones:
+            by_x = maxima.get(zone.name, [])
+            if by_x != []:
+                zx, zy = zip(*by_x)
+                plt.plot(zx, zy, label=zone.name)
+
+            with open(os.path.join(pictures_dir, "Ux_GRAD_results_{}".format(zone.name.upper())), "w") as f:
+                wr = csv.writer(f, quoting=csv.QUOTE_NONE)
+                wr.writerows(by_x)
+                logger.info("{} data saved to: \n{}".format(zone.name, os.path.abspath(f.name)))
 
         plt.legend(loc="upper left", frameon=True)
         plt.xlabel("X_Coordinate")
@@ -308,97 +758,207 @@ class Presentation:
 
         plt.show()
 
-    def plot_gradients(self):
-        plt_colors = ("blue", "red", "violet")
-        linreg_rozpeti = 1
+        crossings = {res.x_coord: res.crossings for res in results}
+        return GradientResult(maxima=maxima, crossings=crossings)
+
+    def gradients_sweep(self, grad_file, workers=None, results_db=None):
+        """Analyse all stations of grad_file series in all variants in parallel worker processes."""
+        import matplotlib.pyplot as plt
+
+        import gradients
+        import gradstore
+
+        jobs = []
+        for variant in self.variants:
+            files = gradients.station_files(os.path.join(variant.fullpath, "PICTURES"), grad_file)
+            logger.info("Variant {}: {} stations".format(variant.num, len(files)))
+            jobs.extend((variant.name, file) for file in files)
+
+        zones = self.zones()
+        store = gradstore.GradientStore(results_db)
+        results = gradstore.analyse_stations(jobs, store, zones=zones, workers=workers)
+        store.close()
+        for res in results:
+            logger.info("Variant {} / Station {}".format(res.variant, res.x_coord))
+            log_station(res)
+
+        merged = gradients.merge_maxima(results)
+        sweep = {}
+        for variant in self.variants:
+            maxima = merged.get(variant.name, {})
+            crossings = {res.x_coord: res.crossings for res in results if res.variant == variant.name}
+            sweep[variant.name] = GradientResult(maxima=maxima, crossings=crossings)
+
+            for zone_num, zone in enumerate(zones):
+                by_x = maxima.get(zone.name, [])
+                if by_x != []:
+                    zx, zy = zip(*by_x)
+                    style = LINE_STYLES[zone_num % len(LINE_STYLES)]
+                    plt.plot(zx, zy, label="{} {}".format(variant.num, zone.name), linestyle=style)
+
+        plt.legend(loc="upper left", frameon=True)
+        plt.xlabel("X_Coordinate")
+        plt.ylabel("gradUx(m/s)")
+
+        plt.show()
+
+        return sweep
+
+    def gradients_plane(self, plane_file, dpi=None):
+        """Analyse a whole slice plane export (x, z, value rows) instead of one file per station.
 
+        Max |slope| per x of every zone is saved to <plane>_results_<ZONE>
+        and the heat map of dvalue/dz to <plane>_heatmap.png next to the export.
+        """
+        import numpy as np
+
+        import gradients
+        import plots
+
+        zones = self.zones()
+        with profiler.phase("gradients_plane", plane_file, profiler.file_size(plane_file)):
+            result = gradients.analyse_plane(plane_file, zones)
+        logger.info(
+            "Plane {}: {} x {} grid, {} crossings in {} columns".format(
+                plane_file, result.x.size, result.z.size, result.crossings.size, len(result.stations)
+            )
+        )
+
+        base = os.path.splitext(plane_file)[0]
+        maxima = {}
+        for num, zone in enumerate(zones):
+            found = ~np.isnan(result.maxima[num])
+            maxima[zone.name] = list(zip(result.x[found].tolist(), result.maxima[num][found].tolist()))
+            with open("{}_results_{}".format(base, zone.name.upper()), "w") as f:
+                wr = csv.writer(f, quoting=csv.QUOTE_NONE)
+                wr.writerows(maxima[zone.name])
+                logger.info(
+                    "{} data ({} x positions) saved to: \n{}".format(zone.name, found.sum(), os.path.abspath(f.name))
+                )
+
+        heatmap = base + "_heatmap.png"
+        with profiler.phase("heatmap", heatmap) as record:
+            dpi = dpi or plots.images.IMAGE_DPI
+            plots.render_heatmap(result, zones, heatmap, dpi=dpi, title=os.path.basename(base))
+            record["written"] = profiler.file_size(heatmap)
+        logger.info("Heat map saved to: {}".format(os.path.abspath(heatmap)))
+
+        crossings = {res.x_coord: res.crossings for res in result.stations}
+        return GradientResult(maxima=maxima, crossings=crossings)
+
+    def plot_dpi(self) -> int:
+        """DPI of plots sized for the widest picture placeholder of the template (never sharper than slides show)."""
+        import plots
+
+        width = max(ph.width for layout in self.layouts for ph in layout.placeholders.values() if ph.picture)
+        return plots.adaptive_dpi(width)
+
+    def plot_gradients(self, workers=None, fmt="png", dpi=None):
+        """Render [Plots] as <name>.<fmt> at dpi (default: adaptive, see plot_dpi), unchanged plots come from cache."""
+        import images
+        import plots
+
+        dpi = dpi or self.plot_dpi()
+        jobs = []
         for sec in self.conf.options("Plots"):  # each plot
             sec_name = self.conf.get("Plots", sec)
-            fig = plt.figure()
-            plt.clf()
-            fig.clf()
-            plt.style.use("seaborn-notebook")
-            plt.grid(True)
-            plt.title(sec_name)
-            for var_idx, variant in enumerate(self.variants):
-                datafile = os.path.join(variant.fullpath, "PICTURES", sec_name)
-                with open(datafile, "r") as f:
-                    data = f.readlines()
-
-                x_axis = ""
-                y_axis = ""
-                x_data = []
-                y_data = []
-
-                for line in data:
-                    line = line.rstrip("\n")
-                    if "(X axis) " in line:
-                        x_axis = line.split("(X axis) ")[-1]
-                    if "(Y axis) " in line:
-                        y_axis = line.split("(Y axis) ")[-1]
-                    if line.startswith(" "):
-                        x_data.append(float(line.replace(" ", "").split(",")[0]))
-                        y_data.append(float(line.replace(" ", "").split(",")[1]))
-
-                plt.plot(x_data, y_data, color=plt_colors[var_idx], label=variant.name, linewidth=2.5)
-                plt.legend(loc="upper left", frameon=True)
-                plt.xlabel(x_axis)
-                plt.ylabel(y_axis)
-                axes = plt.gca()
-                axes.set_ylim([plt.ylim()[0], plt.ylim()[1] + 5])
-                axes.invert_xaxis()
-
-                print("\nSec: {} / Variant: {}".format(sec_name, variant.name))
-
-                for idx, num in enumerate(y_data):
-                    if idx in (0, len(y_data) - 1):
-                        continue
-
-                    prev_num = y_data[idx - 1]
-                    next_num = y_data[idx + 1]
-
-                    if prev_num > 0 and num < 0 or prev_num < 0 and num > 0:
-                        ls = [prev_num, num, next_num]
-                        num = min([abs(x) for x in ls])
-                        try:
-                            new_index = y_data.index(num)
-                        except ValueError:
-                            new_index = y_data.index(-num)
-                        idx = new_index
-
-                        x = x_data[idx - linreg_rozpeti : idx + linreg_rozpeti + 1]
-                        y = y_data[idx - linreg_rozpeti : idx + linreg_rozpeti + 1]
-                        m, b = np.polyfit(x, y, 1)
-                        print(
-                            "Protnuti X: [{} > {} < {}] ... Polyfit: m: {:.0f}, b: {:.0f}".format(
-                                prev_num, num, next_num, m, b
-                            )
+            series = [(variant.name, plot_datafile(variant, sec_name)) for variant in self.variants]
+            jobs.append(plots.PlotJob(name=sec_name, series=series, output="{}.{}".format(sec_name, fmt)))
+
+        logger.info("Rendering {} plots ({}, {} DPI)".format(len(jobs), fmt, dpi))
+        cache = images.ImageCache(plots.PLOT_CACHE_DIR)
+        results = {}
+        for job, crossings_by_variant in zip(jobs, plots.render_plots(jobs, workers=workers, dpi=dpi, cache=cache)):
+            results[job.name] = crossings_by_variant
+            for label, crossings in crossings_by_variant.items():
+                print("\nSec: {} / Variant: {}".format(job.name, label))
+                for crossing in crossings:
+                    print(
+                        "Protnuti X: [{} > {} < {}] ... Polyfit: m: {:.0f}, b: {:.0f}".format(
+                            crossing["prev"],
+                            crossing["cur"],
+                            crossing["next"],
+                            crossing["slope"],
+                            crossing["intercept"],
                         )
-                        plt.annotate(
-                            "{:.0f}".format(m),
-                            xy=(x_data[idx], 0),
-                            xycoords="data",
-                            color=plt_colors[var_idx],
-                            xytext=(+15, +15 + var_idx * 15),
-                            textcoords="offset points",
-                            fontsize=10,
-                            bbox=dict(facecolor="white", edgecolor="None", alpha=0.65),
-                            arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=.2"),
-                        )
-                    else:
-                        continue
-                fig.savefig("{}.png".format(sec_name), dpi=800, bbox_inches="tight")
+                    )
+            logger.info("Plot saved to: {}".format(os.path.abspath(job.output)))
+
+        return results
+
+
+def log_station(res):
+    """Log every crossing of one analysed station with its zone and fitted line."""
+    for loc, crossing in zip(res.location, res.crossings):
+        m, b = (abs(crossing["slope"]), crossing["intercept"]) if loc in res.maxima else (0, 0)
+        logger.info(
+            "{loc:<5} Intersection: [{prev:>12} > {cur:>12} < {next:>12}] {polyfit}".format(
+                loc=loc,
+                prev=crossing["prev"],
+                cur=crossing["cur"],
+                next=crossing["next"],
+                polyfit="... Polyfit: m: {m:.0f}, b: {b:.0f}".format(m=m, b=b) if m != 0 else " ",
+            )
+        )
+
+
+def resolve_output_path(output_pres_path: str) -> str:
+    """Output presentation without directory is saved to the current directory."""
+    if "/" in output_pres_path:
+        return output_pres_path
+    return os.path.join(os.path.realpath(os.path.curdir), output_pres_path)
 
-            # plt.show()
+
+def image_targets(pres, layout_num: int, images: list, variants: list):
+    """Yield (placeholder idx, image path, crop) of every picture a slide of layout_num gets for its variants."""
+    # Plot slides have no images
+    if not images:
+        return
+
+    for idx, variant in enumerate(variants):
+        pictures = os.path.join(variant.fullpath, "PICTURES")
+
+        # 1st image is in all slide layouts
+        if layout_num in pres.one_image_slides or layout_num in pres.two_images_slides:
+            yield layouts.IMAGE_IDX + idx, os.path.join(pictures, images[0]), True
+
+        # 2nd additional image is only in layout 2, 4, 5, 8
+        if layout_num in pres.two_images_slides:
+            yield layouts.IMAGE2_IDX + idx, os.path.join(pictures, images[1]), True
+
+        # if layout_num == 1:
+        #     yield 10, os.path.join(pictures, images[0]), True
+
+        # 1 image on whole slide in layout 12
+        if layout_num == 12:
+            yield layouts.IMAGE_IDX, os.path.join(pictures, images[0]), False
+
+        # 6 original images in layout 13
+        if layout_num == 13:
+            for NUM in range(0, 6):
+                yield layouts.IMAGE_IDX + NUM, os.path.join(pictures, images[NUM]), False
+
+
+def fringebar_path(pres, fringebar: str) -> str:
+    """Fringebar is always taken from the first variant."""
+    return os.path.join(pres.variants[0].fullpath, "PICTURES", fringebar)
+
+
+def plot_datafile(variant, name: str) -> str:
+    """XY data of plots are exported to PICTURES of every variant."""
+    return os.path.join(variant.fullpath, "PICTURES", name)
 
 
 class Slide:
-    def __init__(self, pres, slide, layout_num):
+    def __init__(self, pres, slide, layout_num, variants=None):
         self.slide = slide  # slide knows about pptx.slide object
         self.pres = pres  # slide knows about presentation
-        self.variants = pres.variants
+        self.variants = variants if variants is not None else pres.variants  # variants shown on this slide
         self.layout_num = layout_num
         self.slide_num = pres.get_num_of_slides()
+        # {idx: placeholder} of the slide, python-pptx looks placeholders up by a linear scan
+        self.placeholders = {ph.placeholder_format.idx: ph for ph in slide.placeholders}
+        self.layout = pres.layout_map[layout_num]
 
     def set_title(self, title: str):
         try:
@@ -407,10 +967,8 @@ class Slide:
             pass
 
     def set_author(self, author: str):
-        try:
-            self.slide.placeholders[20].text = author
-        except KeyError:
-            pass
+        if layouts.AUTHOR_IDX in self.placeholders:
+            self.placeholders[layouts.AUTHOR_IDX].text = author
 
     def add_images(self, images):
         # Should be 1 image but more were specified in config file
@@ -431,92 +989,49 @@ class Slide:
 
         for idx, variant in enumerate(self.variants):
             # TEXT
-            try:
-                self.slide.placeholders[17 + idx].text = variant.num  # Variant number
-            except KeyError:
-                pass
-
-            # IMAGES
-            # 1st image is in all slide layouts
-            if self.layout_num in self.pres.one_image_slides or self.layout_num in self.pres.two_images_slides:
-                img1_path = os.path.join(variant.fullpath, "PICTURES", images[0])
-                if os.path.isfile(img1_path):
-                    self.slide.placeholders[11 + idx].insert_picture(img1_path)
-                else:
-                    logger.error(
-                        "Image: {} does not exist in \n         {}".format(
-                            os.path.basename(img1_path), os.path.dirname(img1_path)
-                        )
-                    )
-
-            # 2nd additional image is only in layout 2, 4, 5, 8
-            if self.layout_num in self.pres.two_images_slides:
-                img2_path = os.path.join(variant.fullpath, "PICTURES", images[1])
-
-                if os.path.isfile(img2_path):
-                    self.slide.placeholders[14 + idx].insert_picture(img2_path)
-                else:
-                    logger.error(
-                        "Image: {} does not exist in \n         {}".format(
-                            os.path.basename(img2_path), os.path.dirname(img2_path)
-                        )
-                    )
-
-            # if self.layout_num == 1:
-            #     img_orig_path = os.path.join(variant.fullpath, 'PICTURES', images[0])
-            #     if os.path.isfile(img_orig_path):
-            #         self.slide.placeholders[10].insert_picture(img_orig_path)
-            #     else:
-            #         logger.error("Image: {} does not exist in \n         {}".format(
-            #             os.path.basename(img_orig_path), os.path.dirname(img_orig_path)))
-
-            # 1 image on whole slide in layout 12
-            if self.layout_num == 12:
-                img_orig_path = os.path.join(variant.fullpath, "PICTURES", images[0])
-                if os.path.isfile(img_orig_path):
-                    self.slide.placeholders[11].insert_picture(img_orig_path, crop=False)
-                else:
-                    logger.error(
-                        "Image: {} does not exist in \n         {}".format(
-                            os.path.basename(img_orig_path), os.path.dirname(img_orig_path)
-                        )
-                    )
-
-            # 6 original images in layout 13
-            if self.layout_num == 13:
-                for NUM in range(0, 6):
-                    img_orig_path = os.path.join(variant.fullpath, "PICTURES", images[NUM])
-                    if os.path.isfile(img_orig_path):
-                        self.slide.placeholders[11 + NUM].insert_picture(img_orig_path, crop=False)
-                    else:
-                        logger.error(
-                            "Image: {} does not exist in \n         {}".format(
-                                os.path.basename(img_orig_path), os.path.dirname(img_orig_path)
-                            )
-                        )
+            if layouts.LABEL_IDX + idx in self.placeholders:
+                self.placeholders[layouts.LABEL_IDX + idx].text = variant.num  # Variant number
+
+        # IMAGES
+        # Missing images and placeholders were already reported by Presentation.preflight
+        for ph_idx, img_path, crop in image_targets(self.pres, self.layout_num, images, self.variants):
+            if self.can_insert(ph_idx) and self.pres.assets.exists(img_path):
+                self.insert_picture(ph_idx, img_path, crop)
+
+    def add_plots(self, plots):
+        """Insert rendered plots [(placeholder idx, image bytes)], each was rendered in the size of its placeholder."""
+        for ph_idx, blob in plots:
+            if self.can_insert(ph_idx):
+                with profiler.phase("insert_plot", str(ph_idx)):
+                    self.placeholders[ph_idx].insert_picture(io.BytesIO(blob))
+
+    def can_insert(self, ph_idx: int) -> bool:
+        ph = self.layout.placeholders.get(ph_idx)
+        return ph is not None and ph.picture and ph_idx in self.placeholders
+
+    def insert_picture(self, ph_idx: int, img_path: str, crop: bool = True):
+        picture = self.pres.resolve_image(img_path, self.layout_num, ph_idx)
+        # Shared blobs were read (and counted) by the BlobCache
+        nbytes = profiler.file_size(picture) if isinstance(picture, str) else 0
+        with profiler.phase("insert_picture", img_path, nbytes):
+            if crop:
+                self.placeholders[ph_idx].insert_picture(picture)
+            else:
+                self.placeholders[ph_idx].insert_picture(picture, crop=False)
 
     def add_fringebar(self, fringebar: str):
-        if self.layout_num in [2, 4, 10, 11] and fringebar is None:
+        if self.layout_num in self.pres.fringebar_slides and fringebar is None:
             logger.critical(
                 "Slide [{}] with Layout[{}] has to have fringebar but none was specified "
                 "in config file. Aborting script...".format(self.slide_num, self.layout_num)
             )
             sys.exit()
 
-        elif self.layout_num not in [2, 4, 10, 11] and fringebar is not None:
-            logger.error(
-                "Slide [{}] with Layout[{}] should not have FRINGEBAR assigned. "
-                "Please see the config file and check this slide.".format(self.slide_num, self.layout_num)
-            )
+        elif self.layout_num not in self.pres.fringebar_slides and fringebar is not None:
             return None
 
+        # Missing fringebar was already reported by Presentation.preflight
         if fringebar is not None:
-            fringebar_path = os.path.join(self.variants[0].fullpath, "PICTURES", fringebar)
-            if os.path.isfile(fringebar_path):
-                self.slide.placeholders[10].insert_picture(fringebar_path)
-            else:
-                logger.warning(
-                    "Fringebar: {} does not exist in \n         {}".format(
-                        os.path.basename(fringebar_path), os.path.dirname(fringebar_path)
-                    )
-                )
+            fringebar_file = fringebar_path(self.pres, fringebar)
+            if self.can_insert(layouts.FRINGEBAR_IDX) and self.pres.assets.exists(fringebar_file):
+                self.insert_picture(layouts.FRINGEBAR_IDX, fringebar_file)
@@ -0,0 +1,398 @@
+"""Vectorized analysis of CFD extraction lines (zero-crossings, local slopes)"""
+import glob
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import assets
+import profiler
+
+# Rows parsed at once by the streaming reader of Ux_GRAD_* files
+CHUNK_ROWS = 1 << 16
+
+# Analysis of one Ux_GRAD_* station file: crossings with their zone and {zone: max |slope|} of zones with crossings
+StationResult = namedtuple("StationResult", ("variant", "x_coord", "crossings", "location", "maxima"))
+
+# Analysis of a slice plane gridded over x and z: coordinates, field and dfield/dz (x.size, z.size), crossings
+# along z (x column of every crossing in columns) with their zone, max |slope| (zones, x.size) and StationResult
+# of every x with crossings
+PlaneResult = namedtuple(
+    "PlaneResult", ("x", "z", "field", "gradient", "columns", "crossings", "location", "maxima", "stations")
+)
+
+# Named measurement zone: polygon ((x, z), ...) in the x-z plane of the stations
+Zone = namedtuple("Zone", ("name", "polygon"))
+
+# Location of crossings outside of every zone
+UNKNOWN_ZONE = "NEZNAMA CHYBA"
+
+# One record per sign change of the analysed line
+CROSSING_DTYPE = np.dtype(
+    [
+        ("idx", np.intp),  # index where the sign change was detected (y[idx - 1] * y[idx] < 0)
+        ("refined", np.intp),  # index of the point nearest to zero around idx
+        ("x", np.float64),  # x at the refined index
+        ("x0", np.float64),  # linearly interpolated zero location between idx - 1 and idx
+        ("prev", np.float64),  # y[idx - 1]
+        ("cur", np.float64),  # y[idx]
+        ("next", np.float64),  # y[idx + 1]
+        ("slope", np.float64),  # least-squares slope around the refined index
+        ("intercept", np.float64),  # least-squares intercept around the refined index
+    ]
+)
+
+
+def find_crossings(x, y, span: int = 1) -> np.ndarray:
+    """Find every zero-crossing of y(x) and fit a local line around it in one array pass.
+
+    A crossing is reported at idx when y[idx - 1] and y[idx] have strictly opposite
+    signs (first and last points are ignored). The point nearest to zero among
+    y[idx - 1], y[idx], y[idx + 1] is the refined index, and the line is fitted over
+    the 2 * span + 1 points centred on it. Crossings whose fit window would leave
+    the line are dropped.
+
+    Returns a structured array with CROSSING_DTYPE.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape or x.ndim != 1:
+        raise ValueError("x and y have to be 1-D arrays of the same length")
+    return find_field_crossings(x, y[None, :], span)[1]
+
+
+def find_field_crossings(x, field, span: int = 1) -> tuple:
+    """find_crossings of every row of field (rows, x.size) at once.
+
+    Returns (row of every crossing, structured array with CROSSING_DTYPE).
+    Rows may contain NaN (holes of a grid), no crossing is found across them
+    and crossings whose fit window reaches into one get a NaN slope.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    field = np.asarray(field, dtype=np.float64)
+    n = x.size
+    if field.ndim != 2 or field.shape[1] != n:
+        raise ValueError("field has to be a 2-D array with x.size columns")
+    if n < 3:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=CROSSING_DTYPE)
+
+    # Sign change between idx - 1 and idx, idx in <1, n - 2>
+    sign = np.sign(field)
+    row, idx = np.nonzero(sign[:, :-2] * sign[:, 1:-1] < 0)
+    idx = idx + 1
+    y = field[row]
+
+    # Point nearest to zero of the three neighbours (a hole is never the nearest, argmin would pick NaN)
+    points = np.arange(idx.size)
+    neighbours = idx[:, None] + np.arange(-1, 2)
+    distance = np.abs(y[points[:, None], neighbours])
+    refined = neighbours[points, np.argmin(np.where(np.isnan(distance), np.inf, distance), axis=1)]
+
+    # Edge conditional (fit window would leave the line)
+    keep = (refined - span >= 0) & (refined + span <= n - 1)
+    row, idx, refined, y = row[keep], idx[keep], refined[keep], y[keep]
+    points = np.arange(idx.size)
+
+    # Least-squares line over each window at once
+    window = refined[:, None] + np.arange(-span, span + 1)
+    wx, wy = x[window], y[points[:, None], window]
+    dx = wx - wx.mean(axis=1, keepdims=True)
+    dy = wy - wy.mean(axis=1, keepdims=True)
+    prev, cur = y[points, idx - 1], y[points, idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+        x0 = x[idx - 1] - prev * (x[idx] - x[idx - 1]) / (cur - prev)
+    intercept = wy.mean(axis=1) - slope * wx.mean(axis=1)
+
+    out = np.empty(idx.size, dtype=CROSSING_DTYPE)
+    out["idx"] = idx
+    out["refined"] = refined
+    out["x"] = x[refined]
+    out["x0"] = x0
+    out["prev"] = prev
+    out["cur"] = cur
+    out["next"] = y[points, idx + 1]
+    out["slope"] = slope
+    out["intercept"] = intercept
+    return row, out
+
+
+class _BoundedReader(io.RawIOBase):
+    """Binary file wrapper that stops reading at a given byte offset."""
+
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._left = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._left)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[: len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+
+def _footer_offset(f, block: int = 4096) -> int:
+    """Return byte offset where the footer (last non-blank line) of an open binary file starts."""
+    pos = f.seek(0, os.SEEK_END)
+    tail = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        tail = f.read(step) + tail
+        stripped = tail.rstrip()
+        if b"\n" in stripped:
+            return pos + stripped.rindex(b"\n") + 1
+    return 0
+
+
+def iter_grad_chunks(grad_file: str, chunk_rows: int = CHUNK_ROWS, names=("val", "z")):
+    """Stream a $-commented, comma-separated Ux_GRAD_* file as chunks of float arrays (one per column of names).
+
+    The last line of the file is a footer and is cut off by byte offset,
+    so the fast C parser can be used and memory is bounded by chunk_rows.
+    """
+    with open(grad_file, "rb") as f:
+        limit = _footer_offset(f)
+        f.seek(0)
+        reader = pd.read_csv(
+            io.BufferedReader(_BoundedReader(f, limit)),
+            comment="$",
+            delimiter=",",
+            header=None,
+            names=list(names),
+            dtype=np.float64,
+            engine="c",
+            skipinitialspace=True,
+            chunksize=chunk_rows,
+        )
+        with reader:
+            for chunk in reader:
+                yield tuple(chunk[name].to_numpy() for name in names)
+
+
+def read_grad_file(grad_file: str, chunk_rows: int = CHUNK_ROWS):
+    """Read the whole Ux_GRAD_* file into contiguous (val, z) float arrays."""
+    chunks = list(iter_grad_chunks(grad_file, chunk_rows))
+    if not chunks:
+        return np.empty(0), np.empty(0)
+    val = np.concatenate([chunk[0] for chunk in chunks])
+    z = np.concatenate([chunk[1] for chunk in chunks])
+    return val, z
+
+
+def group_extraction_line(val, z):
+    """Split raw (val, z) columns of an extraction file into (dist, zcoord, grad) arrays.
+
+    Rows sharing the same second column belong to one point of the line: the
+    first of them holds the distance, the second the z coordinate. Points keep
+    the order of their first appearance (same as DataFrame.groupby(sort=False)).
+    """
+    val = np.asarray(val, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    if z.size == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    keys, first, inverse, counts = np.unique(z, return_index=True, return_inverse=True, return_counts=True)
+    rows = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    appearance = np.argsort(first, kind="stable")
+
+    dist = val[rows[starts]]
+    zcoord = np.where(counts > 1, val[rows[np.minimum(starts + 1, z.size - 1)]], np.nan)
+    return dist[appearance], zcoord[appearance], keys[appearance]
+
+
+def _between(lower, upper, x_min: float = -100.0, x_max: float = 100.0) -> tuple:
+    """Polygon between two boundaries over <x_min, x_max>, a boundary is z or a line (x1, z1, x2, z2)."""
+
+    def z_at(bound, x):
+        if not isinstance(bound, tuple):
+            return bound
+        x1, z1, x2, z2 = bound
+        return z1 + (z2 - z1) / (x2 - x1) * (x - x1)
+
+    return (
+        (x_min, z_at(lower, x_min)),
+        (x_max, z_at(lower, x_max)),
+        (x_max, z_at(upper, x_max)),
+        (x_min, z_at(upper, x_min)),
+    )
+
+
+def _shifted(line: tuple, dz: float) -> tuple:
+    """Line (x1, z1, x2, z2) moved by dz in z."""
+    x1, z1, x2, z2 = line
+    return x1, z1 + dz, x2, z2 + dz
+
+
+# Default zones of the side window / door: above the window line, below the door line and the strip between.
+# A point on the window line is Okno and a point on the door line is Dvere (z >= window, z <= door). The even-odd
+# rule does not decide points on an edge, so the lines are moved by _ON_LINE out of the strip.
+_WINDOW = (0.655, 0.688, 0.8, 0.696)
+_DOOR = (0.655, 0.67, 0.8, 0.678)
+_ON_LINE = 1e-9
+DEFAULT_ZONES = (
+    Zone("Okno", _between(_shifted(_WINDOW, -_ON_LINE), 100.0)),
+    Zone("Lista", _between(_shifted(_DOOR, _ON_LINE), _shifted(_WINDOW, -_ON_LINE))),
+    Zone("Dvere", _between(-100.0, _shifted(_DOOR, _ON_LINE))),
+)
+
+
+def parse_zone(name: str, text: str) -> Zone:
+    """Zone from its config value: x z, x z, x z[, ...] vertices of the polygon."""
+    try:
+        polygon = tuple(tuple(float(num) for num in vertex.split()) for vertex in text.split(","))
+    except ValueError:
+        raise ValueError("Zone {}: vertices have to be numbers 'x z, x z, ...'".format(name))
+    if len(polygon) < 3 or any(len(vertex) != 2 for vertex in polygon):
+        raise ValueError("Zone {}: at least 3 vertices 'x z' are needed".format(name))
+    return Zone(name, polygon)
+
+
+def classify_points(x, z, zones) -> np.ndarray:
+    """Name of the first zone containing each (x, z) point (UNKNOWN_ZONE if none) in one array pass.
+
+    Even-odd rule over the edges of all zones at once, so more zones only
+    add columns to the same computation.
+    """
+    x = np.atleast_1d(np.asarray(x, dtype=np.float64))[:, None]
+    z = np.atleast_1d(np.asarray(z, dtype=np.float64))[:, None]
+    names = np.array([zone.name for zone in zones] + [UNKNOWN_ZONE], dtype=object)
+    if not zones:
+        return np.full(x.shape[0], UNKNOWN_ZONE, dtype=object)
+
+    # Edges (x1, z1) -> (x2, z2) of all polygons and zone of every edge
+    start = np.concatenate([np.asarray(zone.polygon, dtype=np.float64) for zone in zones])
+    end = np.concatenate([np.roll(np.asarray(zone.polygon, dtype=np.float64), -1, axis=0) for zone in zones])
+    owner = np.repeat(np.arange(len(zones)), [len(zone.polygon) for zone in zones])
+
+    # Edge crosses the horizontal ray from the point to +x
+    straddles = (start[:, 1] > z) != (end[:, 1] > z)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = start[:, 0] + (z - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+    hits = straddles & (x < x_cross)
+
+    # Parity of hits per zone, (points, zones)
+    counts = np.zeros((x.shape[0], len(zones)), dtype=np.intp)
+    np.add.at(counts.T, owner, hits.T)
+    inside = counts % 2 == 1
+    first = np.where(inside.any(axis=1), inside.argmax(axis=1), len(zones))
+    return names[first]
+
+
+def station_files(pictures_dir: str, grad_file: str) -> list:
+    """Return all station files of the same series as grad_file (Ux_GRAD_0.655 -> Ux_GRAD_x.xxx) in pictures_dir."""
+    grad_file_base = "_".join(os.path.basename(grad_file).split("_")[0:-1])
+    pattern = assets.STATION_PATTERN.format(glob.escape(grad_file_base))
+    return sorted(glob.glob(os.path.join(glob.escape(pictures_dir), pattern)))
+
+
+def analyse_station(grad_file: str, zones=DEFAULT_ZONES, variant: str = ""):
+    """Find crossings of one station file and sort them into zones (first zone containing the point wins)."""
+    x_coord = os.path.basename(grad_file).split("_")[-1]
+
+    val, z = read_grad_file(grad_file)
+    dist, zcoord, grad = group_extraction_line(val, z)
+    crossings = find_crossings(dist, grad)
+
+    # Sort crossings into zones by (station x, z coordinate of the point where sign changed)
+    location = classify_points(np.full(crossings.size, float(x_coord)), zcoord[crossings["idx"]], zones)
+
+    slopes = np.abs(crossings["slope"])
+    maxima = {}
+    for zone in zones:
+        in_zone = location == zone.name
+        if np.any(in_zone):
+            maxima[zone.name] = float(slopes[in_zone].max())
+
+    return StationResult(variant, x_coord, crossings, location, maxima)
+
+
+def read_plane_file(plane_file: str, chunk_rows: int = CHUNK_ROWS):
+    """Read a slice plane export ($ comments, x, z, value rows, footer as Ux_GRAD_*) into (x, z, value) arrays."""
+    chunks = list(iter_grad_chunks(plane_file, chunk_rows, names=("x", "z", "value")))
+    if not chunks:
+        return np.empty(0), np.empty(0), np.empty(0)
+    return tuple(np.concatenate([chunk[col] for chunk in chunks]) for col in range(3))
+
+
+def grid_plane(x, z, value, decimals: int = 6):
+    """Put scattered plane points on the grid of their distinct x and z coordinates (rounded to decimals).
+
+    Returns (x, z, field) with field of shape (x.size, z.size), cells without a point are NaN.
+    """
+    xs, col = np.unique(np.round(np.asarray(x, dtype=np.float64), decimals), return_inverse=True)
+    zs, row = np.unique(np.round(np.asarray(z, dtype=np.float64), decimals), return_inverse=True)
+    field = np.full((xs.size, zs.size), np.nan)
+    field[col, row] = value
+    return xs, zs, field
+
+
+def analyse_plane(plane_file: str, zones=DEFAULT_ZONES, span: int = 1) -> PlaneResult:
+    """Analyse every x column of a slice plane as a station line along z, in array passes over the whole field.
+
+    Crossings are found where the value changes sign along z and sorted into
+    zones by (x, z of the point where sign changed), as in analyse_station.
+    """
+    x, z, value = read_plane_file(plane_file)
+    xs, zs, field = grid_plane(x, z, value)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gradient = np.gradient(field, zs, axis=1) if zs.size > 1 else np.full(field.shape, np.nan)
+
+    columns, crossings = find_field_crossings(zs, field, span)
+    # Fit windows reaching into holes of the grid
+    finite = np.isfinite(crossings["slope"])
+    columns, crossings = columns[finite], crossings[finite]
+    location = classify_points(xs[columns], zs[crossings["idx"]], zones)
+
+    # Max |slope| of every zone in every column (NaN where the zone has no crossing)
+    slopes = np.abs(crossings["slope"])
+    maxima = np.full((len(zones), xs.size), np.nan)
+    for num, zone in enumerate(zones):
+        in_zone = location == zone.name
+        np.fmax.at(maxima[num], columns[in_zone], slopes[in_zone])
+
+    # Crossings are ordered by column, split them into stations
+    stations = []
+    bounds = np.searchsorted(columns, np.arange(xs.size + 1))
+    for col in np.unique(columns):
+        part = slice(bounds[col], bounds[col + 1])
+        station_maxima = {
+            zone.name: float(maxima[num, col]) for num, zone in enumerate(zones) if not np.isnan(maxima[num, col])
+        }
+        stations.append(StationResult("", "{:.4f}".format(xs[col]), crossings[part], location[part], station_maxima))
+
+    return PlaneResult(xs, zs, field, gradient, columns, crossings, location, maxima, stations)
+
+
+def sweep_stations(jobs, zones=DEFAULT_ZONES, workers: int = None) -> list:
+    """Analyse (variant, grad_file) jobs in a process pool, results keep the order of jobs."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(profiler.timed_call, analyse_station, path, zones, variant) for variant, path in jobs]
+        results = []
+        for (variant, path), future in zip(jobs, futures):
+            result, seconds = future.result()
+            profiler.PROFILER.add("gradients_station", seconds, profiler.file_size(path), item=path)
+            results.append(result)
+        return results
+
+
+def merge_maxima(results) -> dict:
+    """Merge station results into {variant: {zone: [(x_coord, max |slope|), ...] sorted by x}}."""
+    merged = {}
+    for res in results:
+        zones = merged.setdefault(res.variant, {})
+        for zone, slope in res.maxima.items():
+            by_x = zones.setdefault(zone, {})
+            by_x[res.x_coord] = max(slope, by_x.get(res.x_coord, 0))
+    return {variant: {zone: sorted(by_x.items()) for zone, by_x in zones.items()} for variant, zones in merged.items()}
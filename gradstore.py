@@ -0,0 +1,226 @@
+"""Persistent SQLite store of gradient analysis results (per station slopes, crossings and zones)"""
+import datetime
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+import gradients
+import profiler
+from assets import file_hash
+
+DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "gradients.sqlite")
+# Bump when the analysis changes its results, old rows are then not reused
+ANALYSIS_VERSION = 2
+# Bump when tables change, older stores are then recreated (results are analysed again)
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    station TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    path TEXT NOT NULL,
+    analysed TEXT NOT NULL,
+    UNIQUE (project, station, file_hash, params)
+);
+CREATE TABLE IF NOT EXISTS maxima (
+    station_id INTEGER NOT NULL REFERENCES stations (id) ON DELETE CASCADE,
+    zone TEXT NOT NULL,
+    slope REAL,
+    PRIMARY KEY (station_id, zone)
+);
+CREATE TABLE IF NOT EXISTS crossings (
+    station_id INTEGER NOT NULL REFERENCES stations (id) ON DELETE CASCADE,
+    num INTEGER NOT NULL,
+    idx INTEGER, refined INTEGER, x REAL, x0 REAL, prev REAL, cur REAL, next REAL, slope REAL, intercept REAL,
+    location TEXT,
+    PRIMARY KEY (station_id, num)
+);
+CREATE INDEX IF NOT EXISTS stations_project ON stations (project, station);
+"""
+
+STATION_COLUMNS = ("project", "station", "path", "file_hash", "analysed")
+MAXIMA_COLUMNS = ("zone", "slope")
+CROSSING_COLUMNS = gradients.CROSSING_DTYPE.names + ("location",)
+
+
+def params_key(zones) -> str:
+    """Analysis parameters as a stable string: zones (in order), fit span and analysis version."""
+    return json.dumps(
+        {
+            "version": ANALYSIS_VERSION,
+            "span": 1,  # find_crossings span used by gradients.analyse_station
+            "zones": [[zone.name, [list(vertex) for vertex in zone.polygon]] for zone in zones],
+        },
+        sort_keys=True,
+    )
+
+
+def project_of(grad_file: str) -> str:
+    """Project (variant) folder of a station file: <project>/PICTURES/Ux_GRAD_x.xxx."""
+    return os.path.dirname(os.path.dirname(os.path.abspath(grad_file)))
+
+
+def station_of(grad_file: str) -> str:
+    """Station x coordinate from the file name (Ux_GRAD_0.655 -> 0.655), as StationResult.x_coord."""
+    return os.path.basename(grad_file).split("_")[-1]
+
+
+class GradientStore:
+    """Station results keyed by project, station, source file hash and analysis parameters."""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript(
+                "DROP TABLE IF EXISTS crossings; DROP TABLE IF EXISTS maxima; DROP TABLE IF EXISTS stations;"
+            )
+            self.db.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get(self, grad_file: str, sha1: str, params: str, variant: str = ""):
+        """Return stored StationResult of grad_file with content sha1 analysed with params, or None."""
+        row = self.db.execute(
+            "SELECT id FROM stations WHERE project = ? AND station = ? AND file_hash = ? AND params = ?",
+            (project_of(grad_file), station_of(grad_file), sha1, params),
+        ).fetchone()
+        if row is None:
+            return None
+
+        station_id = row[0]
+        maxima = dict(self.db.execute("SELECT zone, slope FROM maxima WHERE station_id = ?", (station_id,)))
+        rows = self.db.execute(
+            "SELECT {} FROM crossings WHERE station_id = ? ORDER BY num".format(", ".join(CROSSING_COLUMNS)),
+            (station_id,),
+        ).fetchall()
+        crossings = np.array([tuple(r[:-1]) for r in rows], dtype=gradients.CROSSING_DTYPE)
+        location = np.array([r[-1] for r in rows], dtype=object)
+        return gradients.StationResult(variant, station_of(grad_file), crossings, location, maxima)
+
+    def put(self, grad_file: str, sha1: str, params: str, res: gradients.StationResult):
+        """Store result of grad_file, replacing older results of the same station and parameters."""
+        project, station = project_of(grad_file), station_of(grad_file)
+        with self.db:
+            self.db.execute(
+                "DELETE FROM stations WHERE project = ? AND station = ? AND params = ?", (project, station, params)
+            )
+            cursor = self.db.execute(
+                "INSERT INTO stations (project, station, file_hash, params, path, analysed) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    project,
+                    station,
+                    sha1,
+                    params,
+                    os.path.abspath(grad_file),
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self.db.executemany(
+                "INSERT INTO maxima (station_id, zone, slope) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, zone, slope) for zone, slope in res.maxima.items()],
+            )
+            self.db.executemany(
+                "INSERT INTO crossings (station_id, num, {}) VALUES (?, ?, {})".format(
+                    ", ".join(CROSSING_COLUMNS), ", ".join("?" * len(CROSSING_COLUMNS))
+                ),
+                [
+                    (cursor.lastrowid, num) + tuple(crossing.item()) + (str(location),)
+                    for num, (crossing, location) in enumerate(zip(res.crossings, res.location))
+                ],
+            )
+
+    def rows(self, projects=None):
+        """Return (stations rows, maxima rows, crossings rows) of all stored results, or only of given projects."""
+        where, args = "", ()
+        if projects:
+            projects = [os.path.abspath(project) for project in projects]
+            where, args = "WHERE s.project IN ({})".format(", ".join("?" * len(projects))), tuple(projects)
+        stations = self.db.execute(
+            "SELECT {} FROM stations s {} ORDER BY s.project, s.station".format(
+                ", ".join("s." + col for col in STATION_COLUMNS), where
+            ),
+            args,
+        ).fetchall()
+        maxima = self.db.execute(
+            "SELECT s.project, s.station, {} FROM maxima m JOIN stations s ON s.id = m.station_id {} "
+            "ORDER BY s.project, s.station, m.zone".format(", ".join("m." + col for col in MAXIMA_COLUMNS), where),
+            args,
+        ).fetchall()
+        crossings = self.db.execute(
+            "SELECT s.project, s.station, {} FROM crossings c JOIN stations s ON s.id = c.station_id {} "
+            "ORDER BY s.project, s.station, c.num".format(", ".join("c." + col for col in CROSSING_COLUMNS), where),
+            args,
+        ).fetchall()
+        return stations, maxima, crossings
+
+    def export_xlsx(self, xlsx_path: str, projects=None) -> int:
+        """Write Stations, Maxima (per zone) and Crossings sheets, return number of stations exported."""
+        import xlsxwriter
+
+        stations, maxima, crossings = self.rows(projects)
+        workbook = xlsxwriter.Workbook(xlsx_path, {"constant_memory": True})
+        bold = workbook.add_format({"bold": True})
+        sheets = (
+            ("Stations", STATION_COLUMNS, stations),
+            ("Maxima", ("project", "station") + MAXIMA_COLUMNS, maxima),
+            ("Crossings", ("project", "station") + CROSSING_COLUMNS, crossings),
+        )
+        for name, columns, rows in sheets:
+            sheet = workbook.add_worksheet(name)
+            sheet.write_row(0, 0, columns, bold)
+            for num, row in enumerate(rows, start=1):
+                sheet.write_row(num, 0, row)
+        workbook.close()
+        return len(stations)
+
+
+def analyse_stations(
+    jobs,
+    store: GradientStore = None,
+    zones=gradients.DEFAULT_ZONES,
+    workers: int = None,
+) -> list:
+    """Analyse (variant, grad_file) jobs, reusing stored results of unchanged files.
+
+    Files without stored results are analysed in a process pool (or in this
+    process when there is only one worker or one file) and stored.
+    Results keep the order of jobs.
+    """
+    params = params_key(zones)
+    hashes = {path: file_hash(path) for variant, path in jobs}
+
+    results = {}
+    missing = []
+    for variant, path in jobs:
+        res = store.get(path, hashes[path], params, variant) if store is not None else None
+        if res is not None:
+            results[(variant, path)] = res
+        else:
+            missing.append((variant, path))
+
+    if workers == 1 or len(missing) == 1:
+        analysed = []
+        for variant, path in missing:
+            with profiler.phase("gradients_station", path, profiler.file_size(path)):
+                analysed.append(gradients.analyse_station(path, zones, variant))
+    elif missing:
+        analysed = gradients.sweep_stations(missing, zones, workers=workers)
+    else:
+        analysed = []
+
+    for (variant, path), res in zip(missing, analysed):
+        results[(variant, path)] = res
+        if store is not None:
+            store.put(path, hashes[path], params, res)
+
+    return [results[job] for job in jobs]
@@ -0,0 +1,133 @@
+"""Downscaling of variant images to placeholder resolution with a persistent on-disk cache"""
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from assets import file_hash
+
+EMU_PER_INCH = 914400
+IMAGE_DPI = 220
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "images")
+CACHE_MAX_BYTES = 2 * 1024**3
+JPEG_QUALITY = 90
+
+
+def target_pixels(width_emu: int, height_emu: int, dpi: int) -> tuple:
+    """Pixel size needed to show an image in a placeholder of given size at given DPI."""
+    return (
+        max(1, round(width_emu / EMU_PER_INCH * dpi)),
+        max(1, round(height_emu / EMU_PER_INCH * dpi)),
+    )
+
+
+class ImageCache:
+    """Content-addressed directory of prepared images with size-bounded LRU eviction.
+
+    Entries are keyed by source hash and target size only, so a staged copy
+    shares entries with its source. A hit touches the entry, so eviction
+    removes the least recently used first.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, src: str, size_px: tuple) -> str:
+        stamp = "{}:{}x{}".format(file_hash(src), *size_px)
+        return hashlib.sha1(stamp.encode()).hexdigest()
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, key + ext)
+
+    def lookup(self, key: str, ext: str):
+        path = self.path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, key: str, ext: str, img, fmt: str) -> str:
+        """Save PIL image atomically, so concurrent builds never see a half written entry."""
+        fd, tmp_path = tempfile.mkstemp(suffix=ext, dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if fmt == "JPEG":
+                    img.save(f, fmt, quality=JPEG_QUALITY, optimize=True)
+                else:
+                    img.save(f, fmt)
+            os.replace(tmp_path, self.path(key, ext))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.path(key, ext)
+
+    def store_blob(self, key: str, ext: str, blob: bytes) -> str:
+        """Save already encoded image atomically."""
+        fd, tmp_path = tempfile.mkstemp(suffix=ext, dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self.path(key, ext))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.path(key, ext)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits into max_bytes."""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file()]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            os.unlink(entry.path)
+
+
+def prepare_image(src: str, size_px: tuple, cache: ImageCache) -> str:
+    """Return path to src resampled to cover size_px, or src itself if it is not larger."""
+    with Image.open(src) as img:
+        scale = max(size_px[0] / img.width, size_px[1] / img.height)
+        if scale >= 1:
+            return src
+
+        ext = os.path.splitext(src)[1].lower()
+        key = cache.key(src, size_px)
+        cached = cache.lookup(key, ext)
+        if cached:
+            return cached
+
+        fmt = img.format
+        target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img.draft(img.mode, target)  # JPEG: decode directly at reduced scale
+        resized = img.resize(target, Image.LANCZOS)
+        return cache.store(key, ext, resized, fmt)
+
+
+def prepare_images(jobs, dpi: int = IMAGE_DPI, cache: ImageCache = None, workers: int = None) -> dict:
+    """Prepare (src, (width_emu, height_emu)) jobs in a thread pool.
+
+    Returns {(src, (width_emu, height_emu)): prepared path}. Images which can
+    not be read are left out, the build then reports them as usual.
+    """
+    cache = cache or ImageCache()
+    jobs = list(dict.fromkeys(jobs))
+
+    def _prepare(job):
+        src, (width_emu, height_emu) = job
+        try:
+            return job, prepare_image(src, target_pixels(width_emu, height_emu, dpi), cache)
+        except OSError:
+            return job, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        prepared = {job: path for job, path in pool.map(_prepare, jobs) if path is not None}
+
+    cache.evict()
+    return prepared
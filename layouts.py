@@ -0,0 +1,97 @@
+"""Compiled map of template layouts and their placeholders, cached on disk by template hash"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+LAYOUT_CACHE_VERSION = 1
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "layouts")
+
+# Placeholder idx used by slides of the template
+TITLE_IDX = 0
+FRINGEBAR_IDX = 10
+IMAGE_IDX = 11  # 1st image of variant 0, 1, 2 (11, 12, 13; 6 images in layout 13: 11 - 16)
+IMAGE2_IDX = 14  # 2nd image of variant 0, 1, 2 (14, 15, 16)
+LABEL_IDX = 17  # variant label of variant 0, 1, 2 (17, 18, 19)
+AUTHOR_IDX = 20
+
+# Placeholder types python-pptx can insert a picture into
+PICTURE_TYPES = (PP_PLACEHOLDER.PICTURE, PP_PLACEHOLDER.BITMAP)
+
+# Placeholder of a layout: geometry in EMU, picture = insert_picture is possible
+PlaceholderInfo = namedtuple("PlaceholderInfo", ("idx", "type", "name", "left", "top", "width", "height", "picture"))
+
+# Layout of a slide master (num = index in its slide_layouts), placeholders = {idx: PlaceholderInfo}
+LayoutInfo = namedtuple("LayoutInfo", ("master", "num", "name", "placeholders"))
+
+
+def template_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def compile_layouts(prs) -> list:
+    """Analyse every layout of every slide master of python-pptx presentation."""
+    layouts = []
+    for master_num, master in enumerate(prs.slide_masters):
+        for num, layout in enumerate(master.slide_layouts):
+            placeholders = {}
+            for ph in layout.placeholders:
+                fmt = ph.placeholder_format
+                placeholders[fmt.idx] = PlaceholderInfo(
+                    fmt.idx, int(fmt.type), ph.name, ph.left, ph.top, ph.width, ph.height, fmt.type in PICTURE_TYPES
+                )
+            layouts.append(LayoutInfo(master_num, num, layout.name, placeholders))
+    return layouts
+
+
+def _from_json(data: list) -> list:
+    return [
+        LayoutInfo(
+            layout["master"],
+            layout["num"],
+            layout["name"],
+            {ph[0]: PlaceholderInfo(*ph) for ph in layout["placeholders"]},
+        )
+        for layout in data
+    ]
+
+
+def _to_json(layouts: list) -> list:
+    return [
+        {
+            "master": layout.master,
+            "num": layout.num,
+            "name": layout.name,
+            "placeholders": list(layout.placeholders.values()),
+        }
+        for layout in layouts
+    ]
+
+
+def load_layouts(template_path: str, prs, cache_dir: str = None) -> list:
+    """Return compiled layouts of the template, from cache if this template was analysed before.
+
+    prs is the python-pptx presentation of template_path, used only on a cache miss.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    cache_path = os.path.join(cache_dir, "{}-v{}.json".format(template_hash(template_path), LAYOUT_CACHE_VERSION))
+    try:
+        with open(cache_path, "r") as f:
+            return _from_json(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    layouts = compile_layouts(prs)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump(_to_json(layouts), f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return layouts
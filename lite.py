@@ -0,0 +1,200 @@
+"""Lightweight review deck saved from the same build as the full one (--lite)
+
+Slides are shared, only image parts get lite blobs while the lite deck is
+written. Images are decoded at the size their largest picture shows at
+LITE_DPI and only their first lite encoding is kept, so a streamed build
+stays bounded in memory. Further steps of the size budget decode the
+original images again, from the full deck for streamed (released) parts.
+"""
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from pptx.opc.package import XmlPart
+from pptx.opc.packuri import PackURI
+from pptx.parts.image import ImagePart
+from pptx.shapes.picture import Picture
+
+from images import EMU_PER_INCH
+
+LITE_DPI = 96
+LITE_QUALITY = 70
+LITE_BUDGET_MB = 10
+# (scale of LITE_DPI, JPEG quality) tried in order until the lite deck fits into its budget
+LITE_STEPS = ((1.0, LITE_QUALITY), (0.8, 60), (0.64, 50), (0.5, 45), (0.4, 40))
+
+
+def lite_path(output_pptx: str) -> str:
+    """OUTPUT.pptx -> OUTPUT-lite.pptx"""
+    base, ext = os.path.splitext(output_pptx)
+    return "{}-lite{}".format(base, ext or ".pptx")
+
+
+def picture_sizes(slide) -> dict:
+    """Return {image part: (width, height)} in EMU of the whole (uncropped) image as shown on the slide."""
+    sizes = {}
+    for shape in slide.shapes:
+        if not isinstance(shape, Picture) or shape._pic.blip_rId is None:
+            continue
+        part = slide.part.related_part(shape._pic.blip_rId)
+        shown_x = max(1e-3, 1 - shape.crop_left - shape.crop_right)
+        shown_y = max(1e-3, 1 - shape.crop_top - shape.crop_bottom)
+        width, height = sizes.get(part, (0, 0))
+        sizes[part] = (max(width, shape.width / shown_x), max(height, shape.height / shown_y))
+    return sizes
+
+
+def decode(blob: bytes, size_emu: tuple, dpi: int = LITE_DPI) -> Image.Image:
+    """Decode image at the pixels it needs at dpi (never upscaled), JPEGs are decoded directly at reduced scale."""
+    with Image.open(io.BytesIO(blob)) as img:
+        target = tuple(max(1, round(emu / EMU_PER_INCH * dpi)) for emu in size_emu)
+        scale = min(1.0, max(target[0] / img.width, target[1] / img.height))
+        target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img.draft("RGB", target)
+        alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if alpha else "RGB")
+        return img.resize(target, Image.LANCZOS) if img.size != target else img
+
+
+def encode(img: Image.Image, scale: float, quality: int) -> tuple:
+    """Return (blob, content type, extension), images with alpha are PNG, others JPEG."""
+    if scale < 1:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    buf = io.BytesIO()
+    if img.mode == "RGBA":
+        img.save(buf, "PNG", optimize=True)
+        return buf.getvalue(), "image/png", "png"
+    img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), "image/jpeg", "jpg"
+
+
+class _Originals:
+    """Original image blobs: the blob of the part or, once it was released, its member of the full deck."""
+
+    def __init__(self, source: str = None):
+        self.source = source
+        self._zip = None
+        self._lock = threading.Lock()
+
+    def read(self, partname, blob: bytes) -> bytes:
+        if blob or self.source is None or not os.path.exists(self.source):
+            return blob
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.source)
+            try:
+                return self._zip.read(partname.membername)
+            except KeyError:
+                return b""
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def check_parts(package):
+    """Raise ValueError if a binary part of package is empty (its blob was released and not restored)."""
+    for part in package.iter_parts():
+        if not isinstance(part, XmlPart) and not part.blob:
+            raise ValueError("Part {} is empty".format(part.partname))
+
+
+class LiteImages:
+    """Lite images (first LITE_STEPS encoding) of the image parts shown on slides."""
+
+    def __init__(self, dpi: int = LITE_DPI):
+        self.dpi = dpi
+        self.encoded = {}  # {image part: (size in EMU, (blob, content type, extension))}
+
+    def collect(self, slides, workers: int = None, source: str = None):
+        """Encode images of slides which were not encoded yet (or are shown larger now).
+
+        Call before image blobs are released (streamed output) or pass the
+        full deck as source, parts whose image is gone keep the image encoded before.
+        """
+        wanted = {}
+        for slide in slides:
+            for part, size in picture_sizes(slide).items():
+                known = wanted.get(part) or self.encoded.get(part, ((0, 0), None))[0]
+                wanted[part] = (max(size[0], known[0]), max(size[1], known[1]))
+
+        todo = [
+            (part, size) for part, size in wanted.items() if part not in self.encoded or self.encoded[part][0] != size
+        ]
+        originals = _Originals(source)
+
+        def _encode(job):
+            part, size = job
+            blob = originals.read(part.partname, part.blob)
+            try:
+                return part, size, encode(decode(blob, size, self.dpi), *LITE_STEPS[0]) if blob else None
+            except OSError:
+                return part, size, None
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for part, size, encoded in pool.map(_encode, todo):
+                    if encoded is not None:
+                        self.encoded[part] = (size, encoded)
+        finally:
+            originals.close()
+
+    def save(self, package, output_path: str, budget_mb: float = LITE_BUDGET_MB, workers: int = None, source=None):
+        """Save package with lite images, lowering resolution and quality until it fits budget_mb.
+
+        Released image parts which are not lite (template images) are read back
+        from the full deck source. Returns (size in bytes, LITE_STEPS entry
+        used). Image parts are restored afterwards.
+        """
+        parts = list(self.encoded)
+        originals = [(part._blob, part.partname, part._content_type) for part in parts]
+        released = [
+            part
+            for part in package.iter_parts()
+            if isinstance(part, ImagePart) and not part.blob and part not in self.encoded
+        ]
+        reader = _Originals(source)
+        # Temporary file of its own, concurrent builds of the same output never write into one
+        directory, name = os.path.split(output_path)
+        fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".part", dir=directory or ".")
+        os.fchmod(fd, 0o644)
+        os.close(fd)
+
+        def _encode(job, scale, quality):
+            part, (blob, partname, content_type) = job
+            return encode(decode(reader.read(partname, blob), self.encoded[part][0], self.dpi), scale, quality)
+
+        try:
+            for part in released:
+                part._blob = reader.read(part.partname, part._blob)
+            for step_num, (scale, quality) in enumerate(LITE_STEPS):
+                if step_num == 0:
+                    encoded = [self.encoded[part][1] for part in parts]
+                else:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        encoded = list(pool.map(lambda job: _encode(job, scale, quality), zip(parts, originals)))
+                for part, (blob, content_type, ext), original in zip(parts, encoded, originals):
+                    part._blob = blob
+                    part._content_type = content_type
+                    # Converted images get a name of their own, imageN.jpg may already exist next to imageN.png
+                    if content_type != original[2]:
+                        part.partname = PackURI("{}-lite.{}".format(os.path.splitext(original[1])[0], ext))
+                check_parts(package)
+                package.save(tmp_path)
+                size = os.path.getsize(tmp_path)
+                if size <= budget_mb * 1024**2 or step_num == len(LITE_STEPS) - 1:
+                    break
+            os.replace(tmp_path, output_path)
+        finally:
+            for part, (blob, partname, content_type) in zip(parts, originals):
+                part._blob, part.partname, part._content_type = blob, partname, content_type
+            for part in released:
+                part._blob = b""
+            reader.close()
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return size, LITE_STEPS[step_num]
@@ -0,0 +1,25 @@
+"""Colored log formatter shared by all cfd_agp modules"""
+import colorlog
+
+formatter = colorlog.ColoredFormatter(
+    "%(log_color)s%(levelname)-8s%(reset)s %(message_log_color)s%(message)s",
+    datefmt=None,
+    reset=True,
+    log_colors={
+        "CRITICAL": "bold_red",
+        "ERROR": "red",
+        "WARNING": "yellow",
+        "INFO": "green",
+        "DEBUG": "cyan",
+    },
+    secondary_log_colors={
+        "message": {
+            "CRITICAL": "bold_red",
+            "ERROR": "red",
+            "WARNING": "yellow",
+            "INFO": "white",
+            "DEBUG": "cyan",
+        }
+    },
+    # style='%',
+)
@@ -5,7 +5,6 @@ import sys
 # sys.path.append(os.path.join(os.path.dirname(__file__), 'libs'))
 script_dir = os.path.dirname(os.path.realpath(sys.argv[0]))
 sys.path.append(os.path.join(script_dir, "libs"))
-import configparser
 import os.path
 import subprocess
 
@@ -13,11 +12,11 @@ import better_exceptions
 import colorlog
 
 import cli
-import evePresentation
+from log import formatter
 
 # Initialize LOGGER
 handler = colorlog.StreamHandler()
-handler.setFormatter(evePresentation.formatter)
+handler.setFormatter(formatter)
 logger = colorlog.getLogger(__name__)
 logger.addHandler(handler)
 logger.setLevel("DEBUG")
@@ -29,15 +28,68 @@ def main():
     parser = cli.get_parser()
     args = parser.parse_args()
 
+    # Arg option: --profile
+    if args.profile:
+        import profiler
+
+        profiler.start(args.profile, args.profile_stats)
+
+    # Arg option: --batch
+    if args.batch:
+        import batch
+
+        results = batch.build_decks(args.variants, args, workers=args.workers)
+        batch.print_summary(results)
+        sys.exit(0 if all(res.ok for res in results) else 1)
+
+    # Arg option: --watch
+    if args.watch:
+        import watch
+
+        settings_file = args.variants[0] if args.variants and os.path.isfile(args.variants[0]) else None
+        watch.watch(args, settings_file)
+        sys.exit()
+
     # Check if user entered variants
     if args.variants:
         if os.path.isfile(args.variants[0]):
-            config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
-            config.read(args.variants[0])
-            args.variants = [config[section] for section in config.sections()]
-            args.cfg_file = config.get("DEFAULT", "cfg_file", fallback=args.cfg_file)
-            args.input_pptx = config.get("DEFAULT", "input_pptx", fallback=args.input_pptx)
-            args.output_pptx = config.get("DEFAULT", "output_pptx", fallback=args.output_pptx)
+            cli.read_settings(args.variants[0], args)
+
+    # Arg option: --readme
+    if args.readme:
+        readme_file = os.path.join(script_dir, "README.md")
+        subprocess.call(["sublime", readme_file])
+        exit()
+
+    # Arg option: --export_xlsx
+    if args.export_xlsx:
+        import gradstore
+
+        store = gradstore.GradientStore(args.results_db)
+        projects = [var if isinstance(var, str) else var.get("path") for var in args.variants or []]
+        count = store.export_xlsx(args.export_xlsx, projects=projects)
+        logger.info("{} stations exported to: {}".format(count, os.path.abspath(args.export_xlsx)))
+        exit()
+
+    # Arg options: --crawl --find
+    if args.crawl or args.find:
+        import catalog
+
+        cat = catalog.Catalog(args.catalog_db)
+        for root in args.crawl or []:
+            stats = cat.crawl(root)
+            logger.info(
+                "Crawled {}: {} folders ({} listed), {} variants, {} files".format(
+                    root, stats.dirs, stats.scanned, stats.variants, stats.files
+                )
+            )
+        if args.find:
+            for info in cat.variants(os.path.abspath(args.find) if "/" in args.find else args.find):
+                print("{}  [{} images, {} gradients, {} xy]".format(info.path, info.images, info.gradients, info.xy))
+        exit()
+
+    # Imported after argument parsing, so --version / --help / --readme start fast
+    import evePresentation
 
     # Load Presentation Template
     logger.info("Starting...")
@@ -50,14 +102,17 @@ def main():
         logger.info("Created {}".format(os.path.join(os.getcwd(), pres_name)))
         exit()
 
-    # Arg option: --readme
-    if args.readme:
-        readme_file = os.path.join(script_dir, "README.md")
-        subprocess.call(["sublime", readme_file])
-        exit()
+    # Load config file for section [Slide \d] (and [Zones] of -g)
+    pr.load_config(args.cfg_file)
+
     # Arg option: -g --gradients
-    if args.gradients:
-        pr.gradients_from_file(args.gradients)
+    if args.gradients and not args.sweep:
+        pr.gradients_from_file(args.gradients, results_db=args.results_db)
+        exit()
+
+    # Arg option: --plane
+    if args.plane:
+        pr.gradients_plane(args.plane, dpi=args.plot_dpi)
         exit()
 
     # Check if user entered variants
@@ -66,22 +121,30 @@ def main():
         parser.print_help()
         sys.exit()
 
-    # Load config file for section [Slide \d]
-    pr.load_config(args.cfg_file)
+    # Arg option: --catalog
+    if args.catalog:
+        import catalog
+
+        pr.catalog = catalog.Catalog(args.catalog_db)
+        args.variants = catalog.expand_variants(args.variants, pr.catalog)
 
     # Add user selected variants
     pr.add_variants(args.variants)
 
+    # Arg options: -g --sweep
+    if args.gradients:
+        pr.gradients_sweep(args.gradients, workers=args.workers, results_db=args.results_db)
+        exit()
+
     # Arg options: --plots
     if args.plots:
-        pr.plot_gradients()
+        pr.plot_gradients(workers=args.workers, fmt=args.plot_format, dpi=args.plot_dpi)
         exit()
 
-    # Process slides
-    pr.process_slides()
+    # Process slides and save Presentation
+    import batch
 
-    # Save Presentation
-    pr.save_presentation(args.output_pptx)
+    batch.build(args, workers=args.workers, pr=pr)
 
 
 if __name__ == "__main__":
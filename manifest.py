@@ -0,0 +1,63 @@
+"""Build manifest saved next to the output presentation: per-slide fingerprints for incremental rebuilds"""
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_pptx: str) -> str:
+    return os.path.abspath(output_pptx) + ".manifest.json"
+
+
+def fingerprint(data) -> str:
+    """Stable hash of JSON serializable data."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def file_stamp(path: str) -> list:
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def load(output_pptx: str):
+    """Return manifest of previous build of output_pptx or None if there is no usable one."""
+    if not os.path.isfile(output_pptx):
+        return None
+    try:
+        with open(manifest_path(output_pptx), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def save(output_pptx: str, data: dict):
+    path = manifest_path(output_pptx)
+    # Temporary file of its own, concurrent builds of the same output never write into one
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(data, version=MANIFEST_VERSION), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def changed_sections(previous: dict, template: list, slides: dict, pages: int = 1):
+    """Return sections whose fingerprint changed, or None if the previous deck can not be reused at all.
+
+    The deck can be reused only if it was built from the same template
+    with the same [Slide N] sections in the same order and the same number
+    of variant pages per section.
+    """
+    if previous is None or previous.get("template") != template:
+        return None
+    if previous.get("order") != list(slides) or previous.get("pages", 1) != pages:
+        return None
+    return [section for section, value in slides.items() if previous["slides"][section] != value]
@@ -0,0 +1,303 @@
+"""Parallel slide build: slides are built by worker processes and merged in config order, parts deflated concurrently
+
+Every worker builds whole slides (pictures read, hashed, measured and
+placed, slide XML) from the same template, config and prepared images
+as the main process. The main process merges them in config order: it
+adds the slide as a serial build would, takes over its XML and relates
+its images, deduplicated by SHA1. Image part names, relationships and
+the saved zip are therefore the same as in a serial build (only zip
+timestamps differ, as between any two builds).
+"""
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from pptx.package import _ImageParts
+from pptx.parts.image import Image, ImagePart
+
+# Slides a worker may build ahead of the merge (per worker), bounds memory held by finished slides
+BUILD_AHEAD = 4
+
+# Slide built by a worker: slide XML, [(rId, reltype, image SHA1 or None for the layout)] and
+# {SHA1: Image} of images this worker did not send before
+BuiltSlide = namedtuple("BuiltSlide", ("xml", "rels", "images"))
+
+# Relationship attributes of slide XML (pictures use r:embed, r:link and r:id)
+REL_ATTRIBUTES = (qn("r:embed"), qn("r:link"), qn("r:id"))
+
+_builder = None  # (Presentation, set of sent SHA1) of a worker process
+
+
+def measured(image: Image) -> Image:
+    """Compute everything python-pptx needs from image once (lazy properties are kept by the image)."""
+    for prop in ("sha1", "size", "dpi", "content_type", "ext"):
+        getattr(image, prop)
+    return image
+
+
+class _LoadedImagePart(ImagePart):
+    """Image part created from a measured Image, SHA1 and pixel size are not computed from the blob again."""
+
+    @property
+    def sha1(self):
+        return self._loaded.sha1
+
+    @property
+    def _px_size(self):
+        return self._loaded.size
+
+    @property
+    def _dpi(self):
+        return self._loaded.dpi
+
+
+class LoadedImageParts(_ImageParts):
+    """Image parts of a package looked up by SHA1 in a dict.
+
+    The dict is built once from the image parts already in the package
+    instead of hashing every part for every merged picture.
+    """
+
+    def __init__(self, package):
+        super().__init__(package)
+        self._by_sha1 = None
+
+    def add_image(self, image: Image):
+        """Return image part of the measured image, added to the package if there is none of the same SHA1."""
+        image_part = self._find_by_sha1(image.sha1)
+        if image_part is None:
+            image_part = _LoadedImagePart.new(self._package, image)
+            image_part._loaded = image
+            self._by_sha1[image.sha1] = image_part
+        return image_part
+
+    def _find_by_sha1(self, sha1: str):
+        if self._by_sha1 is None:
+            self._by_sha1 = {}
+            for image_part in self:
+                if hasattr(image_part, "sha1"):
+                    self._by_sha1.setdefault(image_part.sha1, image_part)
+        return self._by_sha1.get(sha1)
+
+    def reset(self):
+        """Forget the SHA1 index, call after slides were dropped (their image parts may have left the package)."""
+        self._by_sha1 = None
+
+
+def install(package) -> LoadedImageParts:
+    """Make package look image parts up by SHA1."""
+    image_parts = package.__dict__["_image_parts"] = LoadedImageParts(package)
+    return image_parts
+
+
+def builder_state(pres) -> dict:
+    """Everything a worker needs to build the slides of pres exactly as pres would."""
+    return {
+        "template": pres.src_prs_path,
+        "config": pres.config_file,
+        "variants": [{"path": variant.fullpath, "label": variant.num} for variant in pres.variants],
+        "assets": pres.assets.dirs,
+        "catalogued": pres.assets.catalogued,
+        "prepared_images": pres.prepared_images,
+        "staged_images": pres.staged_images,
+        "blobs": pres.blobs is not None,
+        "pinned_dir": pres.pinned_dir,
+    }
+
+
+def init_builder(state: dict):
+    """Worker initializer: load template, config and variants once per worker process."""
+    global _builder
+    import assets
+    import evePresentation
+
+    # Slides are reported by the main process as they are merged
+    evePresentation.logger.setLevel("WARNING")
+    pres = evePresentation.Presentation(state["template"], blobs=assets.BlobCache() if state["blobs"] else None)
+    pres.load_config(state["config"])
+    pres.add_variants(state["variants"])
+    pres.assets.dirs = state["assets"]
+    pres.assets.catalogued = state["catalogued"]
+    pres.prepared_images = state["prepared_images"]
+    pres.staged_images = state["staged_images"]
+    pres.pinned_dir = state["pinned_dir"]
+    _builder = pres, set()
+
+
+def build_slide(job) -> BuiltSlide:
+    """Worker: build one slide (title, layout, fringebar, images, author, page, plots) and take it out of the deck."""
+    pres, sent = _builder
+    title, layout_num, fringebar, images, author, page_num, plots = job
+    slide = pres.add_slide(title, layout_num, fringebar, images, author, pres.variant_pages()[page_num], plots=plots)
+    part = slide.slide.part
+
+    rels = []
+    new_images = {}
+    for rId, rel in part.rels.items():
+        if rel.is_external or rel.reltype not in (RT.SLIDE_LAYOUT, RT.IMAGE):
+            raise ValueError("Slide relationship {} can not be merged".format(rel.reltype))
+        if rel.reltype == RT.SLIDE_LAYOUT:
+            rels.append((rId, rel.reltype, None))
+            continue
+        image_part = rel.target_part
+        rels.append((rId, rel.reltype, image_part.sha1))
+        if image_part.sha1 not in sent:
+            new_images[image_part.sha1] = measured(Image.from_blob(image_part.blob))
+            sent.add(image_part.sha1)
+    built = BuiltSlide(serialize_part_xml(part._element), rels, new_images)
+
+    # Drop the slide again, its image parts go with it and the worker deck stays small
+    sld_id_lst = pres.prs.slides._sldIdLst
+    pres.prs.part.drop_rel(sld_id_lst[-1].rId)
+    sld_id_lst.remove(sld_id_lst[-1])
+    pres.slides = []
+    return built
+
+
+def build_slides(pres, jobs, workers: int = None):
+    """Yield BuiltSlide of every job in order, built by worker processes from the state of pres.
+
+    A worker sends every image once, so jobs have to be merged in the
+    order they are yielded. At most BUILD_AHEAD slides per worker wait for
+    the merge.
+    """
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_builder, initargs=(builder_state(pres),))
+    try:
+        jobs = iter(jobs)
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(build_slide, job))
+            if len(pending) >= workers * BUILD_AHEAD:
+                break
+        while pending:
+            built = pending.popleft().result()
+            job = next(jobs, None)
+            if job is not None:
+                pending.append(pool.submit(build_slide, job))
+            yield built
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def merge_slide(pptx_slide, built: BuiltSlide, image_parts: LoadedImageParts):
+    """Make a slide just added to the deck (with its layout) the built one, return the new pptx slide."""
+    part = pptx_slide.part
+    layout_rId = next(rId for rId, rel in part.rels.items() if rel.reltype == RT.SLIDE_LAYOUT)
+    rIds = {}
+    for rId, reltype, sha1 in built.rels:
+        if sha1 is None:
+            rIds[rId] = layout_rId
+            continue
+        image_part = image_parts._find_by_sha1(sha1)
+        if image_part is None:
+            image_part = image_parts.add_image(built.images[sha1])
+        rIds[rId] = part.relate_to(image_part, reltype)
+
+    element = parse_xml(built.xml)
+    # rIds are the same as in the worker unless the deck had other relationships, keep references right then
+    if any(rId != new_rId for rId, new_rId in rIds.items()):
+        for node in element.iter():
+            for attribute in REL_ATTRIBUTES:
+                if node.get(attribute) in rIds:
+                    node.set(attribute, rIds[node.get(attribute)])
+    part._element = element
+    part.__dict__.pop("slide", None)  # lazy property of the slide object of the old element
+    return part.slide
+
+
+def _deflate(blob: bytes) -> bytes:
+    """Raw deflate exactly as zipfile writes a ZIP_DEFLATED member (default level, one write)."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(blob) + compressor.flush()
+
+
+# Zip records (APPNOTE.TXT 4.3.7, 4.3.12, 4.3.16) with the field values ZipFile.writestr uses
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+ZIP_VERSION = 20  # deflate
+ZIP_SYSTEM = 0 if os.name == "nt" else 3
+ZIP_ATTR = 0o600 << 16
+ZIP_LIMIT = 0xFFFFFFFF  # sizes and offsets beyond need zip64 records, ZipFile writes those
+
+
+class DeflatedZip:
+    """Zip writer of already deflated members, headers are the same as ZipFile.writestr(name, blob) writes.
+
+    Members are written sequentially to a plain file object, so the zip
+    layout is fully under control of this class (no ZipFile internals).
+    """
+
+    def __init__(self, f, date_time=None):
+        self.f = f
+        year, month, day, hour, minute, second = (date_time or time.localtime(time.time()))[:6]
+        self.dostime = hour << 11 | minute << 5 | second // 2
+        self.dosdate = (year - 1980) << 9 | month << 5 | day
+        self.central = []
+        self.offset = 0
+
+    def write(self, name: str, blob: bytes, deflated: bytes):
+        filename = name.encode("ascii")
+        # version needed, reserved, flags, method, time, date and CRC, sizes, name length are in both headers
+        fields = (ZIP_VERSION, 0, 0, zipfile.ZIP_DEFLATED, self.dostime, self.dosdate)
+        sizes = (zlib.crc32(blob), len(deflated), len(blob), len(filename))
+        header = LOCAL_HEADER.pack(b"PK\x03\x04", *fields, *sizes, 0)
+        # extra, comment, disk, internal attributes, external attributes, offset of the local header
+        tail = (0, 0, 0, 0, ZIP_ATTR, self.offset)
+        central = CENTRAL_HEADER.pack(b"PK\x01\x02", ZIP_VERSION, ZIP_SYSTEM, *fields, *sizes, *tail)
+        self.central.append(central + filename)
+        self.f.write(header + filename)
+        self.f.write(deflated)
+        self.offset += len(header) + len(filename) + len(deflated)
+
+    def close(self):
+        """Write central directory and end record."""
+        directory = b"".join(self.central)
+        self.f.write(directory)
+        self.f.write(
+            END_RECORD.pack(b"PK\x05\x06", 0, 0, len(self.central), len(self.central), len(directory), self.offset, 0)
+        )
+
+
+def save_package(package, output_path: str, workers: int = None) -> int:
+    """Save python-pptx package like Package.save, with members deflated by worker threads.
+
+    Members are written in the order python-pptx writes them. Return size of the output file.
+    """
+    parts = tuple(package.iter_parts())
+    members = [
+        (CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts))),
+        (PACKAGE_URI.rels_uri.membername, package._rels.xml),
+    ]
+    for part in parts:
+        members.append((part.partname.membername, part.blob))
+        if part._rels:
+            members.append((part.partname.rels_uri.membername, part.rels.xml))
+
+    # Zip64 records are left to ZipFile, as its writestr decides (size * 1.05 over the limit)
+    total = sum(len(name) + len(blob) * 1.05 + LOCAL_HEADER.size + CENTRAL_HEADER.size for name, blob in members)
+    if total > ZIP_LIMIT or len(members) >= 0xFFFF:
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED, strict_timestamps=False) as zf:
+            for name, blob in members:
+                zf.writestr(name, blob)
+        return os.path.getsize(output_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(output_path, "wb") as f:
+        zf = DeflatedZip(f)
+        # map keeps the order, members are written as soon as their turn comes
+        for (name, blob), deflated in zip(members, pool.map(_deflate, (blob for name, blob in members))):
+            zf.write(name, blob, deflated)
+        zf.close()
+
+    return os.path.getsize(output_path)
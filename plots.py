@@ -0,0 +1,254 @@
+"""Headless rendering of XY plots from the [Plots] section (matplotlib object-oriented Agg API)"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.style
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import gradients
+import images
+import profiler
+import xydata
+
+PLOT_COLORS = ("blue", "red", "violet")
+PLOT_STYLES = ("seaborn-notebook", "seaborn-v0_8-notebook")
+PLOT_DPI = 800
+PLOT_FORMATS = ("png", "svg")
+LINREG_SPAN = 1
+FIG_WIDTH = 6.4  # inches, width of matplotlib default figure
+PLOT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "plots")
+# Bump when rendering changes, cached plots are then rendered again
+PLOT_CACHE_VERSION = 1
+
+# One figure to render: title, [(label, datafile), ...] of every variant, output image path (.png / .svg)
+# and optional (width, height) in inches, the figure then has exactly this size (default: tight bounding box)
+PlotJob = namedtuple("PlotJob", ("name", "series", "output", "size"), defaults=(None,))
+
+
+def adaptive_dpi(width_emu: int, image_dpi: int = images.IMAGE_DPI) -> int:
+    """DPI at which the figure is as wide as a placeholder of width_emu shown at image_dpi."""
+    return max(72, round(width_emu / images.EMU_PER_INCH * image_dpi / FIG_WIDTH))
+
+
+def plot_key(job: PlotJob, dpi: int) -> str:
+    """Hash of everything the rendered plot depends on: data, labels, axis names, output format and style."""
+    sha = hashlib.sha1()
+    style = [PLOT_CACHE_VERSION, matplotlib.__version__, _style(), PLOT_COLORS, LINREG_SPAN, dpi]
+    sha.update(repr((style, job.name, os.path.splitext(job.output)[1].lower(), job.size)).encode())
+    for label, datafile in job.series:
+        data = xydata.load_xy(datafile)
+        sha.update(repr((label, data.x_axis, data.y_axis, data.x.size)).encode())
+        sha.update(memoryview(data.x))
+        sha.update(memoryview(data.y))
+    return sha.hexdigest()
+
+
+def plot_crossings(job: PlotJob) -> dict:
+    """Crossings of every variant of the plot without rendering it {label: gradients.CROSSING_DTYPE array}."""
+    results = {}
+    for label, datafile in job.series:
+        data = xydata.load_xy(datafile)
+        results[label] = gradients.find_crossings(data.x, data.y, span=LINREG_SPAN)
+    return results
+
+
+def _style():
+    for style in PLOT_STYLES:
+        if style in matplotlib.style.available:
+            return style
+    return "default"
+
+
+def render_plot(job: PlotJob, dpi: int = PLOT_DPI, output=None) -> dict:
+    """Draw all variants of one plot into a single figure and save it once (to output path or file object).
+
+    Returns crossings of every variant {label: gradients.CROSSING_DTYPE array}.
+    """
+    results = {}
+
+    with matplotlib.style.context(_style()):
+        fig = Figure(figsize=job.size, layout="constrained") if job.size else Figure()
+        FigureCanvasAgg(fig)
+        axes = fig.add_subplot()
+        axes.grid(True)
+        axes.set_title(job.name)
+
+        for var_idx, (label, datafile) in enumerate(job.series):
+            color = PLOT_COLORS[var_idx % len(PLOT_COLORS)]
+            data = xydata.load_xy(datafile)
+
+            axes.plot(data.x, data.y, color=color, label=label, linewidth=2.5)
+            axes.set_xlabel(data.x_axis)
+            axes.set_ylabel(data.y_axis)
+
+            crossings = gradients.find_crossings(data.x, data.y, span=LINREG_SPAN)
+            results[label] = crossings
+
+            for crossing in crossings:
+                axes.annotate(
+                    "{:.0f}".format(crossing["slope"]),
+                    xy=(crossing["x"], 0),
+                    xycoords="data",
+                    color=color,
+                    xytext=(+15, +15 + var_idx * 15),
+                    textcoords="offset points",
+                    fontsize=10,
+                    bbox=dict(facecolor="white", edgecolor="None", alpha=0.65),
+                    arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=.2"),
+                )
+
+        axes.legend(loc="upper left", frameon=True)
+        ylim = axes.get_ylim()
+        axes.set_ylim([ylim[0], ylim[1] + 5])
+        axes.invert_xaxis()
+
+        fmt = os.path.splitext(job.output)[1].lstrip(".").lower() or "png"
+        bbox_inches = None if job.size else "tight"
+        fig.savefig(output or job.output, dpi=dpi, bbox_inches=bbox_inches, format=fmt)
+
+    return results
+
+
+def render_plot_blob(job: PlotJob, dpi: int = PLOT_DPI) -> tuple:
+    """Render plot in memory, return (image bytes, crossings)."""
+    buf = io.BytesIO()
+    results = render_plot(job, dpi, output=buf)
+    return buf.getvalue(), results
+
+
+def render_heatmap(result: gradients.PlaneResult, zones, output, dpi: int = images.IMAGE_DPI, title: str = None):
+    """Heat map of dvalue/dz over a slice plane with its crossings and zone outlines, saved as PNG to output."""
+    with matplotlib.style.context(_style()):
+        fig = Figure(layout="constrained")
+        FigureCanvasAgg(fig)
+        axes = fig.add_subplot()
+        axes.set_title(title or "")
+
+        # Colour scale symmetric around zero, clipped at the 99th percentile so a few peaks do not flatten it
+        finite = np.abs(result.gradient[np.isfinite(result.gradient)])
+        limit = float(np.percentile(finite, 99)) if finite.size else 1.0
+        mesh = axes.pcolormesh(
+            result.x, result.z, result.gradient.T, cmap="RdBu_r", vmin=-limit, vmax=limit, shading="nearest"
+        )
+        fig.colorbar(mesh, ax=axes, label="d/dz")
+
+        axes.scatter(result.x[result.columns], result.crossings["x"], s=2, color="black", label="Crossings")
+        for zone_num, zone in enumerate(zones):
+            outline = np.vstack([zone.polygon, zone.polygon[:1]])
+            color = PLOT_COLORS[zone_num % len(PLOT_COLORS)]
+            axes.plot(outline[:, 0], outline[:, 1], color=color, linewidth=1.5, label=zone.name)
+
+        # Zones may reach far beyond the plane
+        if result.x.size and result.z.size:
+            axes.set_xlim(result.x[0], result.x[-1])
+            axes.set_ylim(result.z[0], result.z[-1])
+        axes.set_xlabel("X_Coordinate")
+        axes.set_ylabel("Z_Coordinate")
+        axes.legend(loc="upper left", frameon=True)
+        fig.savefig(output, dpi=dpi, format="png")
+
+
+def render_cached(job: PlotJob, dpi: int, cache_path: str) -> dict:
+    """Render plot into the cache atomically, so concurrent runs never see a half written plot."""
+    cache_dir, name = os.path.split(cache_path)
+    fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(name)[1], dir=cache_dir)
+    os.close(fd)
+    try:
+        results = render_plot(job, dpi, output=tmp_path)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return results
+
+
+def data_size(job) -> int:
+    """Bytes of the data files of a plot."""
+    return sum(profiler.file_size(datafile) for label, datafile in job.series)
+
+
+def render_plots(jobs, workers: int = None, dpi: int = PLOT_DPI, cache: images.ImageCache = None) -> list:
+    """Render independent plots in worker processes, results keep the order of jobs.
+
+    With cache, plots whose data and style did not change are copied from it instead of rendered.
+    """
+    results = [None] * len(jobs)
+    cached = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for num, job in enumerate(jobs):
+            if cache is None:
+                futures[num] = pool.submit(profiler.timed_call, render_plot, job, dpi)
+                continue
+            key, ext = plot_key(job, dpi), os.path.splitext(job.output)[1].lower()
+            cached[num] = cache.lookup(key, ext)
+            if cached[num] is None:
+                cached[num] = cache.path(key, ext)
+                futures[num] = pool.submit(profiler.timed_call, render_cached, job, dpi, cached[num])
+
+        for num, job in enumerate(jobs):
+            nbytes = data_size(job)
+            if num in futures:
+                results[num], seconds = futures[num].result()
+                if num in cached:
+                    shutil.copyfile(cached[num], job.output)
+                written = profiler.file_size(job.output) + profiler.file_size(cached.get(num))
+                profiler.PROFILER.add("plot", seconds, nbytes, written, item=job.name)
+            else:
+                with profiler.phase("plot_cached", job.name, nbytes + profiler.file_size(cached[num])) as record:
+                    results[num] = plot_crossings(job)
+                    shutil.copyfile(cached[num], job.output)
+                    record["written"] = profiler.file_size(job.output)
+
+    if cache is not None:
+        cache.evict()
+    return results
+
+
+def render_plot_blobs(jobs, workers: int = None, dpi: int = PLOT_DPI, cache: images.ImageCache = None) -> list:
+    """Render plots in memory, return [(image bytes, crossings)] in the order of jobs.
+
+    Nothing is written next to the data, with cache unchanged plots are read
+    from it and new ones are added to it. A single plot to render (or
+    workers=1) is rendered in this process.
+    """
+    results = [None] * len(jobs)
+    keys = {}
+    missing = []
+    for num, job in enumerate(jobs):
+        if cache is not None:
+            keys[num] = plot_key(job, dpi), os.path.splitext(job.output)[1].lower()
+            cached = cache.lookup(*keys[num])
+            if cached is not None:
+                with profiler.phase("plot_cached", job.name, profiler.file_size(cached)):
+                    with open(cached, "rb") as f:
+                        results[num] = f.read(), plot_crossings(job)
+                continue
+        missing.append(num)
+
+    if workers == 1 or len(missing) <= 1:
+        for num in missing:
+            with profiler.phase("plot", jobs[num].name, data_size(jobs[num])) as record:
+                results[num] = render_plot_blob(jobs[num], dpi)
+                record["written"] = len(results[num][0]) if cache is not None else 0
+    elif missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {num: pool.submit(profiler.timed_call, render_plot_blob, jobs[num], dpi) for num in missing}
+            for num, future in futures.items():
+                results[num], seconds = future.result()
+                written = len(results[num][0]) if cache is not None else 0
+                profiler.PROFILER.add("plot", seconds, data_size(jobs[num]), written, item=jobs[num].name)
+
+    if cache is not None:
+        for num in missing:
+            cache.store_blob(*keys[num], results[num][0])
+        cache.evict()
+    return results
@@ -0,0 +1,100 @@
+"""Phase profiler of cfd_agp runs (--profile): counts, bytes read and written and wall time of every phase and item"""
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import time
+
+
+class Profiler:
+    """Collect time (monotonic clock) and bytes read and written per phase. Nothing is recorded until enabled.
+
+    Bytes are those of files read or written by the phase, data already in memory are not counted.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.monotonic()
+        self.phases = {}
+        self.events = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str, item: str = None, read: int = 0, written: int = 0):
+        """Time the block, yields a dict whose "read" / "written" may be updated when sizes are known only at the end."""
+        start = time.monotonic()
+        record = {"read": read, "written": written}
+        try:
+            yield record
+        finally:
+            self.add(name, time.monotonic() - start, record["read"], record["written"], item)
+
+    def add(self, name: str, seconds: float, read: int = 0, written: int = 0, item: str = None):
+        if not self.enabled:
+            return
+        stats = self.phases.setdefault(name, {"count": 0, "seconds": 0.0, "read": 0, "written": 0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["read"] += read
+        stats["written"] += written
+        if item is not None:
+            self.events.append({"phase": name, "item": item, "seconds": seconds, "read": read, "written": written})
+
+    def report(self) -> dict:
+        # ru_maxrss is in kB on Linux, worker processes are counted separately
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return {
+            "wall_seconds": time.monotonic() - self.started,
+            "peak_rss_mb": peak_rss / 1024,
+            "peak_rss_children_mb": peak_rss_children / 1024,
+            "bytes_read": sum(stats["read"] for stats in self.phases.values()),
+            "bytes_written": sum(stats["written"] for stats in self.phases.values()),
+            "phases": self.phases,
+            "events": self.events,
+        }
+
+    def save(self, report_path: str):
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+PROFILER = Profiler()
+
+
+def phase(name: str, item: str = None, read: int = 0, written: int = 0):
+    """Time a block as a phase of the global profiler: with profiler.phase("save"): ..."""
+    return PROFILER.phase(name, item, read, written)
+
+
+def timed_call(fn, *args):
+    """Return (fn(*args), seconds), for timing work done in worker processes."""
+    start = time.monotonic()
+    return fn(*args), time.monotonic() - start
+
+
+def file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def start(report_path: str, stats_path: str = None):
+    """Enable the global profiler, the JSON report (and optional pstats dump) is written at exit."""
+    PROFILER.enabled = True
+    PROFILER.started = time.monotonic()
+
+    profile = None
+    if stats_path:
+        profile = cProfile.Profile()
+        profile.enable()
+
+    def _finish():
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(stats_path)
+        PROFILER.save(report_path)
+
+    atexit.register(_finish)
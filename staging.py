@@ -0,0 +1,87 @@
+"""Concurrent prefetch of variant images from (network) storage into a local staging directory"""
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+STAGE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cfd_agp", "staging")
+STAGE_MAX_BYTES = 4 * 1024**3
+# Fetches are latency bound (NFS), so more of them run at once than there are CPUs
+PREFETCH_PARALLEL = 16
+
+
+class StagingArea:
+    """Local copies of remote files keyed by source path, size and mtime, with size-bounded LRU eviction.
+
+    A changed source gets a new key, its old copy is evicted as least recently used.
+    """
+
+    def __init__(self, stage_dir: str = None, max_bytes: int = STAGE_MAX_BYTES):
+        self.stage_dir = stage_dir or STAGE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.stage_dir, exist_ok=True)
+
+    def path(self, src: str, size: int, mtime_ns: int) -> str:
+        stamp = "{}:{}:{}".format(os.path.abspath(src), size, mtime_ns)
+        ext = os.path.splitext(src)[1].lower()
+        return os.path.join(self.stage_dir, hashlib.sha1(stamp.encode()).hexdigest() + ext)
+
+    def fetch(self, src: str, size: int, mtime_ns: int) -> str:
+        """Return local copy of src, copy it first if it is not staged yet (atomically)."""
+        local = self.path(src, size, mtime_ns)
+        try:
+            os.utime(local)
+            return local
+        except FileNotFoundError:
+            pass
+
+        fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=self.stage_dir)
+        try:
+            with os.fdopen(fd, "wb") as dst, open(src, "rb") as f:
+                shutil.copyfileobj(f, dst, 1 << 20)
+            os.replace(tmp_path, local)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return local
+
+    def evict(self, keep=()):
+        """Remove least recently used copies until the staging directory fits into max_bytes.
+
+        Files in keep (staged for the running build) are never removed.
+        """
+        keep = set(keep)
+        entries = [entry for entry in os.scandir(self.stage_dir) if entry.is_file()]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.path in keep:
+                continue
+            total -= entry.stat().st_size
+            os.unlink(entry.path)
+
+
+def prefetch(files, stage: StagingArea = None, parallel: int = PREFETCH_PARALLEL) -> dict:
+    """Stage (src, assets.Asset) files concurrently, at most parallel fetches at once.
+
+    Returns {src: local path}. Files which can not be copied are left out and
+    are then read from their source as usual.
+    """
+    stage = stage or StagingArea()
+    files = dict(files)
+
+    def _fetch(src):
+        asset = files[src]
+        try:
+            return src, stage.fetch(src, asset.size, asset.mtime_ns)
+        except OSError:
+            return src, None
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        staged = {src: local for src, local in pool.map(_fetch, files) if local is not None}
+
+    stage.evict(keep=staged.values())
+    return staged
@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Modules of cfd_agp are flat top-level modules next to main.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Caches and stores (~/.cache/cfd_agp) are created in a home of the test run, never in the user's one
+os.environ["HOME"] = tempfile.mkdtemp(prefix="cfd_agp-tests-")
+
+
+@pytest.fixture(scope="session")
+def project(tmp_path_factory):
+    """Small synthetic project: 5 variants (slides are paged), 5 slides, 1 plot data file per variant."""
+    from benchmarks import synthetic
+
+    return synthetic.generate_project(
+        str(tmp_path_factory.mktemp("project")),
+        variants=5,
+        slides=5,
+        image_size=(320, 180),
+        stations=3,
+        points=200,
+        plots=1,
+        plot_points=100,
+        plane=(10, 20),
+    )
+
+
+def build_args(project, output: str, *options):
+    """Command line arguments of a build of the synthetic project, as main.py gets them."""
+    import cli
+
+    args = cli.get_parser().parse_args([project["settings_cfg"], *options])
+    cli.read_settings(project["settings_cfg"], args)
+    args.output_pptx = output
+    return args
+
+
+def zip_members(path: str) -> dict:
+    """{member name: content} of a saved deck."""
+    import zipfile
+
+    with zipfile.ZipFile(path) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
@@ -0,0 +1,41 @@
+import os
+
+import assets
+
+
+def test_blob_cache_keeps_only_wanted_files(tmp_path):
+    pinned, other = tmp_path / "pinned.png", tmp_path / "other.png"
+    pinned.write_bytes(b"p" * 10)
+    other.write_bytes(b"o" * 20)
+
+    cache = assets.BlobCache()
+    assert cache.open(str(pinned)).read() == b"p" * 10
+    assert cache.open(str(other), keep=False).read() == b"o" * 20
+    assert cache.nbytes == 10
+
+    # Kept file is served from memory (same size and mtime), the other one is read again
+    mtime = pinned.stat().st_mtime_ns
+    pinned.write_bytes(b"q" * 10)
+    os.utime(str(pinned), ns=(mtime, mtime))
+    other.write_bytes(b"changed")
+    assert cache.read(str(pinned), keep=False) == b"p" * 10
+    assert cache.read(str(other), keep=False) == b"changed"
+
+
+def test_blob_cache_reads_changed_files_again(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(b"first")
+    cache = assets.BlobCache()
+    assert cache.read(str(path)) == b"first"
+
+    path.write_bytes(b"second build")
+    assert cache.read(str(path)) == b"second build"
+    assert cache.nbytes == len(b"second build")
+
+
+def test_blob_cache_bound(tmp_path):
+    path = tmp_path / "big.png"
+    path.write_bytes(b"x" * 100)
+    cache = assets.BlobCache(max_bytes=50)
+    assert cache.read(str(path)) == b"x" * 100
+    assert cache.nbytes == 0
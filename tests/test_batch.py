@@ -0,0 +1,37 @@
+import configparser
+
+from conftest import build_args, zip_members
+
+import batch
+
+
+def write_settings(project, path, output, variant_path=None):
+    settings = configparser.ConfigParser(interpolation=None)
+    settings.read(project["settings_cfg"])
+    settings["DEFAULT"]["output_pptx"] = output
+    if variant_path:
+        settings["var1"]["path"] = variant_path
+    with open(str(path), "w") as f:
+        settings.write(f)
+    return str(path)
+
+
+def test_build_decks_summary_with_failing_and_duplicate_decks(project, tmp_path, capsys):
+    first = write_settings(project, tmp_path / "a.cfg", str(tmp_path / "A.pptx"))
+    broken = write_settings(project, tmp_path / "b.cfg", str(tmp_path / "B.pptx"), str(tmp_path / "MISSING"))
+    same = write_settings(project, tmp_path / "c.cfg", str(tmp_path / "sub" / ".." / "A.pptx"))
+    defaults = build_args(project, "OUTPUT.pptx")
+
+    results = batch.build_decks([str(tmp_path / "*.cfg"), str(tmp_path / "none.cfg")], defaults, workers=2)
+    assert [res.settings for res in results] == [first, broken, same, str(tmp_path / "none.cfg")]
+    assert [res.ok for res in results] == [True, False, False, False]
+    assert results[1].error == "aborted"
+    assert results[2].error.startswith("Output ") and results[2].error.endswith("is also the output of " + first)
+    assert results[3].error.startswith("FileNotFoundError")
+
+    batch.build(build_args(project, str(tmp_path / "single.pptx")))
+    assert zip_members(str(tmp_path / "A.pptx")).keys() == zip_members(str(tmp_path / "single.pptx")).keys()
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".part"]
+
+    batch.print_summary(results)
+    assert "1 presentations built, 3 failed" in capsys.readouterr().out
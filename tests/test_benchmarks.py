@@ -0,0 +1,67 @@
+import configparser
+import os
+
+import pytest
+
+from benchmarks import synthetic
+
+TINY = dict(variants=2, slides=6, image_size=(64, 36), stations=3, points=50, plots=2, plot_points=40, plane=(4, 5))
+
+
+@pytest.fixture
+def run(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+    import run
+
+    return run
+
+
+def test_generated_project(tmp_path):
+    project = synthetic.generate_project(str(tmp_path / "first"), **TINY)
+    slides = configparser.ConfigParser()
+    slides.read(project["slides_cfg"])
+    sections = [section for section in slides.sections() if section.startswith("Slide ")]
+    assert [slides[section]["layout"] for section in sections] == ["4", "2", "5", "3", "6", "4"]
+    assert dict(slides["Plots"]) == {"plot_00": "Ux_z_distance_000", "plot_01": "Ux_z_distance_001"}
+
+    settings = configparser.ConfigParser(interpolation=None)
+    settings.read(project["settings_cfg"])
+    assert [settings[section]["path"] for section in settings.sections()] == project["variants"]
+    assert settings["DEFAULT"]["cfg_file"] == project["slides_cfg"]
+
+    # Every image of every slide, 3 stations and 2 plot data files per variant
+    images = 2 + 1 + 2 + 1 + 2 + 2 + 3
+    for variant in project["variants"]:
+        names = os.listdir(os.path.join(variant, "PICTURES"))
+        assert len([name for name in names if name.endswith(".jpeg")]) == images
+        assert sorted(name for name in names if name.startswith("Ux_GRAD_0.")) == [
+            "Ux_GRAD_0.655",
+            "Ux_GRAD_0.728",
+            "Ux_GRAD_0.800",
+        ]
+    with open(project["plane_file"]) as f:
+        assert len(f.read().splitlines()) == 2 + 4 * 5 + 1
+
+    # Same parameters give the same project
+    again = synthetic.generate_project(str(tmp_path / "second"), **TINY)
+    for name in ("IMG000-0.jpeg", "Ux_GRAD_0.655", "Ux_z_distance_001"):
+        with open(os.path.join(project["variants"][1], "PICTURES", name), "rb") as first:
+            with open(os.path.join(again["variants"][1], "PICTURES", name), "rb") as second:
+                assert first.read() == second.read()
+
+
+def test_run_size_and_compare(run, capsys):
+    result = run.run_size("tiny", TINY, run.DEFAULT_TEMPLATE, ["gradients_plane", "gradients_from_file"], repeat=2)
+    assert result["size"] == "tiny"
+    assert result["params"]["image_size"] == [64, 36]
+    for timing in result["timings"].values():
+        assert len(timing["samples"]) == 2 and timing["min"] <= timing["median"]
+
+    # Only benchmarks of the baseline are compared
+    twice = {"median": result["timings"]["gradients_plane"]["median"] * 2}
+    baseline = {"results": [dict(result, timings={"gradients_plane": twice})]}
+    capsys.readouterr()
+    run.compare({"results": [result]}, baseline)
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 2
+    assert lines[1].startswith("tiny     gradients_plane") and lines[1].endswith(" 0.50x")
@@ -0,0 +1,100 @@
+import os
+
+import assets
+import catalog
+
+
+def make_variant(root, name, files):
+    pictures = root / name / "PICTURES"
+    pictures.mkdir(parents=True)
+    for file_name in files:
+        (pictures / file_name).write_bytes(b"x" * 10)
+    return pictures
+
+
+def test_crawl_variants_and_incremental_recrawl(tmp_path):
+    root = tmp_path / "PRJ"
+    exports = ["Ux_GRAD_0.655", "Ux_GRAD_0.700", "Ux_GRAD_0.750", "Ux_GRAD_0.800", "Ux_z_distance_070", "Ux_x_070"]
+    # Written by cfd_agp: XY sidecars, results of the gradient analysis, heat map of a slice plane (and the plane)
+    outputs = ["Ux_z_distance_070.xy.npy", "Ux_z_distance_070.xy.json", "Ux_x_070.xy.npy.k3j2.tmp"]
+    outputs += ["Ux_GRAD_results_OKNO", "Ux_GRAD_results_DVERE", "Ux_GRAD_plane.csv", "Ux_GRAD_plane_heatmap.png"]
+    make_variant(root / "SK370", "S100-BASIC", ["A.jpeg"] + exports + outputs)
+    make_variant(root / "SK370", "S200-MIRROR", ["A.jpeg", "B.png"])
+    (root / ".hidden" / "S300" / "PICTURES").mkdir(parents=True)
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+
+    stats = cat.crawl(str(root))
+    assert (stats.variants, stats.files) == (2, 3 + len(exports) + len(outputs))
+    found = {os.path.basename(info.path): info[1:] for info in cat.variants()}
+    assert found == {"S100-BASIC": (2, 4, 2), "S200-MIRROR": (2, 0, 0)}
+    assert [os.path.basename(info.path) for info in cat.variants("*MIRROR")] == ["S200-MIRROR"]
+
+    # Nothing changed: directories are only stat'ed
+    assert cat.crawl(str(root)).scanned == 0
+
+    # Removed variant disappears, new file is listed
+    (root / "SK370" / "S200-MIRROR" / "PICTURES" / "B.png").unlink()
+    (root / "SK370" / "S200-MIRROR" / "PICTURES" / "C.png").write_bytes(b"c")
+    stats = cat.crawl(str(root))
+    assert stats.scanned == 1
+    listing = cat.listing(str(root / "SK370" / "S200-MIRROR" / "PICTURES"))
+    assert sorted(listing) == ["A.jpeg", "C.png"]
+    cat.close()
+
+
+def test_older_catalog_is_crawled_again(tmp_path):
+    make_variant(tmp_path, "V1", ["Ux_z_distance_070", "Ux_z_distance_070.xy.npy"])
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+    cat.crawl(str(tmp_path))
+    cat.db.execute("PRAGMA user_version = 1")
+    cat.db.commit()
+    cat.close()
+
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+    assert list(cat.variants()) == []
+    assert cat.crawl(str(tmp_path)).scanned == 3
+    assert [info[1:] for info in cat.variants()] == [(0, 0, 1)]
+    cat.close()
+
+
+def test_listing_is_none_after_directory_changed(tmp_path):
+    pictures = make_variant(tmp_path, "V1", ["A.jpeg"])
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+    cat.crawl(str(tmp_path))
+    assert list(cat.listing(str(pictures))) == ["A.jpeg"]
+
+    (pictures / "B.jpeg").write_bytes(b"b")
+    os.utime(str(pictures), ns=(0, 1))
+    assert cat.listing(str(pictures)) is None
+    cat.close()
+
+
+def test_asset_index_stats_catalogued_files(tmp_path):
+    pictures = make_variant(tmp_path, "V1", ["A.jpeg"])
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+    cat.crawl(str(tmp_path))
+
+    # Rewritten in place: the directory does not change, the catalog keeps the old size
+    mtime = os.stat(str(pictures)).st_mtime_ns
+    (pictures / "A.jpeg").write_bytes(b"longer content")
+    os.utime(str(pictures), ns=(mtime, mtime))
+
+    index = assets.AssetIndex([str(pictures)], catalog=cat)
+    assert str(pictures) in index.catalogued
+    assert index.exists(str(pictures / "A.jpeg"))
+    assert not index.exists(str(pictures / "B.jpeg"))
+    assert index.get(str(pictures / "A.jpeg")).size == len(b"longer content")
+    assert index.get(str(pictures / "B.jpeg")) is None
+    cat.close()
+
+
+def test_expand_variants(tmp_path, monkeypatch):
+    make_variant(tmp_path, "S100-A", [])
+    make_variant(tmp_path, "S200-A", [])
+    cat = catalog.Catalog(str(tmp_path / "catalog.sqlite"))
+    cat.crawl(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    expanded = catalog.expand_variants(["S*-A", "S900*", {"path": "X"}], cat)
+    assert expanded == ["S100-A", "S200-A", "S900*", {"path": "X"}]
+    cat.close()
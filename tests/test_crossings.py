@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+import gradients
+
+
+def loop_crossings(x, y, span=1):
+    """Original per-point loop of plot_gradients: [(idx, refined, slope, intercept)].
+
+    Windows leaving the line are skipped, as find_crossings does (the loop failed
+    on them at the start and fitted fewer points at the end).
+    """
+    x, y = list(x), list(y)
+    found = []
+    for idx in range(1, len(y) - 1):
+        prev_num, num, next_num = y[idx - 1], y[idx], y[idx + 1]
+        if prev_num > 0 and num < 0 or prev_num < 0 and num > 0:
+            num = min(abs(val) for val in (prev_num, num, next_num))
+            try:
+                new_index = y.index(num)
+            except ValueError:
+                new_index = y.index(-num)
+            if new_index - span < 0 or new_index + span > len(y) - 1:
+                continue
+            window = slice(new_index - span, new_index + span + 1)
+            m, b = np.polyfit(x[window], y[window], 1)
+            found.append((idx, new_index, m, b))
+    return found
+
+
+def assert_same(crossings, expected):
+    assert crossings["idx"].tolist() == [row[0] for row in expected]
+    assert crossings["refined"].tolist() == [row[1] for row in expected]
+    np.testing.assert_allclose(crossings["slope"], [row[2] for row in expected], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(crossings["intercept"], [row[3] for row in expected], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("span", [1, 2])
+def test_matches_loop_on_noisy_line(span):
+    rng = np.random.default_rng(1)
+    x = np.sort(rng.uniform(0.0, 1.0, 400))
+    y = 30 * np.sin(25 * x) + rng.normal(0, 3, x.size)
+    crossings = gradients.find_crossings(x, y, span=span)
+    assert crossings.size > 10
+    assert_same(crossings, loop_crossings(x, y, span))
+
+
+def test_single_crossing_values():
+    x = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    y = np.array([4.0, 2.5, -1.0, -3.0, -6.0])
+    (crossing,) = gradients.find_crossings(x, y)
+    assert crossing["idx"] == 2
+    assert crossing["refined"] == 2
+    assert crossing["x"] == 2.0
+    assert crossing["x0"] == pytest.approx(1 + 2.5 / 3.5)
+    assert (crossing["prev"], crossing["cur"], crossing["next"]) == (2.5, -1.0, -3.0)
+    assert crossing["slope"] == pytest.approx(-2.75)
+
+
+def test_zero_is_not_a_sign_change():
+    y = np.array([2.0, 1.0, 0.0, -1.0, -2.0])
+    assert gradients.find_crossings(np.arange(5.0), y).size == 0
+
+
+def test_edge_windows_are_dropped():
+    # Sign change at idx 1 refined to the first point: its fit window would leave the line
+    x = np.arange(6.0)
+    y = np.array([0.1, -5.0, -6.0, -7.0, -8.0, -9.0])
+    assert gradients.find_crossings(x, y).size == 0
+    assert loop_crossings(x, y) == []
+
+    # Same at the end, and with a wider span a crossing near the middle is kept
+    y = np.array([9.0, 8.0, 7.0, 6.0, -5.0, -0.1])
+    assert gradients.find_crossings(x, y).size == 0
+    y = np.array([5.0, 4.0, 1.0, -1.0, -4.0, -5.0])
+    assert gradients.find_crossings(x, y, span=2)["refined"].tolist() == [2]
+    assert gradients.find_crossings(x, y, span=3).size == 0
+
+
+def test_first_and_last_points_are_not_crossings():
+    x = np.arange(4.0)
+    assert gradients.find_crossings(x, np.array([1.0, 2.0, 3.0, -4.0])).size == 0
+    assert gradients.find_crossings(x[:2], np.array([1.0, -1.0])).size == 0
+
+
+def test_nan_holes():
+    x = np.arange(8.0)
+    # No crossing is found across a hole
+    y = np.array([3.0, 2.0, np.nan, -1.0, -2.0, -3.0, -4.0, -5.0])
+    assert gradients.find_crossings(x, y).size == 0
+
+    # The hole is never the refined point, a fit window reaching into it gives NaN slope
+    y = np.array([3.0, 2.0, 1.0, -1.0, np.nan, -2.0, -3.0, -4.0])
+    (crossing,) = gradients.find_crossings(x, y)
+    assert crossing["idx"] == 3
+    assert crossing["refined"] == 2
+    assert crossing["slope"] == pytest.approx(-1.5)
+    y = np.array([3.0, 2.0, 1.5, -1.0, np.nan, -2.0, -3.0, -4.0])
+    (crossing,) = gradients.find_crossings(x, y)
+    assert crossing["refined"] == 3
+    assert np.isnan(crossing["slope"])
+
+
+def test_field_rows_match_find_crossings():
+    rng = np.random.default_rng(2)
+    x = np.linspace(0.0, 1.0, 120)
+    field = np.sin(rng.uniform(5, 30, (6, 1)) * x) + rng.normal(0, 0.05, (6, x.size))
+    field[3, 40:45] = np.nan
+    rows, crossings = gradients.find_field_crossings(x, field)
+    assert np.all(np.diff(rows) >= 0)
+    for row in range(field.shape[0]):
+        expected = gradients.find_crossings(x, field[row])
+        np.testing.assert_array_equal(crossings[rows == row]["refined"], expected["refined"])
+        np.testing.assert_allclose(crossings[rows == row]["slope"], expected["slope"])
+
+
+def test_shape_errors():
+    with pytest.raises(ValueError):
+        gradients.find_crossings(np.arange(3.0), np.arange(4.0))
+    with pytest.raises(ValueError):
+        gradients.find_field_crossings(np.arange(3.0), np.arange(3.0))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import gradients
+from benchmarks import synthetic
+
+
+def reference_line(path):
+    """Former reading of an extraction file: python engine with skipfooter and a groupby of the z column."""
+    df = pd.read_table(path, comment="$", delimiter=",", engine="python", skipfooter=1, names=["val", "z"])
+    df_group = df.groupby("z", sort=False).apply(lambda x: tuple(x["val"])).reset_index()
+    dist = np.array([vals[0] for vals in df_group.get(0)], dtype=float)
+    zcoord = np.array([vals[1] for vals in df_group.get(0)], dtype=float)
+    grad = df_group.get("z").to_numpy(dtype=float)
+    return dist, zcoord, grad
+
+
+@pytest.fixture(scope="module")
+def station(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("station") / "Ux_GRAD_0.655")
+    synthetic.write_grad_station(path, 50, seed=2)
+    return path
+
+
+# 100 data rows: chunks ending right before the footer, one row short of it and one past it
+@pytest.mark.parametrize("chunk_rows", [1, 7, 50, 99, 100, 101, gradients.CHUNK_ROWS])
+def test_chunked_read_equals_full_read(station, chunk_rows):
+    val, z = gradients.read_grad_file(station, chunk_rows=chunk_rows)
+    assert val.size == z.size == 100
+    for ours, expected in zip(gradients.group_extraction_line(val, z), reference_line(station)):
+        np.testing.assert_array_equal(ours, expected)
+
+
+def test_footer_is_cut_by_byte_offset(tmp_path):
+    path = tmp_path / "Ux_GRAD_0.700"
+    path.write_bytes(b"$ header\n 0.1, 5\n 0.6, 5\n 0.2, -3\n 0.7, -3\nFooter line, 9\n\n  \n")
+    with open(str(path), "rb") as f:
+        offsets = {gradients._footer_offset(f, block=block) for block in (1, 3, 8, 4096)}
+    assert offsets == {path.read_bytes().index(b"Footer")}
+
+    val, z = gradients.read_grad_file(str(path), chunk_rows=2)
+    np.testing.assert_array_equal(val, [0.1, 0.6, 0.2, 0.7])
+    np.testing.assert_array_equal(z, [5, 5, -3, -3])
+    dist, zcoord, grad = gradients.group_extraction_line(val, z)
+    np.testing.assert_array_equal(dist, [0.1, 0.2])
+    np.testing.assert_array_equal(zcoord, [0.6, 0.7])
+    np.testing.assert_array_equal(grad, [5, -3])
+
+
+def test_file_with_footer_only(tmp_path):
+    path = tmp_path / "Ux_GRAD_0.800"
+    path.write_text("$ header\nEND\n")
+    val, z = gradients.read_grad_file(str(path))
+    assert val.size == z.size == 0
+    assert all(column.size == 0 for column in gradients.group_extraction_line(val, z))
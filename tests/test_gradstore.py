@@ -0,0 +1,95 @@
+import glob
+import os
+import re
+import shutil
+import sys
+import zipfile
+
+import numpy as np
+
+import gradients
+import gradstore
+import profiler
+
+
+def copy_stations(project, tmp_path):
+    pictures = tmp_path / "PRJ" / "PICTURES"
+    pictures.mkdir(parents=True)
+    for path in glob.glob(os.path.join(project["variants"][0], "PICTURES", "Ux_GRAD_0.*")):
+        shutil.copy(path, str(pictures))
+    return sorted(str(path) for path in pictures.iterdir())
+
+
+def analysed(monkeypatch, *args, **kwargs):
+    """(results of analyse_stations, files analysed, not taken from the store)"""
+    prof = profiler.Profiler()
+    prof.enabled = True
+    monkeypatch.setattr(profiler, "PROFILER", prof)
+    results = gradstore.analyse_stations(*args, **kwargs)
+    return results, [event["item"] for event in prof.events if event["phase"] == "gradients_station"]
+
+
+def test_store_hit_and_miss(project, tmp_path, monkeypatch):
+    files = copy_stations(project, tmp_path)
+    jobs = [("V1", path) for path in files]
+    store = gradstore.GradientStore(str(tmp_path / "gradients.sqlite"))
+
+    first, done = analysed(monkeypatch, jobs, store, workers=1)
+    assert done == files
+    second, done = analysed(monkeypatch, jobs, store, workers=1)
+    assert done == []
+    for res, stored in zip(first, second):
+        assert (stored.variant, stored.x_coord, stored.maxima) == (res.variant, res.x_coord, res.maxima)
+        np.testing.assert_array_equal(stored.crossings, res.crossings)
+        assert list(stored.location) == list(res.location)
+
+    # Changed file and other zones are analysed again
+    with open(files[1]) as f:
+        content = f.read()
+    with open(files[1], "w") as f:
+        f.write("$ exported again\n" + content)
+    assert analysed(monkeypatch, jobs, store, workers=1)[1] == [files[1]]
+    zones = [gradients.parse_zone("All", "-100 -100, 100 -100, 100 100, -100 100")]
+    assert analysed(monkeypatch, jobs, store, zones=zones, workers=1)[1] == files
+    store.close()
+
+
+def test_export_xlsx(project, tmp_path):
+    files = copy_stations(project, tmp_path)
+    store = gradstore.GradientStore(str(tmp_path / "gradients.sqlite"))
+    results = gradstore.analyse_stations([("", path) for path in files], store, workers=1)
+    xlsx = str(tmp_path / "results.xlsx")
+    assert store.export_xlsx(xlsx, projects=[str(tmp_path / "PRJ")]) == len(files)
+    assert store.export_xlsx(str(tmp_path / "none.xlsx"), projects=[str(tmp_path / "OTHER")]) == 0
+    store.close()
+
+    with zipfile.ZipFile(xlsx) as zf:
+        workbook = zf.read("xl/workbook.xml").decode()
+        rows = [
+            len(re.findall(r"<row ", zf.read("xl/worksheets/sheet{}.xml".format(num)).decode())) for num in (1, 2, 3)
+        ]
+    assert re.findall(r'<sheet name="(\w+)"', workbook) == ["Stations", "Maxima", "Crossings"]
+    assert rows == [
+        len(files) + 1,
+        sum(len(res.maxima) for res in results) + 1,
+        sum(res.crossings.size for res in results) + 1,
+    ]
+
+
+def test_gradients_benchmark_samples_are_cold(project, tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+    import run
+
+    files = copy_stations(project, tmp_path)
+    bench_project = dict(project, root=str(tmp_path), variants=[str(tmp_path / "PRJ")])
+    prof = profiler.Profiler()
+    prof.enabled = True
+    monkeypatch.setattr(profiler, "PROFILER", prof)
+    monkeypatch.chdir(tmp_path)
+    for sample in range(2):
+        run.bench_gradients_from_file(bench_project, run.DEFAULT_TEMPLATE)
+
+    assert prof.phases["gradients_station"]["count"] == 2 * len(files)
+    assert os.path.exists(str(tmp_path / "gradients.sqlite"))
+    assert not os.path.exists(gradstore.DB_PATH)
+    sys.modules.pop("run", None)
@@ -0,0 +1,63 @@
+import os
+
+from PIL import Image
+
+import images
+
+
+def write_image(path, size, fmt):
+    Image.new("RGB", size, (40, 120, 200)).save(str(path), fmt)
+    return str(path)
+
+
+def test_target_pixels():
+    assert images.target_pixels(images.EMU_PER_INCH * 2, images.EMU_PER_INCH, 100) == (200, 100)
+    assert images.target_pixels(10, 10, 100) == (1, 1)
+
+
+def test_downscaled_image_is_cached(tmp_path):
+    src = write_image(tmp_path / "big.jpg", (800, 400), "JPEG")
+    cache = images.ImageCache(str(tmp_path / "cache"))
+
+    prepared = images.prepare_image(src, (200, 50), cache)
+    assert os.path.dirname(prepared) == cache.cache_dir
+    with Image.open(prepared) as img:
+        # Covers the placeholder, aspect ratio is kept
+        assert (img.format, img.size) == ("JPEG", (200, 100))
+
+    os.utime(prepared, (0, 0))
+    assert images.prepare_image(src, (200, 50), cache) == prepared
+    assert os.stat(prepared).st_mtime > 0
+    assert len(os.listdir(cache.cache_dir)) == 1
+
+    # Other size and changed source are new entries
+    assert images.prepare_image(src, (100, 50), cache) != prepared
+    write_image(src, (800, 401), "JPEG")
+    assert images.prepare_image(src, (200, 50), cache) != prepared
+    assert len(os.listdir(cache.cache_dir)) == 3
+
+
+def test_small_and_unreadable_images(tmp_path):
+    small = write_image(tmp_path / "small.png", (100, 50), "PNG")
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    big = write_image(tmp_path / "big.png", (400, 200), "PNG")
+    emu = (images.EMU_PER_INCH, images.EMU_PER_INCH // 2)
+    cache = images.ImageCache(str(tmp_path / "cache"))
+
+    prepared = images.prepare_images([(small, emu), (str(broken), emu), (big, emu), (big, emu)], dpi=200, cache=cache)
+    assert list(prepared) == [(small, emu), (big, emu)]
+    assert prepared[(small, emu)] == small
+    with Image.open(prepared[(big, emu)]) as img:
+        assert (img.format, img.size) == ("PNG", (200, 100))
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = images.ImageCache(str(tmp_path / "cache"), max_bytes=250)
+    for num, name in enumerate(("used", "old", "new")):
+        os.utime(cache.store_blob(name, ".png", b"x" * 100), (num, num))
+    assert cache.lookup("used", ".png") == cache.path("used", ".png")
+    assert cache.lookup("missing", ".png") is None
+
+    cache.evict()
+    assert sorted(os.listdir(cache.cache_dir)) == ["new.png", "used.png"]
@@ -0,0 +1,43 @@
+import os
+import shutil
+
+import pptx
+
+import layouts
+
+TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TEMPLATES", "SABLONA-RAPID-AEROAKUSTIKA.pptx"
+)
+
+
+def test_layout_map_is_cached_per_template(tmp_path):
+    template = str(tmp_path / "template.pptx")
+    shutil.copy(TEMPLATE, template)
+    cache_dir = str(tmp_path / "cache")
+    prs = pptx.Presentation(template)
+
+    compiled = layouts.load_layouts(template, prs, cache_dir=cache_dir)
+    assert compiled == layouts.compile_layouts(prs)
+    assert any(ph.picture for layout in compiled for ph in layout.placeholders.values())
+    # Cache hit does not need the presentation
+    assert layouts.load_layouts(template, None, cache_dir=cache_dir) == compiled
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Changed template is compiled again
+    prs.slide_layouts[1].name = "Renamed layout"
+    prs.save(template)
+    changed = layouts.load_layouts(template, pptx.Presentation(template), cache_dir=cache_dir)
+    assert changed[1].name == "Renamed layout" and compiled[1].name != "Renamed layout"
+    assert len(os.listdir(cache_dir)) == 2
+    assert layouts.load_layouts(template, None, cache_dir=cache_dir) == changed
+
+
+def test_broken_cache_entry_is_compiled_again(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cache_path = cache_dir / "{}-v{}.json".format(layouts.template_hash(TEMPLATE), layouts.LAYOUT_CACHE_VERSION)
+    cache_path.write_text('[{"master": 0}]')
+    prs = pptx.Presentation(TEMPLATE)
+
+    assert layouts.load_layouts(TEMPLATE, prs, cache_dir=str(cache_dir)) == layouts.compile_layouts(prs)
+    assert layouts.load_layouts(TEMPLATE, None, cache_dir=str(cache_dir)) == layouts.compile_layouts(prs)
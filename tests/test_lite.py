@@ -0,0 +1,54 @@
+import io
+import os
+import zipfile
+
+import pptx
+import pytest
+from conftest import build_args, zip_members
+from PIL import Image
+
+import batch
+import lite
+
+
+def test_streamed_lite_deck_has_no_empty_members(project, tmp_path):
+    streamed, saved = str(tmp_path / "streamed.pptx"), str(tmp_path / "saved.pptx")
+    batch.build(build_args(project, streamed, "--stream", "--lite"))
+    batch.build(build_args(project, saved, "--lite"))
+
+    for path in (streamed, saved, lite.lite_path(streamed)):
+        with zipfile.ZipFile(path) as zf:
+            assert [info.filename for info in zf.infolist() if info.file_size == 0] == []
+        pptx.Presentation(path)
+    # Template images are in the lite decks as they are, slide images are smaller
+    assert zip_members(lite.lite_path(streamed)) == zip_members(lite.lite_path(saved))
+    assert os.path.getsize(lite.lite_path(streamed)) < os.path.getsize(streamed)
+
+
+def test_lite_save_refuses_empty_parts(tmp_path):
+    prs = pptx.Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    image = tmp_path / "image.png"
+    Image.new("RGB", (40, 30), "red").save(str(image))
+    slide.shapes.add_picture(str(image), 0, 0)
+    part = slide.part.related_part(slide.shapes[0]._pic.blip_rId)
+    part._blob = b""
+
+    with pytest.raises(ValueError):
+        lite.LiteImages().save(prs.part.package, str(tmp_path / "lite.pptx"))
+    assert os.listdir(str(tmp_path)) == ["image.png"]
+
+
+def test_collect_keeps_encoded_images_only(tmp_path):
+    prs = pptx.Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    image = tmp_path / "image.jpeg"
+    Image.new("RGB", (2000, 1000), "blue").save(str(image))
+    slide.shapes.add_picture(str(image), 0, 0, width=pptx.util.Inches(2))
+
+    images = lite.LiteImages()
+    images.collect([slide])
+    ((size, (blob, content_type, ext)),) = images.encoded.values()
+    assert (content_type, ext) == ("image/jpeg", "jpg")
+    with Image.open(io.BytesIO(blob)) as img:
+        assert img.size == (2 * lite.LITE_DPI, lite.LITE_DPI)
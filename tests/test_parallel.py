@@ -0,0 +1,61 @@
+import io
+import zipfile
+
+import pptx
+from conftest import build_args, zip_members
+
+import batch
+import parallel
+
+DATE_TIME = (2024, 5, 17, 13, 45, 58)
+MEMBERS = [
+    ("[Content_Types].xml", b"<Types/>" * 50),
+    ("ppt/slides/slide1.xml", b"<p:sld>" + bytes(range(256)) * 40 + b"</p:sld>"),
+    ("ppt/media/image1.png", b""),
+]
+
+
+def test_deflated_zip_matches_zipfile_writestr():
+    expected = io.BytesIO()
+    with zipfile.ZipFile(expected, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, blob in MEMBERS:
+            zinfo = zipfile.ZipInfo(name, date_time=DATE_TIME)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.external_attr = 0o600 << 16
+            zf.writestr(zinfo, blob)
+
+    written = io.BytesIO()
+    zf = parallel.DeflatedZip(written, date_time=DATE_TIME)
+    for name, blob in MEMBERS:
+        zf.write(name, blob, parallel._deflate(blob))
+    zf.close()
+
+    assert written.getvalue() == expected.getvalue()
+
+
+def test_save_package_members_match_serial_save(tmp_path):
+    prs = pptx.Presentation()
+    prs.slides.add_slide(prs.slide_layouts[1]).shapes.title.text = "Parallel"
+    prs.save(str(tmp_path / "serial.pptx"))
+    parallel.save_package(prs.part.package, str(tmp_path / "parallel.pptx"), workers=4)
+
+    with zipfile.ZipFile(str(tmp_path / "serial.pptx")) as serial, zipfile.ZipFile(
+        str(tmp_path / "parallel.pptx")
+    ) as built:
+        assert built.testzip() is None
+        assert serial.namelist() == built.namelist()
+        for name in serial.namelist():
+            assert serial.read(name) == built.read(name)
+            assert serial.getinfo(name).compress_size == built.getinfo(name).compress_size
+
+
+def test_parallel_build_is_the_same_as_serial(project, tmp_path):
+    serial, built = str(tmp_path / "serial.pptx"), str(tmp_path / "parallel.pptx")
+    batch.build(build_args(project, serial))
+    batch.build(build_args(project, built, "--parallel"), workers=2)
+
+    expected = zip_members(serial)
+    members = zip_members(built)
+    assert list(members) == list(expected)
+    assert [name for name in expected if members[name] != expected[name]] == []
+    assert sum(name.startswith("ppt/media/") for name in members) > 10
@@ -0,0 +1,47 @@
+import numpy as np
+
+import gradients
+from benchmarks import synthetic
+
+
+def test_plane_columns_match_station_analysis(tmp_path):
+    plane = str(tmp_path / "Ux_GRAD_plane")
+    synthetic.write_plane(plane, (6, 40), seed=25)
+    result = gradients.analyse_plane(plane)
+
+    x, z, value = gradients.read_plane_file(plane)
+    assert result.field.shape == (6, 40)
+    assert len(result.stations) == 6
+    for col, station in enumerate(result.stations):
+        line = value[np.isclose(x, result.x[col])]
+        crossings = gradients.find_crossings(result.z, line)
+        np.testing.assert_array_equal(station.crossings, crossings)
+        location = gradients.classify_points(
+            np.full(crossings.size, result.x[col]), result.z[crossings["idx"]], gradients.DEFAULT_ZONES
+        )
+        assert list(station.location) == list(location)
+        for zone in gradients.DEFAULT_ZONES:
+            in_zone = location == zone.name
+            if in_zone.any():
+                assert station.maxima[zone.name] == np.abs(crossings["slope"][in_zone]).max()
+
+
+def test_plane_holes_and_shuffled_rows(tmp_path):
+    x, z = np.meshgrid([0.7, 0.75], np.linspace(0.6, 0.8, 11), indexing="ij")
+    value = np.where(z < 0.69, -1.0, 1.0) * (1 + x)
+    rows = np.column_stack([x.ravel(), z.ravel(), value.ravel()])
+    # Grid point missing at the sign change of the second column: no crossing is found across the hole
+    rows = rows[~((rows[:, 0] == 0.75) & np.isclose(rows[:, 1], 0.70))]
+    plane = tmp_path / "plane"
+    with open(str(plane), "w") as f:
+        f.write("$ plane\n")
+        np.savetxt(f, np.random.default_rng(1).permutation(rows), fmt="%.9g", delimiter=", ")
+        f.write("END\n")
+
+    result = gradients.analyse_plane(str(plane))
+    assert np.isnan(result.field[1, 5])
+    assert list(result.columns) == [0]
+    assert (result.crossings["idx"][0], result.crossings["refined"][0]) == (5, 4)
+    assert list(result.location) == ["Okno"]
+    assert result.maxima[0, 0] == np.abs(result.crossings["slope"][0])
+    assert np.isnan(result.maxima[:, 1]).all()
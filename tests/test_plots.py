@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import numpy as np
+
+import images
+import plots
+import profiler
+
+
+def plot_phases(monkeypatch, fn, *args, **kwargs):
+    """(result of fn, {phase: count}) with a profiler of its own."""
+    prof = profiler.Profiler()
+    prof.enabled = True
+    monkeypatch.setattr(profiler, "PROFILER", prof)
+    result = fn(*args, **kwargs)
+    return result, {name: stats["count"] for name, stats in prof.phases.items()}
+
+
+def plot_jobs(project, tmp_path):
+    series = []
+    for num, variant in enumerate(project["variants"][:2]):
+        datafile = str(tmp_path / "V{}".format(num) / "Ux_z_distance_000")
+        os.makedirs(os.path.dirname(datafile))
+        shutil.copy(os.path.join(variant, "PICTURES", "Ux_z_distance_000"), datafile)
+        series.append(("V{}".format(num), datafile))
+    return [
+        plots.PlotJob("first", series, str(tmp_path / "first.png")),
+        plots.PlotJob("second", series[:1], str(tmp_path / "second.png")),
+    ]
+
+
+def test_parallel_rendering_equals_serial(project, tmp_path):
+    jobs = plot_jobs(project, tmp_path)
+    serial = plots.render_plots(jobs, workers=1, dpi=50)
+    expected = [open(job.output, "rb").read() for job in jobs]
+    for job in jobs:
+        os.unlink(job.output)
+
+    rendered = plots.render_plots(jobs, workers=2, dpi=50)
+    assert [open(job.output, "rb").read() for job in jobs] == expected
+    assert expected[0].startswith(b"\x89PNG") and expected[0] != expected[1]
+    for results, serial_results in zip(rendered, serial):
+        assert list(results) == list(serial_results)
+        for label in results:
+            np.testing.assert_array_equal(results[label], serial_results[label])
+    assert [sorted(res) for res in rendered] == [sorted(plots.plot_crossings(job)) for job in jobs]
+
+    blobs = plots.render_plot_blobs(jobs, workers=2, dpi=50)
+    assert [blob for blob, crossings in blobs] == expected
+
+
+def test_render_plots_reuses_cache(project, tmp_path, monkeypatch):
+    jobs = plot_jobs(project, tmp_path)
+    cache = images.ImageCache(str(tmp_path / "cache"))
+
+    rendered, counts = plot_phases(monkeypatch, plots.render_plots, jobs, workers=2, dpi=50, cache=cache)
+    assert counts == {"plot": 2}
+    first = [open(job.output, "rb").read() for job in jobs]
+    for job in jobs:
+        os.unlink(job.output)
+
+    cached, counts = plot_phases(monkeypatch, plots.render_plots, jobs, workers=2, dpi=50, cache=cache)
+    assert counts == {"plot_cached": 2}
+    assert [open(job.output, "rb").read() for job in jobs] == first
+    assert [sorted(res) for res in cached] == [sorted(res) for res in rendered]
+
+    # Other DPI or changed data are rendered again
+    assert plot_phases(monkeypatch, plots.render_plots, jobs, workers=2, dpi=60, cache=cache)[1] == {"plot": 2}
+    with open(jobs[1].series[0][1], "a") as f:
+        f.write(" 0.95, 1.0\n")
+    counts = plot_phases(monkeypatch, plots.render_plots, jobs, workers=2, dpi=50, cache=cache)[1]
+    assert counts == {"plot": 2}
+    counts = plot_phases(monkeypatch, plots.render_plots, jobs[1:], workers=2, dpi=50, cache=cache)[1]
+    assert counts == {"plot_cached": 1}
+
+
+def test_render_plot_blobs_reuses_cache(project, tmp_path, monkeypatch):
+    jobs = plot_jobs(project, tmp_path)
+    cache = images.ImageCache(str(tmp_path / "cache"))
+
+    rendered, counts = plot_phases(monkeypatch, plots.render_plot_blobs, jobs, workers=1, dpi=50, cache=cache)
+    assert counts == {"plot": 2}
+    cached, counts = plot_phases(monkeypatch, plots.render_plot_blobs, jobs, workers=1, dpi=50, cache=cache)
+    assert counts == {"plot_cached": 2}
+    assert [blob for blob, crossings in cached] == [blob for blob, crossings in rendered]
+    assert not [job.output for job in jobs if os.path.exists(job.output)]
+
+
+def test_plot_benchmark_samples_are_cold(project, tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+    import run
+
+    variants = []
+    for num, variant in enumerate(project["variants"][:2]):
+        variants.append(str(tmp_path / "V{}".format(num)))
+        os.makedirs(os.path.join(variants[-1], "PICTURES"))
+        shutil.copy(os.path.join(variant, "PICTURES", "Ux_z_distance_000"), os.path.join(variants[-1], "PICTURES"))
+    bench_project = dict(project, root=str(tmp_path), variants=variants)
+    monkeypatch.setattr(plots, "PLOT_CACHE_DIR", plots.PLOT_CACHE_DIR)
+    monkeypatch.chdir(tmp_path)
+
+    for sample in range(2):
+        counts = plot_phases(monkeypatch, run.bench_plot_gradients, bench_project, run.DEFAULT_TEMPLATE)[1]
+        assert counts.get("plot") == 1 and "plot_cached" not in counts
+    assert plots.PLOT_CACHE_DIR == str(tmp_path / "plot-cache")
@@ -0,0 +1,72 @@
+import configparser
+import os
+
+import pytest
+from conftest import build_args
+
+import assets
+import batch
+import evePresentation
+
+
+def broken_slides(project, tmp_path):
+    slides = configparser.ConfigParser(interpolation=None)
+    slides.read(project["slides_cfg"])
+    slides["Slide 90"] = {"title": "No layout", "layout": "99", "images": "IMG000-0.jpeg"}
+    slides["Slide 91"] = {"title": "Missing", "layout": "3", "images": "missing.jpeg"}
+    slides["Slide 92"] = {"title": "No fringebar", "layout": "2", "images": "IMG000-0.jpeg"}
+    slides["Slide 93"] = {"title": "Missing plot", "layout": "3", "plots": "missing_plot"}
+    slides["Plots"]["missing_plot"] = "Ux_z_distance_999"
+    slides_cfg = str(tmp_path / "slides.cfg")
+    with open(slides_cfg, "w") as f:
+        slides.write(f)
+    return slides_cfg
+
+
+def preflight(args):
+    pr = evePresentation.Presentation(src_prs_path=args.input_pptx)
+    pr.load_config(args.cfg_file)
+    pr.add_variants(args.variants)
+    pr.index_assets()
+    return pr.preflight()
+
+
+def test_preflight_reports_all_problems_at_once(project, tmp_path):
+    args = build_args(project, str(tmp_path / "OUTPUT.pptx"))
+    assert preflight(args) == []
+
+    args.cfg_file = broken_slides(project, tmp_path)
+    problems = preflight(args)
+    variants = len(project["variants"])
+    assert [(problem.level, problem.section) for problem in problems] == [
+        ("critical", "Slide 90"),
+        *[("error", "Slide 91")] * variants,
+        ("critical", "Slide 92"),
+        *[("error", "Slide 93")] * variants,
+    ]
+    assert problems[0].message == "Layout[99] does not exist in template."
+    assert all(problem.message.startswith("Image: missing.jpeg does not exist") for problem in problems[1:6])
+    assert all(problem.message.startswith("Plot data: Ux_z_distance_999") for problem in problems[7:])
+    assert [problem.message.split()[-1] for problem in problems[7:]] == [
+        os.path.join(variant, "PICTURES") for variant in project["variants"]
+    ]
+
+
+def test_critical_problem_aborts_before_any_slide(project, tmp_path):
+    args = build_args(project, str(tmp_path / "OUTPUT.pptx"))
+    args.cfg_file = broken_slides(project, tmp_path)
+    with pytest.raises(SystemExit):
+        batch.build(args)
+    assert not os.path.exists(args.output_pptx)
+
+
+def test_asset_index_answers_from_one_scan(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"aaa")
+    index = assets.AssetIndex([str(tmp_path)])
+    (tmp_path / "b.png").write_bytes(b"b")
+
+    assert index.get(str(tmp_path / "a.png")).size == 3
+    # Scanned directory is not listed again, other files are stat'ed
+    assert not index.exists(str(tmp_path / "b.png"))
+    assert index.exists(__file__)
+    assert index.get(str(tmp_path / "none" / "c.png")) is None
@@ -0,0 +1,56 @@
+import configparser
+import os
+
+from conftest import build_args
+
+import batch
+import lite
+import profiler
+
+
+def test_nothing_is_recorded_until_enabled():
+    prof = profiler.Profiler()
+    prof.add("plot", 1.0, 10, item="a")
+    with prof.phase("save", "b"):
+        pass
+    assert prof.phases == {}
+    assert prof.events == []
+
+    prof.enabled = True
+    prof.add("plot", 1.0, 10, 4, item="a")
+    with prof.phase("save") as record:
+        record["written"] = 5
+    assert prof.phases["plot"] == {"count": 1, "seconds": 1.0, "read": 10, "written": 4}
+    assert prof.phases["save"]["written"] == 5
+    assert [event["item"] for event in prof.events] == ["a"]
+    assert (prof.report()["bytes_read"], prof.report()["bytes_written"]) == (10, 9)
+
+
+def test_plot_slide_and_lite_bytes(project, tmp_path, monkeypatch):
+    slides = configparser.ConfigParser()
+    slides.read(project["slides_cfg"])
+    slides["Slide 99"] = {"title": "Plots", "layout": "3", "plots": "plot_00"}
+    slides_cfg = str(tmp_path / "slides.cfg")
+    with open(slides_cfg, "w") as f:
+        slides.write(f)
+    args = build_args(project, str(tmp_path / "OUTPUT.pptx"), "--lite")
+    args.cfg_file = slides_cfg
+
+    prof = profiler.Profiler()
+    prof.enabled = True
+    monkeypatch.setattr(profiler, "PROFILER", prof)
+    batch.build(args)
+    report = prof.report()
+    phases = report["phases"]
+
+    # Written decks are not read, plots inserted from memory are not read again
+    assert phases["save"] == dict(phases["save"], read=0, written=os.path.getsize(args.output_pptx))
+    lite_output = lite.lite_path(args.output_pptx)
+    assert phases["lite_save"] == dict(phases["lite_save"], read=0, written=os.path.getsize(lite_output))
+    assert phases["insert_plot"]["count"] > 0 and phases["insert_plot"]["read"] == 0
+    # One plot per page, the baseline variant is on both pages
+    data = [os.path.join(variant, "PICTURES", "Ux_z_distance_000") for variant in project["variants"]]
+    assert phases["plot"]["count"] == 2
+    assert phases["plot"]["read"] == sum(os.path.getsize(path) for path in data + data[:1])
+    assert report["bytes_read"] == sum(stats["read"] for stats in phases.values())
+    assert report["bytes_written"] >= os.path.getsize(args.output_pptx) + os.path.getsize(lite_output)
@@ -0,0 +1,67 @@
+import os
+
+from conftest import build_args, zip_members
+
+import assets
+import batch
+import images
+import staging
+
+
+def asset(path):
+    stat = os.stat(str(path))
+    return assets.Asset(stat.st_size, stat.st_mtime_ns)
+
+
+def test_prefetch_stages_files_once(tmp_path):
+    src = tmp_path / "remote"
+    src.mkdir()
+    files = {}
+    for name in ("a.jpeg", "b.png"):
+        (src / name).write_bytes(name.encode() * 100)
+        files[str(src / name)] = asset(src / name)
+    missing = str(src / "missing.png")
+    stage = staging.StagingArea(str(tmp_path / "stage"))
+    cache = images.ImageCache(str(tmp_path / "cache"))
+
+    staged = staging.prefetch(dict(files, **{missing: assets.Asset(1, 0)}), stage=stage, parallel=4)
+    assert sorted(staged) == sorted(files)
+    for path, local in staged.items():
+        assert os.path.dirname(local) == stage.stage_dir and os.path.splitext(local)[1] == os.path.splitext(path)[1]
+        with open(path, "rb") as f, open(local, "rb") as copy:
+            assert f.read() == copy.read()
+        # Staged copy shares entries of the prepared image cache with its source
+        assert cache.key(local, (10, 10)) == cache.key(path, (10, 10))
+
+    assert staging.prefetch(files, stage=stage) == staged
+    assert len(os.listdir(stage.stage_dir)) == 2
+
+    # Changed source is staged again
+    (src / "a.jpeg").write_bytes(b"changed")
+    files[str(src / "a.jpeg")] = asset(src / "a.jpeg")
+    restaged = staging.prefetch(files, stage=stage)
+    assert restaged[str(src / "a.jpeg")] != staged[str(src / "a.jpeg")]
+    with open(restaged[str(src / "a.jpeg")], "rb") as f:
+        assert f.read() == b"changed"
+
+
+def test_eviction_keeps_files_of_running_build(tmp_path):
+    stage = staging.StagingArea(str(tmp_path / "stage"), max_bytes=150)
+    local = []
+    for num in range(3):
+        src = tmp_path / "{}.png".format(num)
+        src.write_bytes(b"x" * 100)
+        local.append(stage.fetch(str(src), *asset(src)))
+        os.utime(local[-1], (num, num))
+
+    stage.evict(keep=local[:1])
+    assert sorted(os.listdir(stage.stage_dir)) == [os.path.basename(local[0])]
+
+
+def test_prefetched_build_is_the_same_as_direct_build(project, tmp_path):
+    direct, prefetched = str(tmp_path / "direct.pptx"), str(tmp_path / "prefetched.pptx")
+    batch.build(build_args(project, direct))
+    batch.build(build_args(project, prefetched, "--prefetch", "4", "--stage_dir", str(tmp_path / "stage")))
+
+    assert zip_members(prefetched) == zip_members(direct)
+    assert len(os.listdir(str(tmp_path / "stage"))) > 10
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+MAIN = os.path.join(ROOT, "main.py")
+# Wall time of `main.py --version` (interpreter start included), the analysis stack alone takes longer
+STARTUP_BUDGET = 1.0
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "PIL", "pptx")
+
+# Run main as the script, then report which heavy modules it imported
+PROBE = """
+import runpy, sys
+sys.argv = [{main!r}, "--version"]
+try:
+    runpy.run_path({main!r}, run_name="__main__")
+except SystemExit:
+    pass
+print(",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def test_version_imports_no_analysis_stack():
+    probe = PROBE.format(main=MAIN, modules=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert "v" in result.stdout.splitlines()[0]
+    assert result.stdout.splitlines()[-1] == ""
+
+
+def test_version_startup_budget():
+    # Best of three, so one slow start of a busy machine does not fail the test
+    best = None
+    for _ in range(3):
+        start = time.monotonic()
+        subprocess.run([sys.executable, MAIN, "--version"], capture_output=True, check=True)
+        seconds = time.monotonic() - start
+        best = seconds if best is None else min(best, seconds)
+    assert best < STARTUP_BUDGET, "main.py --version took {:.2f} s (budget {} s)".format(best, STARTUP_BUDGET)
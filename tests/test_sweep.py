@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+import gradients
+
+
+def sweep_jobs(project):
+    jobs = []
+    for variant in project["variants"]:
+        pictures = os.path.join(variant, "PICTURES")
+        jobs.extend(
+            (os.path.basename(variant), path) for path in gradients.station_files(pictures, project["grad_file"])
+        )
+    return jobs
+
+
+def test_parallel_sweep_equals_serial_analysis(project):
+    jobs = sweep_jobs(project)
+    assert len(jobs) == 5 * 3
+
+    serial = [gradients.analyse_station(path, variant=variant) for variant, path in jobs]
+    swept = gradients.sweep_stations(jobs, workers=2)
+    assert [(res.variant, res.x_coord, res.maxima) for res in swept] == [
+        (res.variant, res.x_coord, res.maxima) for res in serial
+    ]
+    assert all(res.crossings.size for res in swept)
+    for ours, expected in zip(swept, serial):
+        np.testing.assert_array_equal(ours.crossings, expected.crossings)
+        np.testing.assert_array_equal(ours.location, expected.location)
+
+
+def test_merge_maxima_per_variant_and_zone():
+    results = [
+        gradients.StationResult("V2", "0.700", None, None, {"Upper": 3.0}),
+        gradients.StationResult("V1", "0.700", None, None, {"Upper": 1.0, "Lower": 5.0}),
+        gradients.StationResult("V1", "0.655", None, None, {"Upper": 2.0}),
+        gradients.StationResult("V1", "0.700", None, None, {"Upper": 4.0}),
+    ]
+    assert gradients.merge_maxima(results) == {
+        "V2": {"Upper": [("0.700", 3.0)]},
+        "V1": {"Upper": [("0.655", 2.0), ("0.700", 4.0)], "Lower": [("0.700", 5.0)]},
+    }
@@ -0,0 +1,52 @@
+import os
+
+from conftest import build_args
+
+import assets
+import profiler
+import watch
+import xydata
+
+
+def test_snapshot_ignores_xy_sidecars(tmp_path):
+    pictures = tmp_path / "PICTURES"
+    pictures.mkdir()
+    datafile = pictures / "Ux_z_distance_070"
+    datafile.write_text("(X axis) Z\n(Y axis) Ux\n 0.1, 1.0\n 0.2, -1.0\n 0.3, 2.0\n")
+    before = watch.snapshot([], [str(pictures)])
+
+    # What a plot slide of the first build leaves behind, and a sidecar being written
+    xydata.load_xy(str(datafile))
+    (pictures / "Ux_z_distance_070.xy.npy.k3j2.tmp").write_bytes(b"")
+    assert watch.snapshot([], [str(pictures)]) == before
+
+    (pictures / "NEW.jpeg").write_bytes(b"image")
+    assert watch.snapshot([], [str(pictures)]) != before
+
+
+def test_rebuilds_share_template_and_images(project, tmp_path, monkeypatch):
+    args = watch.build_args(build_args(project, str(tmp_path / "OUTPUT.pptx")))
+    blobs = assets.BlobCache()
+    assert watch.rebuild(args, blobs)
+
+    # Baseline image of the first slide is rewritten, the rest of the slide and the template come from blobs
+    pictures = os.path.join(project["variants"][0], "PICTURES")
+    changed = os.path.join(pictures, "IMG000-0.jpeg")
+    with open(changed, "rb") as f:
+        content = f.read()
+    prof = profiler.Profiler()
+    prof.enabled = True
+    monkeypatch.setattr(profiler, "PROFILER", prof)
+    try:
+        with open(changed, "wb") as f:
+            f.write(content + b"\0")
+        assert watch.rebuild(args, blobs)
+    finally:
+        with open(changed, "wb") as f:
+            f.write(content)
+
+    read = {event["item"] for event in prof.events if event["phase"] == "blob_read"}
+    assert changed in read
+    assert os.path.abspath(args.input_pptx) not in read
+    assert os.path.join(pictures, "IMG000-1.jpeg") not in read
+    assert prof.phases["slide"]["count"] == 2
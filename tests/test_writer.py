@@ -0,0 +1,35 @@
+import os
+
+import pptx
+
+import writer
+
+
+def test_abort_removes_only_its_unfinished_output(tmp_path):
+    output = tmp_path / "OUTPUT.pptx"
+    output.write_bytes(b"previous build")
+    prs = pptx.Presentation()
+
+    # Overlapping builds of the same output write into files of their own
+    first, second = writer.StreamingWriter(str(output)), writer.StreamingWriter(str(output))
+    first.flush_media(prs.part.package)
+    second.flush_media(prs.part.package)
+    assert len([path for path in tmp_path.iterdir() if path.suffix == ".part"]) == 2
+    first.abort()
+
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".part"] == [os.path.basename(second._tmp_path)]
+    assert output.read_bytes() == b"previous build"
+    second.close(prs.part.package)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["OUTPUT.pptx"]
+    assert oct(output.stat().st_mode & 0o777) == oct(0o644)
+
+
+def test_close_writes_readable_deck(tmp_path):
+    output = tmp_path / "OUTPUT.pptx"
+    prs = pptx.Presentation()
+    prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = "Streamed"
+
+    stream = writer.StreamingWriter(str(output))
+    stream.flush_media(prs.part.package)
+    assert stream.close(prs.part.package) == output.stat().st_size
+    assert pptx.Presentation(str(output)).slides[0].shapes.title.text == "Streamed"
@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import xydata
+
+XY_TEXT = "$ export\n(X axis) Distance\n(Y axis) Ux\n 0.0, 1.5\n 0.5, -2.0\n 1.0, 3.25\n"
+
+
+def write_xy(tmp_path, name="Ux_z_distance_070"):
+    path = tmp_path / name
+    path.write_text(XY_TEXT)
+    return str(path)
+
+
+def test_parse_and_sidecar_cache(tmp_path):
+    datafile = write_xy(tmp_path)
+    data = xydata.load_xy(datafile)
+    assert (data.x_axis, data.y_axis) == ("Distance", "Ux")
+    np.testing.assert_array_equal(data.y, [1.5, -2.0, 3.25])
+
+    npy_path, meta_path = xydata.cache_paths(datafile)
+    assert os.path.exists(npy_path) and os.path.exists(meta_path)
+    cached = xydata.load_xy(datafile)
+    assert isinstance(cached.x, np.memmap)
+    np.testing.assert_array_equal(cached.x, data.x)
+
+
+def test_no_sidecars_without_cache(tmp_path):
+    datafile = write_xy(tmp_path)
+    xydata.load_xy(datafile, cache=False)
+    assert sorted(os.listdir(tmp_path)) == ["Ux_z_distance_070"]
+
+
+def test_concurrent_stores_use_own_temporary_files(tmp_path):
+    datafile = write_xy(tmp_path)
+    stamp = xydata._stamp(datafile)
+    data = xydata.parse_xy_text(XY_TEXT)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda num: xydata._store(datafile, stamp, data), range(64)))
+
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    np.testing.assert_array_equal(xydata.load_xy(datafile).y, data.y)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import gradients
+
+WINDOW = (0.655, 0.688, 0.8, 0.696)
+DOOR = (0.655, 0.67, 0.8, 0.678)
+
+
+def line_z(line, x):
+    """z of a boundary line at x the way the former Line class computed it."""
+    x1, z1, x2, z2 = line
+    m, b = np.polyfit([x1, x2], [z1, z2], 1)
+    return m * x + b
+
+
+def line_rule(x, z):
+    """Former classification: Dvere at or below the door line, Okno at or above the window line, Lista between."""
+    z_win, z_door = line_z(WINDOW, x), line_z(DOOR, x)
+    location = np.full(z.size, "NEZNAMA CHYBA", dtype=object)
+    location[z <= z_door] = "Dvere"
+    location[z >= z_win] = "Okno"
+    location[(z < z_win) & (z > z_door)] = "Lista"
+    return location
+
+
+@pytest.mark.parametrize("x", [0.655, 0.7, 0.8])
+def test_default_zones_match_line_rule_on_boundaries(x):
+    z = np.array([line_z(DOOR, x), line_z(WINDOW, x), -5.0, 5.0, (line_z(DOOR, x) + line_z(WINDOW, x)) / 2])
+    z = np.concatenate([z, z + 1e-6, z - 1e-6])
+    x_all = np.full(z.size, x)
+    assert list(gradients.classify_points(x_all, z, gradients.DEFAULT_ZONES)) == list(line_rule(x, z))
+    assert list(gradients.classify_points(x_all, z, gradients.DEFAULT_ZONES)[:2]) == ["Dvere", "Okno"]
+
+
+def test_default_zones_match_line_rule_on_random_points():
+    rng = np.random.default_rng(23)
+    for x in rng.uniform(0.6, 0.85, 20):
+        z = rng.uniform(0.66, 0.70, 500)
+        assert list(gradients.classify_points(np.full(z.size, x), z, gradients.DEFAULT_ZONES)) == list(line_rule(x, z))
+
+
+def test_first_zone_wins_and_unknown_outside():
+    square = gradients.parse_zone("A", "0 0, 1 0, 1 1, 0 1")
+    inner = gradients.parse_zone("B", "0.2 0.2, 0.8 0.2, 0.8 0.8, 0.2 0.8")
+    names = gradients.classify_points([0.5, 0.1, 2.0], [0.5, 0.5, 2.0], [inner, square])
+    assert list(names) == ["B", "A", gradients.UNKNOWN_ZONE]
+
+
+def test_parse_zone_errors():
+    with pytest.raises(ValueError):
+        gradients.parse_zone("A", "0 0, 1 0")
+    with pytest.raises(ValueError):
+        gradients.parse_zone("A", "0 0, 1 x, 1 1")
@@ -0,0 +1,120 @@
+"""Watch mode: keep one process running and rebuild the presentation when its inputs change"""
+import configparser
+import copy
+import os
+import time
+
+import colorlog
+
+import assets
+import batch
+import cli
+import xydata
+from log import formatter
+
+# Initialize LOGGER
+handler = colorlog.StreamHandler()
+handler.setFormatter(formatter)
+logger = colorlog.getLogger(__name__)
+logger.addHandler(handler)
+logger.setLevel("INFO")
+
+POLL_INTERVAL = 0.25
+# Inputs have to be unchanged this long before a rebuild starts (post-processor writes in bursts)
+DEBOUNCE = 0.5
+
+
+def build_args(defaults, settings_file: str = None):
+    """Arguments of one rebuild, settings cfg is read again as it may have changed."""
+    args = copy.copy(defaults)
+    if settings_file:
+        cli.read_settings(settings_file, args)
+    # Only slides whose inputs changed are rebuilt, images are stored without deflating them again
+    args.incremental = True
+    args.stream = True
+    return args
+
+
+def watched_inputs(args, settings_file: str = None):
+    """Return (files, directories) whose changes trigger a rebuild."""
+    files = [args.cfg_file, args.input_pptx] + ([settings_file] if settings_file else [])
+    directories = []
+    for var in args.variants:
+        var_path = var if isinstance(var, str) else var.get("path")
+        directories.append(os.path.join(os.path.abspath(var_path), "PICTURES"))
+    return files, directories
+
+
+def snapshot(files, directories) -> dict:
+    """(size, mtime) of every watched file and of every file in watched directories (except XY sidecars)."""
+    state = {}
+    for path in files:
+        try:
+            stat = os.stat(path)
+            state[path] = assets.Asset(stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            state[path] = None
+    index = assets.AssetIndex(directories)
+    for directory, entries in index.dirs.items():
+        # Sidecars of plot data are written by the build itself, they must not trigger the next one
+        state[directory] = {name: asset for name, asset in entries.items() if not xydata.is_sidecar(name)}
+    return state
+
+
+def wait_for_change(previous: dict, files, directories, interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE):
+    """Poll until the watched state differs from previous and then stays unchanged for debounce seconds."""
+    state = previous
+    while state == previous:
+        time.sleep(interval)
+        state = snapshot(files, directories)
+
+    settled = time.monotonic()
+    while time.monotonic() - settled < debounce:
+        time.sleep(interval)
+        current = snapshot(files, directories)
+        if current != state:
+            state, settled = current, time.monotonic()
+    return state
+
+
+def rebuild(args, blobs: assets.BlobCache = None) -> bool:
+    """Build the presentation of args with template and images of blobs (kept from the previous rebuild)."""
+    start = time.monotonic()
+    try:
+        batch.build(args, blobs, workers=args.workers)
+    except (Exception, SystemExit) as err:
+        # SystemExit: the build aborted on a problem that was already logged, keep watching
+        if not isinstance(err, SystemExit):
+            logger.error("Build failed: {}: {}".format(type(err).__name__, err))
+        logger.warning("Build failed, waiting for changes...")
+        return False
+    logger.info("Built in {:.1f} s, waiting for changes...".format(time.monotonic() - start))
+    return True
+
+
+def watch(defaults, settings_file: str = None):
+    """Build the presentation, then rebuild it after every change of its inputs until interrupted.
+
+    Template and images stay in one BlobCache between rebuilds, only changed files are read again.
+    """
+    args = build_args(defaults, settings_file)
+    blobs = assets.BlobCache()
+    files, directories = watched_inputs(args, settings_file)
+    state = snapshot(files, directories)
+    rebuild(args, blobs)
+
+    logger.info("Watching {} files and {} PICTURES directories (Ctrl+C to stop)".format(len(files), len(directories)))
+    try:
+        while True:
+            state = wait_for_change(state, files, directories)
+            logger.info("Change detected, rebuilding {}".format(args.output_pptx))
+            try:
+                args = build_args(defaults, settings_file)
+            except configparser.Error as err:
+                logger.error("Settings file can not be read, waiting for changes...\n{}".format(err))
+                continue
+            files, directories = watched_inputs(args, settings_file)
+            state = snapshot(files, directories)
+            rebuild(args, blobs)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped")
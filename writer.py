@@ -0,0 +1,96 @@
+"""Streaming presentation writer: image parts go to the zip while slides are built"""
+import os
+import tempfile
+import zipfile
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.parts.image import ImagePart
+
+# Already compressed media are stored as they are, deflating them only costs CPU
+STORED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "video/mp4"}
+
+
+class _WrittenImagePart(ImagePart):
+    """Image part whose blob is already in the zip and was released from memory.
+
+    SHA1, pixel size and DPI are kept, so python-pptx can still reuse the
+    part when the same image is inserted again.
+    """
+
+    @property
+    def sha1(self):
+        return self._written_props[0]
+
+    @property
+    def _px_size(self):
+        return self._written_props[1]
+
+    @property
+    def _dpi(self):
+        return self._written_props[2]
+
+
+class StreamingWriter:
+    """Write python-pptx package to output_path part by part.
+
+    Call flush_media after each slide to write new image parts and free their
+    blobs, then close to write the rest of the package. The zip is written to
+    a temporary file which replaces output_path only when it is complete.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        # Temporary file of its own, overlapping builds of the same output (--batch, --watch) never write into one
+        directory, name = os.path.split(output_path)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".part", dir=directory or ".")
+        os.fchmod(fd, 0o644)
+        os.close(fd)
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compression=zipfile.ZIP_DEFLATED, strict_timestamps=False)
+        self._written = set()
+        self.media_bytes = 0
+
+    def _write(self, partname, blob: bytes, content_type: str = None):
+        compress_type = zipfile.ZIP_STORED if content_type in STORED_CONTENT_TYPES else zipfile.ZIP_DEFLATED
+        self._zip.writestr(partname.membername, blob, compress_type=compress_type)
+        self._written.add(partname)
+
+    def flush_media(self, package) -> int:
+        """Write image parts which are not in the zip yet and release their blobs, return their count."""
+        count = 0
+        for part in package.iter_parts():
+            if not isinstance(part, ImagePart) or part.partname in self._written:
+                continue
+            part._written_props = (part.sha1, part._px_size, part._dpi)
+            self._write(part.partname, part.blob, part.content_type)
+            self.media_bytes += len(part.blob)
+            part._blob = b""
+            part.__class__ = _WrittenImagePart
+            count += 1
+        return count
+
+    def close(self, package) -> int:
+        """Write remaining parts, content types and relationships, return size of the output file."""
+        self.flush_media(package)
+        parts = tuple(package.iter_parts())
+
+        self._zip.writestr(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        self._zip.writestr(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+        for part in parts:
+            if part.partname not in self._written:
+                self._write(part.partname, part.blob, part.content_type)
+            if part._rels:
+                self._zip.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+        self._zip.close()
+        os.replace(self._tmp_path, self.output_path)
+        return os.path.getsize(self.output_path)
+
+    def abort(self):
+        """Close and remove the unfinished output, its temporary file only (the previous output_path is kept)."""
+        try:
+            self._zip.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.unlink(self._tmp_path)
@@ -0,0 +1,123 @@
+"""Loader of exported XY data ("(X axis) name", "(Y axis) name" and " x, y" lines) with binary sidecar cache"""
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+XY_CACHE_VERSION = 1
+
+# Parsed XY file: axis names and x, y arrays (read-only memory maps when loaded from cache)
+XYData = namedtuple("XYData", ("x_axis", "y_axis", "x", "y"))
+
+
+# Sidecar cache files written next to the data file
+SIDECAR_SUFFIXES = (".xy.npy", ".xy.json")
+
+
+def cache_paths(datafile: str):
+    """Return (data .npy, metadata .json) sidecar paths of datafile."""
+    return tuple(datafile + suffix for suffix in SIDECAR_SUFFIXES)
+
+
+def is_sidecar(name: str) -> bool:
+    """Sidecar (or its temporary file while written) of some data file."""
+    return any(suffix in name for suffix in SIDECAR_SUFFIXES)
+
+
+def parse_xy_text(text: str) -> XYData:
+    """Parse XY export, data lines start with a space and only the first two columns are used."""
+    data_lines = []
+    header_lines = []
+    for line in text.splitlines():
+        (data_lines if line.startswith(" ") else header_lines).append(line)
+
+    x_axis = ""
+    y_axis = ""
+    for line in header_lines:
+        if "(X axis) " in line:
+            x_axis = line.split("(X axis) ")[-1]
+        if "(Y axis) " in line:
+            y_axis = line.split("(Y axis) ")[-1]
+
+    if not data_lines:
+        return XYData(x_axis, y_axis, np.empty(0), np.empty(0))
+
+    # Exported lines have the same columns: parse all of them in one call, line by line otherwise
+    columns = data_lines[0].count(",") + 1
+    joined = ",".join(data_lines)
+    values = None
+    if joined.count(",") == len(data_lines) * columns - 1:
+        try:
+            values = np.fromstring(joined, sep=",")
+        except ValueError:
+            # Unparsable value, the line by line parser reports it
+            pass
+    if values is None or values.size != len(data_lines) * columns:
+        values = np.array([line.split(",")[0:2] for line in data_lines], dtype=np.float64)
+        columns = 2
+
+    xy = values.reshape(-1, columns)[:, 0:2].T.copy()
+    return XYData(x_axis, y_axis, xy[0], xy[1])
+
+
+def _stamp(datafile: str) -> dict:
+    stat = os.stat(datafile)
+    return {"version": XY_CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_cached(datafile: str, stamp: dict):
+    npy_path, meta_path = cache_paths(datafile)
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if {key: meta.get(key) for key in stamp} != stamp:
+            return None
+        xy = np.load(npy_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return XYData(meta["x_axis"], meta["y_axis"], xy[0], xy[1])
+
+
+def _write_atomic(path: str, write, mode: str = "wb"):
+    """Write path through a temporary file of its own, so concurrent writers never share one."""
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory or ".")
+    try:
+        # Readable by other users of the project as files written by open()
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _store(datafile: str, stamp: dict, data: XYData):
+    """Write sidecars atomically, metadata last so it never points to incomplete data."""
+    npy_path, meta_path = cache_paths(datafile)
+    meta = dict(stamp, x_axis=data.x_axis, y_axis=data.y_axis)
+    try:
+        _write_atomic(npy_path, lambda f: np.save(f, np.vstack((data.x, data.y))))
+        _write_atomic(meta_path, lambda f: json.dump(meta, f), mode="w")
+    except OSError:
+        # Read-only project folder, data are just parsed again next time
+        pass
+
+
+def load_xy(datafile: str, cache: bool = True) -> XYData:
+    """Return XYData of datafile, from the sidecar cache if it matches size and mtime of datafile."""
+    stamp = _stamp(datafile)
+    if cache:
+        data = _load_cached(datafile, stamp)
+        if data is not None:
+            return data
+
+    with open(datafile, "r") as f:
+        data = parse_xy_text(f.read())
+
+    if cache:
+        _store(datafile, stamp, data)
+    return data